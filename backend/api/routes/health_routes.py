@@ -17,14 +17,18 @@ VERSION = PROJECT_VERSION
 
 @health_bp.route('/api/health', methods=['GET'])
 def health_check():
-    """健康检查接口"""
+    """健康检查接口（富途行情熔断器打开时状态为degraded，此时使用缓存数据）"""
     from flask import current_app
+    from services.data.circuit_breaker import STATE_CLOSED
+    from services.data.quote_context import get_quote_context_manager
+    quote_gateway = get_quote_context_manager().get_status()
     return jsonify({
-        'status': 'healthy',
+        'status': 'healthy' if quote_gateway['circuit_breaker']['state'] == STATE_CLOSED else 'degraded',
         'timestamp': datetime.now().isoformat(),
         'service': 'ETF Grid Trading Analysis System',
         'version': VERSION,
-        'environment': current_app.config.get('ENV', 'development')
+        'environment': current_app.config.get('ENV', 'development'),
+        'quote_gateway': quote_gateway
     })
 
 @health_bp.route('/api/version', methods=['GET'])
@@ -126,5 +126,15 @@ if __name__ == '__main__':
     host = args.host
     debug = os.environ.get('FLASK_ENV') == 'development'
     
+    # 开发服务器启用自动重载时只在实际运行应用的子进程中启动预热调度器
+    if (os.environ.get('CACHE_WARMUP_ENABLED', 'true').lower() == 'true' and
+            (not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true')):
+        from api.routes.etf_routes import etf_service
+        etf_service.start_cache_warmup()
+    if (os.environ.get('CACHE_EVICTION_ENABLED', 'true').lower() == 'true' and
+            (not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true')):
+        from api.routes.etf_routes import etf_service
+        etf_service.futuClient.cache.start_eviction()
+    
     app.logger.info(f"启动ETF网格交易策略分析系统，版本: {VERSION}, 端口: {port}")
     app.run(host=host, port=port, debug=debug)
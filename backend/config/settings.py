@@ -34,6 +34,8 @@ class Settings(BaseSettings):
     cache_dir: str = Field(default="cache", description="缓存目录")
     cache_ttl_seconds: int = Field(default=3600, description="缓存过期时间(秒)")
     cache_max_size: int = Field(default=1000, description="缓存最大条目数")
+    cache_backend: str = Field(default="file", description="永久/交易日缓存后端(memory/file/sqlite)")
+    cache_storage_layout: str = Field(default="files", description="文件缓存后端的存储方式(files/bundle)")
     
     # 算法配置
     atr_period: int = Field(default=14, description="ATR计算周期")
@@ -91,6 +93,22 @@ class Settings(BaseSettings):
             raise ValueError(f'日志级别必须是: {", ".join(valid_levels)}')
         return v.upper()
     
+    @validator('cache_backend')
+    def validate_cache_backend(cls, v):
+        """验证缓存后端"""
+        valid_backends = ['memory', 'file', 'sqlite']
+        if v.lower() not in valid_backends:
+            raise ValueError(f'缓存后端必须是: {", ".join(valid_backends)}')
+        return v.lower()
+    
+    @validator('cache_storage_layout')
+    def validate_cache_storage_layout(cls, v):
+        """验证文件缓存的存储方式"""
+        valid_layouts = ['files', 'bundle']
+        if v.lower() not in valid_layouts:
+            raise ValueError(f'缓存存储方式必须是: {", ".join(valid_layouts)}')
+        return v.lower()
+    
     @validator('cors_origins')
     def parse_cors_origins(cls, v):
         """解析CORS源配置"""
@@ -3,12 +3,15 @@ ETF分析服务 - 业务流程协调
 重构后的服务层，专注于业务流程协调，算法逻辑已抽离到算法模块
 """
 
+import os
 import pandas as pd
 from typing import Dict, List, Optional
 import logging
 from datetime import datetime, timedelta
 
-from ..data.futu_client import futuClient
+from ..data.futu_client import futuClient, STALE_PRICE_MAX_AGE_DAYS
+from ..data.cache_warmup import CacheWarmer, CacheWarmupScheduler
+from ..data.daily_ingestion import UniverseDataService
 from algorithms.atr.analyzer import ATRAnalyzer
 from algorithms.atr.calculator import ATRCalculator
 from algorithms.grid.arithmetic_grid import ArithmeticGridCalculator
@@ -70,9 +73,38 @@ class ETFAnalysisService:
             {'code': '159949', 'name': '创业板50ETF'}
         ]
     
+    def start_cache_warmup(self) -> CacheWarmupScheduler:
+        """
+        启动收盘后缓存预热调度器（热门ETF及近期查询最多的ETF），
+        启用DAILY_INGESTION_ENABLED时预热前先入库全市场日线截面
+        
+        Returns:
+            CacheWarmupScheduler: 已启动的调度器
+        """
+        ingestor = None
+        if os.getenv('DAILY_INGESTION_ENABLED', 'false').lower() == 'true':
+            ingestor = UniverseDataService(self.futuClient)
+        warmer = CacheWarmer(self.futuClient, [etf['code'] for etf in self.popular_etfs], ingestor=ingestor)
+        scheduler = CacheWarmupScheduler(warmer)
+        scheduler.start()
+        return scheduler
+    
     def get_popular_etfs(self) -> List[Dict]:
-        """获取热门ETF列表"""
-        return self.popular_etfs
+        """获取热门ETF列表（附带最新价格，一次批量快照获取）"""
+        prices = self.futuClient.get_latest_prices([etf['code'] for etf in self.popular_etfs])
+        
+        popular_etfs = []
+        for etf in self.popular_etfs:
+            price_data = prices.get(etf['code'])
+            if price_data:
+                etf = {
+                    **etf,
+                    'current_price': price_data.get('current_price', 0),
+                    'change_pct': price_data.get('pct_change', 0),
+                    'trade_date': price_data.get('trade_date', '')
+                }
+            popular_etfs.append(etf)
+        return popular_etfs
     
     def get_etf_basic_info(self, etf_code: str) -> Dict:
         """
@@ -91,7 +123,7 @@ class ETFAnalysisService:
                 raise ValueError(f"未找到ETF代码: {etf_code}")
             
             # 获取最新价格（使用增强缓存）
-            price_data = self.futuClient.get_latest_price(etf_code)
+            price_data = self.get_latest_price_info(etf_code)
             if not price_data:
                 raise ValueError(f"未获取到ETF价格数据: {etf_code}")
             
@@ -122,6 +154,55 @@ class ETFAnalysisService:
             logger.error(f"获取ETF基础信息失败: {etf_code}, {str(e)}")
             raise
     
+    def get_latest_price_info(self, etf_code: str) -> Optional[Dict]:
+        """
+        获取最新价格信息，网关出错且没有价格缓存时以最近一根日线的收盘价代替
+        
+        日线落后最近交易日超过STALE_PRICE_MAX_AGE_DAYS个交易日时不再代替（与富途客户端网关出错时可返回的旧价格上限一致）
+        
+        Args:
+            etf_code: ETF代码
+            
+        Returns:
+            最新价格信息（退回日线时标记stale并带有落后的交易日数），都不可用时返回None
+        """
+        price_data = self.futuClient.get_latest_price(etf_code)
+        if price_data:
+            return price_data
+        
+        end_date = datetime.now().strftime('%Y%m%d')
+        start_date = (datetime.now() - timedelta(days=30)).strftime('%Y%m%d')
+        df = self.futuClient.get_etf_daily_data(etf_code, start_date, end_date)
+        if df is None or len(df) == 0:
+            return None
+        
+        last_bar = df.sort_values('trade_date').iloc[-1]
+        trade_date = last_bar['trade_date'].strftime('%Y%m%d')
+        trading_date_manager = self.futuClient.trading_date_manager
+        latest_trading_date = trading_date_manager.get_latest_trading_date(None)
+        trading_days = trading_date_manager.get_trading_days_between(trade_date, latest_trading_date)
+        if trading_days is None:
+            logger.warning(f"交易日历不可用，无法判断日线是否过旧，不使用日线收盘价: {etf_code}")
+            return None
+        
+        data_age_days = len([day for day in trading_days if day > trade_date])
+        if data_age_days > STALE_PRICE_MAX_AGE_DAYS:
+            logger.warning(f"未获取到ETF最新价格，最近日线落后{data_age_days}个交易日，不再代替: {etf_code}, "
+                           f"交易日{trade_date}")
+            return None
+        
+        logger.warning(f"未获取到ETF最新价格，使用最近日线收盘价: {etf_code}, 交易日{trade_date}")
+        return {
+            'current_price': round(float(last_bar['close']), 3),
+            'pre_close': round(float(last_bar['pre_close']), 3),
+            'pct_change': round(float(last_bar['pct_chg']), 2),
+            'volume': int(last_bar['vol']),
+            'amount': float(last_bar['amount']),
+            'trade_date': trade_date,
+            'data_age_days': data_age_days,
+            'stale': True
+        }
+    
     def get_historical_data(self, etf_code: str, days: int = 365) -> pd.DataFrame:
         """
         获取历史数据
@@ -186,8 +267,8 @@ class ETFAnalysisService:
             # 2. 获取历史数据（1年）
             df = self.get_historical_data(etf_code, days=365)
             
-            # 3. 获取最新价格信息（使用futuClient的get_latest_price接口）
-            latest_price_info = self.futuClient.get_latest_price(etf_code)
+            # 3. 获取最新价格信息（网关不可用时退回最近一根日线的收盘价）
+            latest_price_info = self.get_latest_price_info(etf_code)
             if not latest_price_info:
                 raise ValueError(f"未获取到ETF最新价格: {etf_code}")
             
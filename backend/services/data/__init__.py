@@ -1,11 +1,29 @@
 """数据服务包初始化文件"""
 
+from .bar_store import BarStore
+from .minute_bar_store import MinuteBarStore
 from .cache_service import EnhancedCache, TradingDateManager
+from .cache_backends import MemoryCacheBackend, FileCacheBackend, SQLiteCacheBackend, create_cache_backend
 from .futu_client import futuClient
+from .daily_ingestion import UniverseDataService
+from .async_futu_client import AsyncFutuClient
+from .quote_context import QuoteContextManager, get_quote_context_manager
+from .trading_calendar import TradingCalendar
 
 __all__ = [
+    'BarStore',
+    'MinuteBarStore',
     'EnhancedCache',
     'TradingDateManager',
+    'MemoryCacheBackend',
+    'FileCacheBackend',
+    'SQLiteCacheBackend',
+    'create_cache_backend',
+    'TradingCalendar',
     'TushareClient',
-    'futuClient'
+    'futuClient',
+    'UniverseDataService',
+    'AsyncFutuClient',
+    'QuoteContextManager',
+    'get_quote_context_manager'
 ]
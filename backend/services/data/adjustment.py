@@ -0,0 +1,104 @@
+"""
+复权计算
+缓存中只保存不复权日线，读取时按复权因子向量化计算前复权/后复权价格。
+复权因子来自富途get_rehab：每个除权除息日一组仿射因子，复权价格 = 不复权价格 × A + B，
+分红、拆分等公司行为发生后只需更新这组因子，不需要重新下载全部历史K线
+"""
+
+import logging
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 复权方式（与Tushare pro_bar的adj参数一致）
+ADJUST_QFQ = 'qfq'
+ADJUST_HFQ = 'hfq'
+ADJUST_NONE = 'none'
+ADJUST_TYPES = (ADJUST_QFQ, ADJUST_HFQ, ADJUST_NONE)
+
+# 需要复权的价格列
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'pre_close']
+
+
+def rehab_to_factors(data: pd.DataFrame) -> List[Dict]:
+    """
+    将富途get_rehab返回的复权信息转换为按除权日升序的复权因子列表
+
+    Args:
+        data: get_rehab返回的DataFrame
+
+    Returns:
+        List[Dict]: 元素为 {ex_date(YYYYMMDD), fwd_a, fwd_b, bwd_a, bwd_b}
+    """
+    if data is None or data.empty:
+        return []
+    factors = pd.DataFrame({
+        'ex_date': pd.to_datetime(data['ex_div_date']).dt.strftime('%Y%m%d'),
+        'fwd_a': data['forward_adj_factorA'].astype(float),
+        'fwd_b': data['forward_adj_factorB'].astype(float),
+        'bwd_a': data['backward_adj_factorA'].astype(float),
+        'bwd_b': data['backward_adj_factorB'].astype(float),
+    }).sort_values('ex_date')
+    return factors.to_dict('records')
+
+
+def _cumulative_factors(factors: List[Dict], adj: str):
+    """
+    计算经历k次除权后的K线所用的累积仿射因子 (A[k], B[k])，k = 0..n
+
+    前复权：除权日在K线之后的事件按时间顺序依次作用；
+    后复权：除权日在K线之前（含当日）的事件从近到远依次作用
+    """
+    n = len(factors)
+    cum_a = np.ones(n + 1)
+    cum_b = np.zeros(n + 1)
+    if adj == ADJUST_QFQ:
+        for k in range(n - 1, -1, -1):
+            a, b = factors[k]['fwd_a'], factors[k]['fwd_b']
+            cum_a[k] = cum_a[k + 1] * a
+            cum_b[k] = cum_a[k + 1] * b + cum_b[k + 1]
+    else:
+        for k in range(1, n + 1):
+            a, b = factors[k - 1]['bwd_a'], factors[k - 1]['bwd_b']
+            cum_a[k] = cum_a[k - 1] * a
+            cum_b[k] = cum_a[k - 1] * b + cum_b[k - 1]
+    return cum_a, cum_b
+
+
+def apply_adjustment(df: pd.DataFrame, factors: Optional[List[Dict]], adj: str = ADJUST_QFQ) -> pd.DataFrame:
+    """
+    对不复权日线做前复权或后复权，并重新计算涨跌额、涨跌幅和振幅
+
+    Args:
+        df: 不复权日线，列格式同BAR_COLUMNS
+        factors: rehab_to_factors返回的复权因子
+        adj: 复权方式（qfq、hfq或none）
+
+    Returns:
+        DataFrame: 复权后的日线（新对象，不修改输入）；无需复权时直接返回输入
+    """
+    if adj not in ADJUST_TYPES:
+        raise ValueError(f"不支持的复权方式: {adj}，可选: {', '.join(ADJUST_TYPES)}")
+    if adj == ADJUST_NONE or not factors or df.empty:
+        return df
+
+    cum_a, cum_b = _cumulative_factors(factors, adj)
+    ex_dates = np.array([pd.Timestamp(f['ex_date']) for f in factors], dtype='datetime64[ns]')
+    trade_date = df['trade_date'].to_numpy(dtype='datetime64[ns]')
+    # 每根K线经历过的除权次数；前收盘价属于上一交易日，除权日当天不计入
+    k = np.searchsorted(ex_dates, trade_date, side='right')
+    k_prev = np.searchsorted(ex_dates, trade_date, side='left')
+
+    result = df.copy()
+    for column in PRICE_COLUMNS:
+        index = k_prev if column == 'pre_close' else k
+        result[column] = df[column].to_numpy(dtype=np.float64) * cum_a[index] + cum_b[index]
+
+    pre_close = result['pre_close'].to_numpy()
+    change = result['close'].to_numpy() - pre_close
+    result['change'] = change
+    result['pct_chg'] = change / pre_close * 100
+    result['amplitude'] = (result['high'].to_numpy() - result['low'].to_numpy()) / pre_close * 100
+    return result
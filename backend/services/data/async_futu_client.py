@@ -0,0 +1,182 @@
+"""
+异步数据客户端
+以asyncio协程提供与DataInterface相同的数据方法，阻塞的富途API调用在线程池中执行，
+每类接口（K线、行情快照、基础信息）各有独立的并发上限，
+多只ETF的请求可以重叠等待网关响应，而不是逐个累加延迟
+"""
+
+import asyncio
+import weakref
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import pandas as pd
+
+from ..interfaces import AsyncDataInterface
+from .futu_client import futuClient
+
+logger = logging.getLogger(__name__)
+
+# 各类接口的默认并发上限
+ENDPOINT_CONCURRENCY = {
+    'kline': 2,      # request_history_kline
+    'snapshot': 4,   # get_market_snapshot
+    'basic': 2,      # get_stock_basicinfo
+}
+
+
+class AsyncFutuClient(AsyncDataInterface):
+    """基于futuClient的asyncio数据客户端"""
+
+    def __init__(self, client: Optional[futuClient] = None,
+                 concurrency: Optional[Dict[str, int]] = None):
+        """
+        初始化异步数据客户端
+
+        Args:
+            client: 同步数据客户端（共享其缓存和行情连接），默认新建
+            concurrency: 各类接口的并发上限，未指定的使用默认值
+        """
+        self.client = client or futuClient()
+        self.concurrency = {**ENDPOINT_CONCURRENCY, **(concurrency or {})}
+        self._executor = ThreadPoolExecutor(max_workers=sum(self.concurrency.values()),
+                                            thread_name_prefix="async-futu")
+        # asyncio信号量绑定事件循环，每个事件循环使用各自的一组信号量
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = \
+            weakref.WeakKeyDictionary()
+
+    async def __aenter__(self) -> "AsyncFutuClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """关闭线程池（不关闭共享的行情连接）"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _semaphore(self, endpoint: str) -> asyncio.Semaphore:
+        """获取当前事件循环中某类接口的信号量"""
+        loop = asyncio.get_running_loop()
+        semaphores = self._semaphores.get(loop)
+        if semaphores is None:
+            semaphores = {name: asyncio.Semaphore(limit) for name, limit in self.concurrency.items()}
+            self._semaphores[loop] = semaphores
+        return semaphores[endpoint]
+
+    async def _call(self, endpoint: str, fn: Callable, *args, **kwargs) -> Any:
+        """
+        在线程池中执行阻塞调用，受该类接口的并发上限约束
+
+        任务被取消时立即释放并发名额并向上抛出CancelledError；
+        已在线程中开始的富途API调用会执行完毕，结果写入缓存后被丢弃。
+        调用在当前上下文的副本中执行，请求优先级等上下文变量随之传递
+        """
+        async with self._semaphore(endpoint):
+            loop = asyncio.get_running_loop()
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(self._executor, partial(context.run, fn, *args, **kwargs))
+
+    async def get_etf_basic_info(self, etf_code: str) -> Optional[Dict]:
+        """
+        获取ETF基础信息
+
+        Args:
+            etf_code: ETF代码
+
+        Returns:
+            Dict: ETF基础信息，获取失败返回None
+        """
+        return await self._call('basic', self.client.get_etf_basic_info, etf_code)
+
+    async def get_historical_data(self, etf_code: str, days: int = 365) -> Optional[pd.DataFrame]:
+        """
+        获取最近days天的日线数据
+
+        Args:
+            etf_code: ETF代码
+            days: 获取天数
+
+        Returns:
+            DataFrame: ETF日线数据，获取失败返回None
+        """
+        end_date = datetime.now().strftime('%Y%m%d')
+        start_date = (datetime.now() - timedelta(days=days)).strftime('%Y%m%d')
+        return await self._call('kline', self.client.get_etf_daily_data, etf_code, start_date, end_date)
+
+    async def get_latest_price(self, etf_code: str) -> Optional[Dict]:
+        """
+        获取最新价格
+
+        Args:
+            etf_code: ETF代码
+
+        Returns:
+            Dict: 最新价格信息，获取失败返回None
+        """
+        return await self._call('snapshot', self.client.get_latest_price, etf_code)
+
+    async def get_latest_prices(self, etf_codes: List[str]) -> Dict[str, Dict]:
+        """
+        批量获取多只ETF最新价格（一次批量快照）
+
+        Args:
+            etf_codes: ETF代码列表
+
+        Returns:
+            Dict[str, Dict]: ETF代码到最新价格信息的映射
+        """
+        return await self._call('snapshot', self.client.get_latest_prices, etf_codes)
+
+    async def get_etf_bundle(self, etf_code: str, days: int = 365) -> Dict[str, Any]:
+        """
+        并发获取单只ETF的基础信息、日线数据和最新价格
+
+        Args:
+            etf_code: ETF代码
+            days: 日线天数
+
+        Returns:
+            Dict: 包含basic_info、history、latest_price的字典
+        """
+        basic_info, history, latest_price = await asyncio.gather(
+            self.get_etf_basic_info(etf_code),
+            self.get_historical_data(etf_code, days),
+            self.get_latest_price(etf_code),
+        )
+        return {'basic_info': basic_info, 'history': history, 'latest_price': latest_price}
+
+    async def map(self, method: Callable[[str], Awaitable[Any]], etf_codes: List[str],
+                  return_exceptions: bool = True) -> Dict[str, Any]:
+        """
+        对多只ETF并发执行同一方法
+
+        Args:
+            method: 本客户端的协程方法，如self.get_historical_data
+            etf_codes: ETF代码列表
+            return_exceptions: 为True时单只ETF的异常作为结果返回，不影响其余ETF
+
+        Returns:
+            Dict[str, Any]: ETF代码到结果的映射
+        """
+        results = await asyncio.gather(*(method(code) for code in etf_codes),
+                                       return_exceptions=return_exceptions)
+        return dict(zip(etf_codes, results))
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """
+        在同步代码（Flask视图、离线批处理脚本）中运行协程
+
+        Args:
+            coro: 要运行的协程，如client.map(client.get_historical_data, codes)
+            timeout: 超时时间（秒），超时后取消所有未完成的请求并抛出asyncio.TimeoutError
+
+        Returns:
+            协程的返回值
+        """
+        if timeout is not None:
+            coro = asyncio.wait_for(coro, timeout)
+        return asyncio.run(coro)
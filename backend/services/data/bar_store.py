@@ -0,0 +1,361 @@
+"""
+日线行情列式存储
+每只ETF一个npz文件，按列保存强类型数组（datetime64/float64/int64），
+读取时直接由数组构建DataFrame，避免逐行JSON解析和Python对象创建。
+文件内同时记录已缓存的日期区间，新数据按区间合并，任意窗口均可由合并后的序列切片得到
+"""
+
+import os
+import logging
+import tempfile
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+from .cache_file import KeyLocks
+
+logger = logging.getLogger(__name__)
+
+# 输出列顺序（与Tushare日线格式保持一致）
+BAR_COLUMNS = ['ts_code', 'trade_date', 'open', 'high', 'low', 'close',
+               'pre_close', 'change', 'pct_chg', 'vol', 'amount', 'amplitude']
+
+# 各数值列的存储类型
+FLOAT_COLUMNS = ['open', 'high', 'low', 'close', 'pre_close', 'change',
+                 'pct_chg', 'amount', 'amplitude']
+INT_COLUMNS = ['vol']
+
+# 文件格式版本，格式不兼容时递增，旧文件视为未命中（版本3起保存不复权价格）
+STORE_FORMAT_VERSION = 3
+
+
+def compute_price_fields(open_: np.ndarray, high: np.ndarray, low: np.ndarray,
+                         close: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    根据按交易日升序排列的OHLC数组计算前收盘价、涨跌额、涨跌幅和振幅
+
+    Returns:
+        Tuple: (pre_close, change, pct_chg, amplitude)
+    """
+    pre_close = np.empty_like(close)
+    if len(close):
+        # 第一个数据的前收盘价设为开盘价
+        pre_close[0] = open_[0]
+        pre_close[1:] = close[:-1]
+
+    change = close - pre_close
+    return pre_close, change, change / pre_close * 100, (high - low) / pre_close * 100
+
+
+def derive_price_fields(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    根据OHLC计算前收盘价、涨跌额、涨跌幅和振幅
+
+    Args:
+        df: 按交易日升序排列的日线数据
+
+    Returns:
+        DataFrame: 补充派生列后的数据（原地修改）
+    """
+    df['pre_close'], df['change'], df['pct_chg'], df['amplitude'] = compute_price_fields(
+        *(df[column].to_numpy(dtype=np.float64) for column in ('open', 'high', 'low', 'close')))
+    return df
+
+
+def _next_day(date_str: str) -> str:
+    """获取下一个自然日 (YYYYMMDD格式)"""
+    return (datetime.strptime(date_str, '%Y%m%d') + timedelta(days=1)).strftime('%Y%m%d')
+
+
+def _prev_day(date_str: str) -> str:
+    """获取上一个自然日 (YYYYMMDD格式)"""
+    return (datetime.strptime(date_str, '%Y%m%d') - timedelta(days=1)).strftime('%Y%m%d')
+
+
+def merge_intervals(intervals: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """
+    合并重叠或相邻的日期区间
+
+    Args:
+        intervals: 日期区间列表，元素为(开始日期, 结束日期)
+
+    Returns:
+        按开始日期排序、互不相邻的区间列表
+    """
+    merged: List[Tuple[str, str]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= _next_day(merged[-1][1]):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_intervals(start_date: str, end_date: str,
+                       intervals: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """
+    计算日期窗口中未被区间覆盖的部分
+
+    Args:
+        start_date: 窗口开始日期
+        end_date: 窗口结束日期
+        intervals: 已合并的覆盖区间列表
+
+    Returns:
+        未覆盖的日期区间列表（头部、尾部或中间缺口）
+    """
+    missing: List[Tuple[str, str]] = []
+    cursor = start_date
+    for covered_start, covered_end in intervals:
+        if covered_end < cursor:
+            continue
+        if covered_start > end_date:
+            break
+        if covered_start > cursor:
+            missing.append((cursor, _prev_day(covered_start)))
+        cursor = _next_day(covered_end)
+        if cursor > end_date:
+            return missing
+    if cursor <= end_date:
+        missing.append((cursor, end_date))
+    return missing
+
+
+class BarStore:
+    """日线行情列式存储 - 每只ETF一个文件"""
+
+    def __init__(self, store_dir: str, locks: Optional[KeyLocks] = None):
+        """
+        初始化列式存储
+
+        Args:
+            store_dir: 存储目录路径
+            locks: 跨进程的按键锁，用于串行化同一ETF的读-改-写合并；不指定时不加锁
+        """
+        self.store_dir = store_dir
+        self.locks = locks
+        os.makedirs(store_dir, exist_ok=True)
+
+    def file_path(self, etf_code: str) -> str:
+        """获取ETF对应的存储文件路径"""
+        return os.path.join(self.store_dir, f"{etf_code}.npz")
+
+    def _load_arrays(self, etf_code: str) -> Optional[Dict[str, np.ndarray]]:
+        """
+        加载ETF的全部列数组
+
+        Args:
+            etf_code: ETF代码
+
+        Returns:
+            列名到数组的映射，文件不存在或损坏时返回None
+        """
+        bar_file = self.file_path(etf_code)
+        if not os.path.exists(bar_file):
+            return None
+
+        try:
+            with np.load(bar_file, allow_pickle=False) as npz:
+                arrays = {name: npz[name] for name in npz.files}
+        except (OSError, ValueError) as e:
+            logger.warning(f"行情存储文件损坏，已删除: {bar_file}, 错误: {e}")
+            try:
+                os.remove(bar_file)
+            except OSError:
+                pass
+            return None
+
+        if int(arrays.get('format_version', 0)) != STORE_FORMAT_VERSION:
+            logger.info(f"行情存储文件格式版本不匹配，视为未命中: {bar_file}")
+            return None
+        return arrays
+
+    @staticmethod
+    def _covered_intervals(arrays: Dict[str, np.ndarray]) -> List[Tuple[str, str]]:
+        """从存储数组中解析覆盖区间"""
+        return [(str(start), str(end)) for start, end in arrays['covered'].reshape(-1, 2)]
+
+    def get_coverage(self, etf_code: str) -> List[Tuple[str, str]]:
+        """
+        获取ETF已缓存的日期区间
+
+        Args:
+            etf_code: ETF代码
+
+        Returns:
+            覆盖区间列表，元素为(开始日期, 结束日期)，YYYYMMDD格式；无缓存返回空列表
+        """
+        arrays = self._load_arrays(etf_code)
+        if arrays is None:
+            return []
+        return self._covered_intervals(arrays)
+
+    def list_codes(self) -> List[str]:
+        """
+        列出已缓存日线数据的ETF代码
+
+        Returns:
+            List[str]: ETF代码列表
+        """
+        try:
+            return sorted(f[:-len('.npz')] for f in os.listdir(self.store_dir) if f.endswith('.npz'))
+        except OSError:
+            return []
+
+    def load_series(self, etf_code: str) -> Tuple[Optional[pd.DataFrame], List[Tuple[str, str]]]:
+        """
+        读取ETF的完整日线序列及覆盖区间
+
+        Args:
+            etf_code: ETF代码
+
+        Returns:
+            (完整日线数据, 覆盖区间列表)；无缓存时返回(None, [])
+        """
+        arrays = self._load_arrays(etf_code)
+        if arrays is None:
+            return None, []
+        return self._frame_from_arrays(etf_code, arrays), self._covered_intervals(arrays)
+
+    def missing_ranges(self, etf_code: str, start_date: str, end_date: str) -> List[Tuple[str, str]]:
+        """
+        计算日期窗口中尚未缓存的区间
+
+        Args:
+            etf_code: ETF代码
+            start_date: 开始日期 (YYYYMMDD格式)
+            end_date: 结束日期 (YYYYMMDD格式)
+
+        Returns:
+            需要补充获取的日期区间列表
+        """
+        if start_date > end_date:
+            return []
+        return subtract_intervals(start_date, end_date, self.get_coverage(etf_code))
+
+    def read(self, etf_code: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        """
+        读取日期窗口内的日线数据
+
+        Args:
+            etf_code: ETF代码
+            start_date: 开始日期 (YYYYMMDD格式)
+            end_date: 结束日期 (YYYYMMDD格式)
+
+        Returns:
+            DataFrame: 日线数据；窗口未被缓存范围完整覆盖时返回None
+        """
+        arrays = self._load_arrays(etf_code)
+        if arrays is None:
+            return None
+
+        if subtract_intervals(start_date, end_date, self._covered_intervals(arrays)):
+            return None
+
+        return self._frame_from_arrays(etf_code, arrays, start_date, end_date)
+
+    def read_available(self, etf_code: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        """
+        读取日期窗口内已缓存的日线数据，不要求窗口被完整覆盖
+
+        Args:
+            etf_code: ETF代码
+            start_date: 开始日期 (YYYYMMDD格式)
+            end_date: 结束日期 (YYYYMMDD格式)
+
+        Returns:
+            DataFrame: 窗口内已有的日线数据；该ETF没有缓存时返回None
+        """
+        arrays = self._load_arrays(etf_code)
+        if arrays is None:
+            return None
+        return self._frame_from_arrays(etf_code, arrays, start_date, end_date)
+
+    def merge(self, etf_code: str, start_date: str, end_date: str, df: Optional[pd.DataFrame]):
+        """
+        将新获取的日线数据合并进该ETF的序列
+
+        同一交易日以新数据为准，合并后重新计算派生列，并把[start_date, end_date]
+        记为已覆盖（即使该区间没有任何K线，例如节假日）
+
+        Args:
+            etf_code: ETF代码
+            start_date: 本次数据覆盖的开始日期 (YYYYMMDD格式)
+            end_date: 本次数据覆盖的结束日期 (YYYYMMDD格式)
+            df: 日线数据，列格式同BAR_COLUMNS；可以为空
+        """
+        # 其他进程可能同时合并同一ETF，加锁避免后写入者覆盖先写入者的数据和覆盖区间
+        with self.locks.lock(self.file_path(etf_code)) if self.locks else nullcontext():
+            self._merge(etf_code, start_date, end_date, df)
+
+    def _merge(self, etf_code: str, start_date: str, end_date: str, df: Optional[pd.DataFrame]):
+        """在锁内读取现有序列、合并并写回"""
+        arrays = self._load_arrays(etf_code)
+        intervals = self._covered_intervals(arrays) if arrays is not None else []
+        intervals = merge_intervals(intervals + [(start_date, end_date)])
+
+        frames = []
+        if arrays is not None and len(arrays['trade_date']):
+            frames.append(self._frame_from_arrays(etf_code, arrays))
+        if df is not None and not df.empty:
+            frames.append(df[BAR_COLUMNS])
+
+        if frames:
+            merged = pd.concat(frames, ignore_index=True)
+            merged = merged.drop_duplicates('trade_date', keep='last').sort_values('trade_date')
+            merged = derive_price_fields(merged.reset_index(drop=True))
+        else:
+            merged = pd.DataFrame({column: [] for column in BAR_COLUMNS})
+
+        self._write(etf_code, intervals, merged)
+
+    def _write(self, etf_code: str, intervals: List[Tuple[str, str]], df: pd.DataFrame):
+        """写入该ETF的完整序列和覆盖区间"""
+        arrays = {
+            'format_version': np.array(STORE_FORMAT_VERSION, dtype=np.int64),
+            'covered': np.array(intervals, dtype='U8').reshape(-1, 2),
+            'trade_date': df['trade_date'].to_numpy(dtype='datetime64[ns]').view(np.int64),
+        }
+        for column in FLOAT_COLUMNS:
+            arrays[column] = df[column].to_numpy(dtype=np.float64)
+        for column in INT_COLUMNS:
+            arrays[column] = df[column].to_numpy(dtype=np.int64)
+
+        self._atomic_save(self.file_path(etf_code), arrays)
+
+    def _atomic_save(self, bar_file: str, arrays: Dict[str, np.ndarray]):
+        """先写临时文件再重命名，保证读取方不会看到写了一半的文件"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.store_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, bar_file)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    @staticmethod
+    def _frame_from_arrays(etf_code: str, arrays: Dict[str, np.ndarray],
+                           start_date: Optional[str] = None,
+                           end_date: Optional[str] = None) -> pd.DataFrame:
+        """按日期窗口切片并构建DataFrame，未指定日期时返回全部数据"""
+        trade_date = arrays['trade_date'].view('datetime64[ns]')
+        lo, hi = 0, len(trade_date)
+        if start_date is not None:
+            lo = np.searchsorted(trade_date, np.datetime64(pd.Timestamp(start_date), 'ns'), side='left')
+        if end_date is not None:
+            hi = np.searchsorted(trade_date, np.datetime64(pd.Timestamp(end_date), 'ns'), side='right')
+
+        columns = {
+            'ts_code': np.full(hi - lo, etf_code, dtype=object),
+            'trade_date': trade_date[lo:hi],
+        }
+        for column in BAR_COLUMNS[2:]:
+            columns[column] = arrays[column][lo:hi]
+
+        return pd.DataFrame(columns, columns=BAR_COLUMNS)
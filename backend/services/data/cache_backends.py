@@ -0,0 +1,494 @@
+"""
+永久缓存和交易日缓存的存储后端
+实现CacheInterface的三种后端：
+- memory: 进程内字典，不落盘（开发和测试）
+- file: 现有的文件布局，每个条目一个JSON文件或每个层级/交易日一个包文件
+- sqlite: 单个SQLite数据库（WAL模式），按键索引查找，过期时间上有索引，多进程并发读取；
+  数据库文件不在缓存清单的层级中，容量上限由后端自己执行
+
+缓存键格式与内存缓存层一致：
+    permanent:{类型}:{键}
+    daily:{交易日}:{类型}:{键}
+"""
+
+import os
+import time
+import sqlite3
+import weakref
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..interfaces import CacheInterface
+from .cache_file import KeyLocks, CacheEntryCorrupt, read_entry_meta, read_entry_expiry, write_entry
+from .cache_bundle import CacheBundle, BUNDLE_SUFFIX, encode_value, decode_value
+from .cache_manifest import CacheManifest
+from .sqlite_connection import SQLiteConnection
+
+logger = logging.getLogger(__name__)
+
+# 可选的缓存后端
+CACHE_BACKENDS = ('memory', 'file', 'sqlite')
+
+# 文件后端的存储方式：files为每个条目一个JSON文件，bundle为每个层级/交易日一个包文件
+STORAGE_LAYOUTS = ('files', 'bundle')
+
+# 包文件名（永久缓存目录下一个，每个交易日目录下一个）
+BUNDLE_FILE_NAME = f"entries{BUNDLE_SUFFIX}"
+
+# SQLite后端的数据库文件名
+SQLITE_DB_NAME = "cache.db"
+
+# SQLite后端的容量上限(MB)：数据库文件不在缓存清单中，由后端自行按该上限淘汰条目
+SQLITE_MAX_MB = float(os.getenv('CACHE_SQLITE_MAX_MB', 512))
+
+
+def _expires_at(expire: int) -> float:
+    """有效期(秒)转为过期时间戳，0表示不过期"""
+    return time.time() + expire if expire and expire > 0 else 0.0
+
+
+def _expired(expires_at: float, now: Optional[float] = None) -> bool:
+    return bool(expires_at) and expires_at <= (now or time.time())
+
+
+class MemoryCacheBackend(CacheInterface):
+    """进程内字典后端（不持久化，各进程互不共享）"""
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[Any, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or _expired(entry[1]):
+            return None
+        return entry[0]
+
+    def set(self, key: str, value: Any, expire: int = 3600) -> bool:
+        with self._lock:
+            self._entries[key] = (value, _expires_at(expire))
+        return True
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def keys(self, prefix: str) -> List[str]:
+        now = time.time()
+        with self._lock:
+            return [key for key, (_, expires_at) in self._entries.items()
+                    if key.startswith(prefix) and not _expired(expires_at, now)]
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        """删除已过期的条目，返回删除数量"""
+        now = now or time.time()
+        with self._lock:
+            expired = [key for key, (_, expires_at) in self._entries.items() if _expired(expires_at, now)]
+            for key in expired:
+                del self._entries[key]
+        return len(expired)
+
+    def get_stats(self) -> Dict:
+        return {'backend': 'memory', 'entries': len(self._entries)}
+
+
+class FileCacheBackend(CacheInterface):
+    """文件后端：permanent/和daily/{交易日}/目录下的JSON文件或包文件"""
+
+    def __init__(self, cache_dir: str, locks: KeyLocks, manifest: CacheManifest,
+                 storage_layout: str = 'files'):
+        """
+        初始化文件后端
+
+        Args:
+            cache_dir: 缓存根目录
+            locks: 跨进程按键锁
+            manifest: 缓存文件清单（记录写入、访问和删除）
+            storage_layout: 存储方式(files或bundle)
+        """
+        if storage_layout not in STORAGE_LAYOUTS:
+            raise ValueError(f"不支持的缓存存储方式: {storage_layout}")
+        self.cache_dir = cache_dir
+        self.locks = locks
+        self.manifest = manifest
+        self.storage_layout = storage_layout
+        self._bundles: Dict[str, CacheBundle] = {}
+        self._bundles_lock = threading.Lock()
+
+    def _locate(self, key: str) -> Tuple[str, str, str]:
+        """
+        解析缓存键
+
+        Returns:
+            (条目目录, 类型, 键)
+        """
+        parts = key.split(':', 3)
+        if parts[0] == 'permanent' and len(parts) >= 3:
+            return os.path.join(self.cache_dir, 'permanent'), parts[1], ':'.join(parts[2:])
+        if parts[0] == 'daily' and len(parts) == 4:
+            return os.path.join(self.cache_dir, 'daily', parts[1]), parts[2], parts[3]
+        raise ValueError(f"文件缓存后端不支持的缓存键: {key}")
+
+    def _get_bundle(self, bundle_path: str) -> CacheBundle:
+        """获取包文件对象（每个包文件在进程内只维护一份索引）"""
+        with self._bundles_lock:
+            bundle = self._bundles.get(bundle_path)
+            if bundle is None:
+                bundle = CacheBundle(bundle_path, self.locks)
+                self._bundles[bundle_path] = bundle
+            return bundle
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        读取缓存条目
+
+        bundle方式未命中时仍读取同名JSON文件，切换存储方式前写入的缓存继续有效
+        """
+        entry_dir, cache_type, name = self._locate(key)
+        if self.storage_layout == 'bundle':
+            bundle_path = os.path.join(entry_dir, BUNDLE_FILE_NAME)
+            try:
+                data = self._get_bundle(bundle_path).get(f"{cache_type}:{name}")
+            except OSError as e:
+                logger.warning(f"读取缓存包失败: {bundle_path}, 错误: {e}")
+                data = None
+            if data is not None:
+                self.manifest.record_access(bundle_path)
+                return data
+        return self._safe_load_cache(os.path.join(entry_dir, f"{cache_type}_{name}.json"))
+
+    def set(self, key: str, value: Any, expire: int = 3600) -> bool:
+        entry_dir, cache_type, name = self._locate(key)
+        expires_at = _expires_at(expire)
+        if self.storage_layout == 'bundle':
+            bundle_path = os.path.join(entry_dir, BUNDLE_FILE_NAME)
+            try:
+                self._get_bundle(bundle_path).set(f"{cache_type}:{name}", value, expires_at)
+                self.manifest.record_write(bundle_path)
+                return True
+            except Exception as e:
+                logger.error(f"缓存保存失败: {bundle_path}, 错误: {e}")
+                return False
+        return self._safe_save_cache(os.path.join(entry_dir, f"{cache_type}_{name}.json"), value, expires_at)
+
+    def delete(self, key: str) -> bool:
+        entry_dir, cache_type, name = self._locate(key)
+        cache_file = os.path.join(entry_dir, f"{cache_type}_{name}.json")
+        with self.locks.lock(cache_file):
+            try:
+                os.remove(cache_file)
+            except FileNotFoundError:
+                return False
+        self.manifest.record_delete(cache_file)
+        return True
+
+    def keys(self, prefix: str) -> List[str]:
+        """
+        列出缓存键
+
+        Args:
+            prefix: 需包含到类型为止，如 daily:20240105:price:
+        """
+        entry_dir, cache_type, name_prefix = self._locate(prefix)
+        file_prefix = f"{cache_type}_{name_prefix}"
+        key_prefix = prefix[:len(prefix) - len(name_prefix)]
+        try:
+            file_names = os.listdir(entry_dir)
+        except OSError:
+            return []
+        now = time.time()
+        names = {file_name[len(cache_type) + 1:-len('.json')] for file_name in file_names
+                 if file_name.startswith(file_prefix) and file_name.endswith('.json') and
+                 not self._file_expired(os.path.join(entry_dir, file_name), now)}
+        if BUNDLE_FILE_NAME in file_names:
+            bundle_prefix = f"{cache_type}:"
+            names.update(bundle_key[len(bundle_prefix):] for bundle_key in
+                         self._get_bundle(os.path.join(entry_dir, BUNDLE_FILE_NAME)).keys(bundle_prefix + name_prefix))
+        return sorted(key_prefix + name for name in names)
+
+    @staticmethod
+    def _file_expired(cache_file: str, now: float) -> bool:
+        try:
+            return _expired(read_entry_expiry(cache_file), now)
+        except OSError:
+            return True
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        """
+        删除已过期的JSON条目文件（如短期有效的不存在记录），返回删除数量
+
+        只读取文件头部中的过期时间；删除前在该键的锁内重新检查，其他进程可能刚好重新写入。
+        包文件中的过期条目在读取时忽略，随包文件压缩清理
+        """
+        now = now or time.time()
+        entry_dirs = [os.path.join(self.cache_dir, 'permanent')]
+        daily_dir = os.path.join(self.cache_dir, 'daily')
+        try:
+            entry_dirs.extend(os.path.join(daily_dir, name) for name in sorted(os.listdir(daily_dir)))
+        except OSError:
+            pass
+
+        purged = 0
+        for entry_dir in entry_dirs:
+            try:
+                file_names = os.listdir(entry_dir)
+            except OSError:
+                continue
+            for file_name in file_names:
+                cache_file = os.path.join(entry_dir, file_name)
+                if not file_name.endswith('.json') or not self._file_expired(cache_file, now):
+                    continue
+                with self.locks.lock(cache_file):
+                    if not self._file_expired(cache_file, now):
+                        continue
+                    try:
+                        os.remove(cache_file)
+                    except FileNotFoundError:
+                        continue
+                    except OSError as e:
+                        logger.warning(f"删除过期缓存文件失败: {cache_file}, 错误: {e}")
+                        continue
+                self.manifest.record_delete(cache_file)
+                purged += 1
+        return purged
+
+    def get_stats(self) -> Dict:
+        return {'backend': 'file', 'storage_layout': self.storage_layout}
+
+    def _safe_load_cache(self, cache_file: str) -> Optional[Any]:
+        """安全加载缓存文件，过期或不存在时返回None"""
+        try:
+            data, expires_at = read_entry_meta(cache_file)
+        except FileNotFoundError:
+            return None
+        except CacheEntryCorrupt:
+            return self._recover_corrupt_cache(cache_file)
+        except OSError as e:
+            logger.warning(f"读取缓存文件失败: {cache_file}, 错误: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"加载缓存文件异常: {cache_file}, 错误: {e}")
+            return None
+        if _expired(expires_at):
+            return None
+        self.manifest.record_access(cache_file)
+        return data
+
+    def _recover_corrupt_cache(self, cache_file: str) -> Optional[Any]:
+        """
+        处理校验失败的缓存文件
+
+        在该键的锁内重新读取：其他进程可能刚好完成替换，此时直接使用新文件；
+        仍然损坏才删除并返回None
+        """
+        with self.locks.lock(cache_file):
+            try:
+                data, expires_at = read_entry_meta(cache_file)
+                return None if _expired(expires_at) else data
+            except FileNotFoundError:
+                return None
+            except (CacheEntryCorrupt, OSError) as e:
+                logger.warning(f"缓存文件损坏，已删除: {cache_file}, 错误: {e}")
+                try:
+                    os.remove(cache_file)
+                except OSError:
+                    pass
+                self.manifest.record_delete(cache_file)
+                return None
+
+    def _safe_save_cache(self, cache_file: str, data: Any, expires_at: float) -> bool:
+        """安全保存缓存文件：写临时文件后原子重命名，读取方不会看到写了一半的文件"""
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            with self.locks.lock(cache_file):
+                write_entry(cache_file, data, expires_at)
+                self.manifest.record_write(cache_file)
+            return True
+        except Exception as e:
+            logger.error(f"缓存保存失败: {cache_file}, 错误: {e}")
+            return False
+
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    codec INTEGER NOT NULL,
+    value BLOB NOT NULL,
+    expires_at REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_cache_entries_expires ON cache_entries (expires_at) WHERE expires_at > 0;
+"""
+
+# 键范围查询的上界后缀
+_KEY_RANGE_END = '\U0010ffff'
+
+
+class SQLiteCacheBackend(CacheInterface):
+    """SQLite后端：单个数据库文件，WAL模式下多进程并发读取"""
+
+    def __init__(self, db_path: str, max_mb: Optional[float] = SQLITE_MAX_MB):
+        """
+        打开或创建缓存数据库
+
+        Args:
+            db_path: 数据库文件路径
+            max_mb: 条目数据的容量上限(MB)，None表示不限制
+        """
+        self.db_path = db_path
+        self.max_mb = max_mb
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._db = SQLiteConnection(db_path)
+        weakref.finalize(self, self._db.close)
+        with self._db.connect() as conn, conn:
+            conn.executescript(_SQLITE_SCHEMA)
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            with self._db.connect() as conn:
+                row = conn.execute(
+                    "SELECT codec, value, expires_at FROM cache_entries WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"读取SQLite缓存失败: {key}, 错误: {e}")
+            return None
+        if row is None or _expired(row[2]):
+            return None
+        try:
+            return decode_value(row[0], row[1])
+        except (ValueError, EOFError, TypeError) as e:
+            logger.warning(f"SQLite缓存条目无法解析: {key}, 错误: {e}")
+            return None
+
+    def set(self, key: str, value: Any, expire: int = 3600) -> bool:
+        codec, payload = encode_value(value)
+        try:
+            with self._db.connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries (key, codec, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (key, codec, payload, _expires_at(expire))
+                )
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"SQLite缓存保存失败: {key}, 错误: {e}")
+            return False
+
+    def delete(self, key: str) -> bool:
+        try:
+            with self._db.connect() as conn:
+                return conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,)).rowcount > 0
+        except sqlite3.Error as e:
+            logger.warning(f"删除SQLite缓存失败: {key}, 错误: {e}")
+            return False
+
+    def keys(self, prefix: str) -> List[str]:
+        try:
+            with self._db.connect() as conn:
+                rows = conn.execute(
+                    "SELECT key FROM cache_entries WHERE key >= ? AND key < ? AND (expires_at = 0 OR expires_at > ?) "
+                    "ORDER BY key", (prefix, prefix + _KEY_RANGE_END, time.time())
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"列出SQLite缓存键失败: {prefix}, 错误: {e}")
+            return []
+        return [key for key, in rows]
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        """
+        按过期时间索引删除已过期的条目，再按容量上限淘汰条目，返回删除数量
+
+        由缓存淘汰任务定期调用（数据库文件不在缓存清单中，清单的层级上限管不到它）
+        """
+        try:
+            with self._db.connect() as conn:
+                purged = conn.execute(
+                    "DELETE FROM cache_entries WHERE expires_at > 0 AND expires_at <= ?", (now or time.time(),)
+                ).rowcount
+        except sqlite3.Error as e:
+            logger.warning(f"清理过期SQLite缓存失败: {e}")
+            purged = 0
+        return purged + self.enforce_size_limit()
+
+    def _used_bytes(self) -> int:
+        """数据库中已使用的页面字节数（删除条目后空闲页留在文件中供后续写入复用）"""
+        with self._db.connect() as conn:
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            freelist_count = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return (page_count - freelist_count) * page_size
+
+    def enforce_size_limit(self) -> int:
+        """
+        已用空间超过容量上限时淘汰条目：先删除最早交易日的交易日缓存，
+        仍超出时再删除最早过期的有期限永久条目；不过期的永久条目不淘汰
+
+        Returns:
+            int: 删除的条目数
+        """
+        if self.max_mb is None:
+            return 0
+        try:
+            with self._db.connect() as conn:
+                excess = self._used_bytes() - int(self.max_mb * 1024 * 1024)
+                if excess <= 0:
+                    return 0
+                candidates = conn.execute(
+                    "SELECT key, LENGTH(key) + LENGTH(value) FROM cache_entries WHERE key >= ? AND key < ? "
+                    "ORDER BY key", ('daily:', 'daily:' + _KEY_RANGE_END)
+                ).fetchall()
+                candidates += conn.execute(
+                    "SELECT key, LENGTH(key) + LENGTH(value) FROM cache_entries WHERE expires_at > 0 AND key >= ? "
+                    "AND key < ? ORDER BY expires_at", ('permanent:', 'permanent:' + _KEY_RANGE_END)
+                ).fetchall()
+                selected = []
+                for key, size in candidates:
+                    if excess <= 0:
+                        break
+                    selected.append((key,))
+                    excess -= size
+                with conn:
+                    conn.executemany("DELETE FROM cache_entries WHERE key = ?", selected)
+        except sqlite3.Error as e:
+            logger.warning(f"SQLite缓存容量淘汰失败: {e}")
+            return 0
+        if excess > 0:
+            logger.warning(f"SQLite缓存超出容量上限{self.max_mb}MB，剩余条目均为不过期的永久缓存")
+        if selected:
+            logger.info(f"SQLite缓存超出容量上限{self.max_mb}MB，已淘汰{len(selected)}个条目")
+        return len(selected)
+
+    def get_stats(self) -> Dict:
+        size = sum(os.path.getsize(path) for path in (self.db_path, f"{self.db_path}-wal") if os.path.exists(path))
+        stats = {'backend': 'sqlite', 'db_path': self.db_path, 'entries': None,
+                 'total_size_mb': round(size / 1024 / 1024, 2), 'max_mb': self.max_mb}
+        try:
+            with self._db.connect() as conn:
+                stats['entries'] = conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+        except sqlite3.Error as e:
+            logger.warning(f"获取SQLite缓存统计失败: {e}")
+            stats['error'] = str(e)
+        return stats
+
+
+def create_cache_backend(name: str, cache_dir: str, locks: KeyLocks, manifest: CacheManifest,
+                         storage_layout: str = 'files') -> CacheInterface:
+    """
+    按名称创建缓存后端
+
+    Args:
+        name: 后端名称，见CACHE_BACKENDS
+        cache_dir: 缓存根目录
+        locks: 跨进程按键锁（文件后端）
+        manifest: 缓存文件清单（文件后端）
+        storage_layout: 文件后端的存储方式
+
+    Returns:
+        CacheInterface: 缓存后端
+    """
+    if name == 'memory':
+        return MemoryCacheBackend()
+    if name == 'file':
+        return FileCacheBackend(cache_dir, locks, manifest, storage_layout)
+    if name == 'sqlite':
+        return SQLiteCacheBackend(os.path.join(cache_dir, SQLITE_DB_NAME))
+    raise ValueError(f"不支持的缓存后端: {name}，可选: {', '.join(CACHE_BACKENDS)}")
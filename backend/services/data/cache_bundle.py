@@ -0,0 +1,242 @@
+"""
+缓存条目打包存储
+把一个层级（永久缓存）或一个交易日（交易日缓存）的全部小条目追加写入同一个包文件，
+条目以紧凑的二进制格式序列化，按键随机读取，避免成千上万个小JSON文件。
+
+包文件由连续的记录组成，每条记录为：
+    头部 (CRC32, 键长度, 值长度, 编码, 过期时间) + 键(UTF-8) + 值
+同一个键的新记录覆盖旧记录。各进程在内存中维护 键 -> (偏移, 长度) 索引，
+文件增长时只扫描新增部分的记录头；失效记录过多时重写为只含最新记录的新文件
+"""
+
+import os
+import time
+import zlib
+import struct
+import marshal
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache_file import KeyLocks, atomic_write_bytes
+
+try:
+    import msgpack
+except ImportError:  # 可选依赖，未安装时使用标准库marshal
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+# 包文件后缀
+BUNDLE_SUFFIX = '.bundle'
+
+# 记录头：CRC32(键+值)、键长度、值长度、值编码、过期时间戳(0表示不过期)
+_RECORD_HEADER = struct.Struct('<IHIBd')
+
+# 值编码
+CODEC_MARSHAL = 1
+CODEC_MSGPACK = 2
+
+# 失效记录占比超过该比例且文件超过最小大小时重写包文件
+COMPACT_DEAD_RATIO = 0.5
+COMPACT_MIN_BYTES = 1024 * 1024
+
+
+def _to_plain(value: Any) -> Any:
+    """把不能直接序列化的值（如Timestamp）转为字符串，与JSON缓存的default=str一致"""
+    if isinstance(value, dict):
+        return {str(k): _to_plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_plain(v) for v in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def encode_value(data: Any) -> Tuple[int, bytes]:
+    """
+    以紧凑二进制格式序列化缓存值
+
+    Args:
+        data: 缓存数据（字典、列表及基本类型）
+
+    Returns:
+        (编码, 字节串)
+    """
+    data = _to_plain(data)
+    if msgpack is not None:
+        return CODEC_MSGPACK, msgpack.packb(data, use_bin_type=True)
+    return CODEC_MARSHAL, marshal.dumps(data, 4)
+
+
+def decode_value(codec: int, payload: bytes) -> Any:
+    """
+    反序列化缓存值
+
+    Args:
+        codec: 编码
+        payload: 字节串
+
+    Returns:
+        缓存数据
+
+    Raises:
+        ValueError: 编码不受支持或内容无效
+    """
+    if codec == CODEC_MSGPACK:
+        if msgpack is None:
+            raise ValueError("缓存包含msgpack编码的条目，但未安装msgpack")
+        return msgpack.unpackb(payload, raw=False)
+    if codec == CODEC_MARSHAL:
+        return marshal.loads(payload)
+    raise ValueError(f"不支持的缓存条目编码: {codec}")
+
+
+class CacheBundle:
+    """单个包文件：追加写入，按键随机读取"""
+
+    def __init__(self, path: str, locks: KeyLocks):
+        """
+        初始化包文件
+
+        Args:
+            path: 包文件路径
+            locks: 跨进程按键锁（以包文件路径为键串行化写入）
+        """
+        self.path = path
+        self.locks = locks
+        self._lock = threading.Lock()
+        self._index: Dict[str, Tuple[int, int, int, float]] = {}  # 键 -> (值偏移, 值长度, 编码, 过期时间)
+        self._scanned = 0
+        self._inode: Optional[int] = None
+        self._dead_bytes = 0
+
+    def _refresh(self) -> bool:
+        """
+        同步索引与文件：文件被替换（重写或删除）时重建，文件增长时扫描新增的记录
+
+        Returns:
+            bool: 包文件是否存在
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._index, self._scanned, self._inode, self._dead_bytes = {}, 0, None, 0
+            return False
+        if stat.st_ino != self._inode or stat.st_size < self._scanned:
+            self._index, self._scanned, self._inode, self._dead_bytes = {}, 0, stat.st_ino, 0
+        if stat.st_size > self._scanned:
+            with open(self.path, 'rb') as f:
+                f.seek(self._scanned)
+                self._scan(f.read(stat.st_size - self._scanned))
+        return True
+
+    def _scan(self, chunk: bytes):
+        """解析新增部分的记录，遇到不完整或校验失败的记录时停止（可能正被其他进程写入）"""
+        pos = 0
+        while pos + _RECORD_HEADER.size <= len(chunk):
+            checksum, key_len, value_len, codec, expires_at = _RECORD_HEADER.unpack_from(chunk, pos)
+            body_start = pos + _RECORD_HEADER.size
+            body_end = body_start + key_len + value_len
+            if body_end > len(chunk) or zlib.crc32(chunk[body_start:body_end]) != checksum:
+                break
+            key = chunk[body_start:body_start + key_len].decode('utf-8')
+            previous = self._index.get(key)
+            if previous is not None:
+                self._dead_bytes += _RECORD_HEADER.size + len(key.encode('utf-8')) + previous[1]
+            self._index[key] = (self._scanned + body_start + key_len, value_len, codec, expires_at)
+            pos = body_end
+        self._scanned += pos
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        按键读取条目
+
+        Args:
+            key: 条目键
+
+        Returns:
+            缓存数据，不存在时返回None
+        """
+        with self._lock:
+            if not self._refresh():
+                return None
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+            offset, length, codec, expires_at = entry
+            if expires_at and expires_at <= time.time():
+                return None
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                payload = f.read(length)
+        if len(payload) != length:
+            return None
+        try:
+            return decode_value(codec, payload)
+        except (ValueError, EOFError, TypeError) as e:
+            logger.warning(f"缓存包条目无法解析: {self.path} {key}, 错误: {e}")
+            return None
+
+    def set(self, key: str, data: Any, expires_at: float = 0):
+        """
+        追加写入条目（同一键的旧记录失效）
+
+        Args:
+            key: 条目键
+            data: 缓存数据
+            expires_at: 过期时间戳，0表示不过期
+        """
+        codec, payload = encode_value(data)
+        key_bytes = key.encode('utf-8')
+        body = key_bytes + payload
+        record = _RECORD_HEADER.pack(zlib.crc32(body), len(key_bytes), len(payload), codec, expires_at) + body
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self.locks.lock(self.path), self._lock:
+            # 持锁时先同步索引，丢弃其他进程异常退出留下的不完整尾部，再追加
+            self._refresh()
+            with open(self.path, 'ab') as f:
+                if f.tell() != self._scanned:
+                    f.truncate(self._scanned)
+                f.write(record)
+            self._refresh()
+            if self._should_compact():
+                self._compact()
+
+    def keys(self, prefix: str = '') -> List[str]:
+        """
+        列出所有键
+
+        Args:
+            prefix: 只返回以该前缀开头的键
+
+        Returns:
+            List[str]: 键列表
+        """
+        now = time.time()
+        with self._lock:
+            self._refresh()
+            return [key for key, entry in self._index.items()
+                    if key.startswith(prefix) and not (entry[3] and entry[3] <= now)]
+
+    def _should_compact(self) -> bool:
+        return self._scanned >= COMPACT_MIN_BYTES and self._dead_bytes > self._scanned * COMPACT_DEAD_RATIO
+
+    def _compact(self):
+        """只保留每个键未过期的最新记录，原子替换包文件（调用方持有锁）"""
+        now = time.time()
+        records = []
+        with open(self.path, 'rb') as f:
+            for key, (offset, length, codec, expires_at) in self._index.items():
+                if expires_at and expires_at <= now:
+                    continue
+                f.seek(offset)
+                payload = f.read(length)
+                key_bytes = key.encode('utf-8')
+                body = key_bytes + payload
+                records.append(_RECORD_HEADER.pack(zlib.crc32(body), len(key_bytes), length, codec, expires_at) + body)
+        before = self._scanned
+        atomic_write_bytes(self.path, b''.join(records))
+        self._refresh()
+        logger.info(f"缓存包已重写: {self.path}, {before} -> {self._scanned}字节")
@@ -0,0 +1,240 @@
+"""
+缓存文件的原子写入与校验
+每个缓存文件以一行头部开始，记录格式版本、正文长度、CRC32校验值和可选的过期时间，正文为JSON；
+写入先落到同目录的临时文件再重命名，读取方只会看到完整的旧文件或新文件。
+同一缓存键的写入（以及读-改-写）由按键划分的进程锁加文件锁串行化，多个工作进程共用
+"""
+
+import os
+import json
+import zlib
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows下没有fcntl，退化为进程内锁
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 缓存文件头部：魔数 版本 正文长度 CRC32 [过期时间戳]
+ENTRY_MAGIC = b'ETFC'
+ENTRY_VERSION = 1
+
+# 锁文件数量（缓存键按哈希分配到固定数量的锁上，避免每个键一个锁文件）
+LOCK_STRIPES = 256
+
+
+class CacheEntryCorrupt(ValueError):
+    """缓存文件不完整或校验失败"""
+
+
+def encode_entry(data: Any, expires_at: float = 0) -> bytes:
+    """
+    序列化缓存数据并加上校验头
+
+    Args:
+        data: 可JSON序列化的数据
+        expires_at: 过期时间戳，0表示不过期
+
+    Returns:
+        bytes: 头部加正文
+    """
+    body = json.dumps(data, ensure_ascii=False, default=str).encode('utf-8')
+    header = b'%s %d %d %08x' % (ENTRY_MAGIC, ENTRY_VERSION, len(body), zlib.crc32(body))
+    if expires_at:
+        header += b' %.3f' % expires_at
+    return header + b'\n' + body
+
+
+def decode_entry(raw: bytes) -> Any:
+    """
+    校验并解析缓存文件内容（兼容没有头部的旧版JSON文件）
+
+    Args:
+        raw: 文件内容
+
+    Returns:
+        解析后的数据
+
+    Raises:
+        CacheEntryCorrupt: 长度或校验值不符、内容无法解析
+    """
+    return decode_entry_meta(raw)[0]
+
+
+def decode_entry_meta(raw: bytes) -> Tuple[Any, float]:
+    """
+    校验并解析缓存文件内容，同时返回过期时间
+
+    Args:
+        raw: 文件内容
+
+    Returns:
+        (解析后的数据, 过期时间戳)，过期时间为0表示不过期
+
+    Raises:
+        CacheEntryCorrupt: 长度或校验值不符、内容无法解析
+    """
+    if not raw.startswith(ENTRY_MAGIC):
+        try:
+            return json.loads(raw.decode('utf-8')), 0.0
+        except ValueError as e:
+            raise CacheEntryCorrupt(f"无法解析旧版缓存文件: {e}") from e
+
+    header, sep, body = raw.partition(b'\n')
+    try:
+        fields = header.split(b' ')
+        if len(fields) not in (4, 5):
+            raise ValueError("字段数量不符")
+        version, length, checksum = int(fields[1]), int(fields[2]), int(fields[3], 16)
+        expires_at = float(fields[4]) if len(fields) == 5 else 0.0
+    except ValueError as e:
+        raise CacheEntryCorrupt(f"缓存文件头部无效: {header[:64]!r}") from e
+    if version != ENTRY_VERSION:
+        raise CacheEntryCorrupt(f"不支持的缓存文件版本: {version}")
+    if not sep or len(body) != length:
+        raise CacheEntryCorrupt(f"缓存文件不完整: 期望{length}字节, 实际{len(body)}字节")
+    if zlib.crc32(body) != checksum:
+        raise CacheEntryCorrupt("缓存文件校验失败")
+    try:
+        return json.loads(body.decode('utf-8')), expires_at
+    except ValueError as e:
+        raise CacheEntryCorrupt(f"无法解析缓存文件: {e}") from e
+
+
+def read_entry(path: str) -> Any:
+    """
+    读取并校验缓存文件
+
+    Args:
+        path: 缓存文件路径
+
+    Returns:
+        解析后的数据
+
+    Raises:
+        FileNotFoundError: 文件不存在
+        CacheEntryCorrupt: 文件损坏
+    """
+    with open(path, 'rb') as f:
+        return decode_entry(f.read())
+
+
+def read_entry_meta(path: str) -> Tuple[Any, float]:
+    """
+    读取并校验缓存文件，同时返回过期时间
+
+    Args:
+        path: 缓存文件路径
+
+    Returns:
+        (解析后的数据, 过期时间戳)
+
+    Raises:
+        FileNotFoundError: 文件不存在
+        CacheEntryCorrupt: 文件损坏
+    """
+    with open(path, 'rb') as f:
+        return decode_entry_meta(f.read())
+
+
+def read_entry_expiry(path: str) -> float:
+    """
+    只读取缓存文件头部中的过期时间（列举缓存键时使用，不解析正文）
+
+    Args:
+        path: 缓存文件路径
+
+    Returns:
+        float: 过期时间戳，0表示不过期或没有头部
+    """
+    with open(path, 'rb') as f:
+        header = f.readline(128)
+    if not header.startswith(ENTRY_MAGIC):
+        return 0.0
+    fields = header.split()
+    try:
+        return float(fields[4]) if len(fields) == 5 else 0.0
+    except ValueError:
+        return 0.0
+
+
+def atomic_write_bytes(path: str, payload: bytes):
+    """
+    先写同目录的临时文件再重命名为目标文件
+
+    Args:
+        path: 目标文件路径
+        payload: 文件内容
+    """
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_entry(path: str, data: Any, expires_at: float = 0):
+    """
+    原子写入带校验头的缓存文件
+
+    Args:
+        path: 缓存文件路径
+        data: 可JSON序列化的数据
+        expires_at: 过期时间戳，0表示不过期
+    """
+    atomic_write_bytes(path, encode_entry(data, expires_at))
+
+
+class KeyLocks:
+    """按缓存键划分的跨进程咨询锁"""
+
+    def __init__(self, lock_dir: str, stripes: int = LOCK_STRIPES):
+        """
+        初始化锁集合
+
+        Args:
+            lock_dir: 锁文件目录（同一主机上的进程共用）
+            stripes: 锁文件数量
+        """
+        self.lock_dir = lock_dir
+        self.stripes = stripes
+        os.makedirs(lock_dir, exist_ok=True)
+        # 进程内先获取对应的线程锁（gevent下为协程锁），同进程的竞争者在此协作等待，
+        # 不会阻塞在文件锁上卡住整个工作进程
+        self._local_locks: List[threading.Lock] = [threading.Lock() for _ in range(stripes)]
+
+    def _stripe(self, key: str) -> int:
+        return zlib.crc32(key.encode('utf-8')) % self.stripes
+
+    @contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        """
+        独占某个缓存键
+
+        Args:
+            key: 缓存键（通常为缓存文件路径）
+        """
+        stripe = self._stripe(key)
+        with self._local_locks[stripe]:
+            if fcntl is None:
+                yield
+                return
+            fd = os.open(os.path.join(self.lock_dir, f"{stripe:03d}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                os.close(fd)  # 关闭文件即释放锁
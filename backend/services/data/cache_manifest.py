@@ -0,0 +1,461 @@
+"""
+缓存清单与自动淘汰
+用SQLite记录每个缓存文件的层级、大小、最后访问时间和交易日，
+按层级维护文件数和总字节数，缓存统计无需遍历目录；
+后台线程按层级的保留天数和容量上限淘汰旧文件。
+清单同时按交易日累计各ETF的用户请求次数，供收盘后预热挑选近期查询最多的ETF
+"""
+
+import os
+import time
+import shutil
+import sqlite3
+import weakref
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .sqlite_connection import SQLiteConnection
+
+logger = logging.getLogger(__name__)
+
+# 纳入清单的缓存层级（行情面板由构建过程自行管理版本，不纳入）
+MANAGED_TIERS = ('permanent', 'daily', 'historical', 'minute')
+
+# 分钟行情层只登记月份分区文件，检查点文件随分区淘汰更新，不单独登记
+MINUTE_PARTITION_SUFFIX = '.npz'
+
+# 最后访问时间在内存中累积，达到该条数或间隔（秒）时批量写入清单
+ACCESS_FLUSH_SIZE = 200
+ACCESS_FLUSH_INTERVAL = 30
+
+
+def _env_float(name: str) -> Optional[float]:
+    value = os.getenv(name)
+    return float(value) if value else None
+
+
+# 各层级的淘汰策略：max_age_days按交易日（daily）或最后访问时间计算，max_mb为容量上限（超出时按最后访问时间淘汰）
+DEFAULT_EVICTION_POLICIES: Dict[str, Dict[str, Optional[float]]] = {
+    'daily': {
+        'max_age_days': _env_float('CACHE_DAILY_MAX_AGE_DAYS') or 30,
+        'max_mb': _env_float('CACHE_DAILY_MAX_MB') or 200,
+    },
+    'historical': {
+        'max_age_days': _env_float('CACHE_HISTORICAL_MAX_AGE_DAYS'),
+        'max_mb': _env_float('CACHE_HISTORICAL_MAX_MB') or 2048,
+    },
+    'permanent': {
+        'max_age_days': _env_float('CACHE_PERMANENT_MAX_AGE_DAYS'),
+        'max_mb': _env_float('CACHE_PERMANENT_MAX_MB') or 200,
+    },
+    'minute': {
+        'max_age_days': _env_float('CACHE_MINUTE_MAX_AGE_DAYS'),
+        'max_mb': _env_float('CACHE_MINUTE_MAX_MB') or 1024,
+    },
+}
+
+# 后台淘汰间隔（秒）
+EVICTION_INTERVAL = int(os.getenv('CACHE_EVICTION_INTERVAL', 600))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    path TEXT PRIMARY KEY,
+    tier TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    trade_date TEXT,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_tier_access ON entries (tier, last_access);
+CREATE INDEX IF NOT EXISTS idx_entries_tier_date ON entries (tier, trade_date);
+CREATE TABLE IF NOT EXISTS totals (
+    tier TEXT PRIMARY KEY,
+    file_count INTEGER NOT NULL DEFAULT 0,
+    total_bytes INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS demand (
+    trade_date TEXT NOT NULL,
+    code TEXT NOT NULL,
+    requests INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (trade_date, code)
+);
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+    UPDATE totals SET file_count = file_count + 1, total_bytes = total_bytes + NEW.size WHERE tier = NEW.tier;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+    UPDATE totals SET file_count = file_count - 1, total_bytes = total_bytes - OLD.size WHERE tier = OLD.tier;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries BEGIN
+    UPDATE totals SET total_bytes = total_bytes - OLD.size + NEW.size WHERE tier = NEW.tier;
+END;
+"""
+
+
+# 清单结构版本（PRAGMA user_version），低于该版本时扫描已有文件（版本2起登记分钟行情分区）
+MANIFEST_VERSION = 2
+
+
+class CacheManifest:
+    """缓存文件清单（多进程共享的SQLite数据库）"""
+
+    def __init__(self, cache_dir: str, db_name: str = "manifest.db"):
+        """
+        打开或创建缓存清单
+
+        Args:
+            cache_dir: 缓存根目录
+            db_name: 清单数据库文件名
+        """
+        self.cache_dir = cache_dir
+        self.db_path = os.path.join(cache_dir, db_name)
+        self._db = SQLiteConnection(self.db_path)
+        weakref.finalize(self, self._db.close)
+        self._pending_access: Dict[str, float] = {}
+        self._pending_demand: Counter = Counter()
+        self._pending_lock = threading.Lock()
+        self._last_flush = time.time()
+
+        with self._db.connect() as conn:
+            with conn:
+                conn.executescript(_SCHEMA)
+                # 汇总行预先建好：触发器随UPSERT语句执行时沿用其冲突处理方式，不能在触发器内INSERT OR IGNORE
+                conn.executemany("INSERT OR IGNORE INTO totals (tier) VALUES (?)",
+                                 [(tier,) for tier in MANAGED_TIERS])
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < MANIFEST_VERSION:
+            self._scan_existing_files()
+            with self._db.connect() as conn:
+                conn.execute(f"PRAGMA user_version = {MANIFEST_VERSION}")
+
+    def classify(self, path: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        根据文件路径判断缓存层级和交易日
+
+        Args:
+            path: 缓存文件路径
+
+        Returns:
+            (层级, 交易日)，不属于受管层级时层级为None
+        """
+        parts = os.path.relpath(path, self.cache_dir).split(os.sep)
+        tier = parts[0] if parts[0] in MANAGED_TIERS else None
+        if tier == 'minute' and not path.endswith(MINUTE_PARTITION_SUFFIX):
+            tier = None
+        trade_date = parts[1] if tier == 'daily' and len(parts) > 2 else None
+        return tier, trade_date
+
+    def record_write(self, path: str):
+        """
+        记录缓存文件写入（新增或覆盖）
+
+        Args:
+            path: 缓存文件路径
+        """
+        tier, trade_date = self.classify(path)
+        if tier is None:
+            return
+        try:
+            size = os.path.getsize(path)
+            with self._db.connect() as conn:
+                conn.execute(
+                    "INSERT INTO entries (path, tier, size, trade_date, last_access) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(path) DO UPDATE SET size = excluded.size, last_access = excluded.last_access",
+                    (self._key(path), tier, size, trade_date, time.time())
+                )
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"缓存清单记录写入失败: {path}, 错误: {e}")
+
+    def record_access(self, path: str):
+        """
+        记录缓存文件读取（批量延迟写入）
+
+        Args:
+            path: 缓存文件路径
+        """
+        with self._pending_lock:
+            self._pending_access[self._key(path)] = time.time()
+            due = (len(self._pending_access) >= ACCESS_FLUSH_SIZE or
+                   time.time() - self._last_flush >= ACCESS_FLUSH_INTERVAL)
+        if due:
+            self.flush_access()
+
+    def record_delete(self, path: str):
+        """
+        记录缓存文件删除
+
+        Args:
+            path: 缓存文件路径
+        """
+        try:
+            with self._db.connect() as conn:
+                conn.execute("DELETE FROM entries WHERE path = ?", (self._key(path),))
+        except sqlite3.Error as e:
+            logger.warning(f"缓存清单记录删除失败: {path}, 错误: {e}")
+
+    def record_demand(self, trade_date: str, code: str):
+        """
+        记录一次用户请求（与最后访问时间一起批量延迟写入）
+
+        Args:
+            trade_date: 请求所属的交易日 (YYYYMMDD格式)
+            code: ETF代码
+        """
+        with self._pending_lock:
+            self._pending_demand[(trade_date, code)] += 1
+            due = (len(self._pending_access) + len(self._pending_demand) >= ACCESS_FLUSH_SIZE or
+                   time.time() - self._last_flush >= ACCESS_FLUSH_INTERVAL)
+        if due:
+            self.flush_access()
+
+    def flush_access(self):
+        """将累积的最后访问时间和请求次数写入清单"""
+        with self._pending_lock:
+            pending, self._pending_access = self._pending_access, {}
+            demand, self._pending_demand = self._pending_demand, Counter()
+            self._last_flush = time.time()
+        if not pending and not demand:
+            return
+        try:
+            with self._db.connect() as conn, conn:
+                conn.executemany("UPDATE entries SET last_access = ? WHERE path = ? AND last_access < ?",
+                                 [(accessed, path, accessed) for path, accessed in pending.items()])
+                conn.executemany(
+                    "INSERT INTO demand (trade_date, code, requests) VALUES (?, ?, ?) "
+                    "ON CONFLICT(trade_date, code) DO UPDATE SET requests = requests + excluded.requests",
+                    [(trade_date, code, count) for (trade_date, code), count in demand.items()]
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"缓存清单访问时间写入失败: {e}")
+
+    def get_demand(self, trade_dates: List[str]) -> Dict[str, int]:
+        """
+        统计若干交易日内各ETF的用户请求次数
+
+        Args:
+            trade_dates: 交易日列表 (YYYYMMDD格式)
+
+        Returns:
+            dict: ETF代码 -> 请求次数
+        """
+        self.flush_access()
+        if not trade_dates:
+            return {}
+        placeholders = ','.join('?' * len(trade_dates))
+        with self._db.connect() as conn:
+            rows = conn.execute(
+                f"SELECT code, SUM(requests) FROM demand WHERE trade_date IN ({placeholders}) GROUP BY code",
+                list(trade_dates)
+            ).fetchall()
+        return {code: requests for code, requests in rows}
+
+    def purge_demand(self, before_date: str) -> int:
+        """
+        删除早于某交易日的请求次数记录
+
+        Args:
+            before_date: 截止交易日 (YYYYMMDD格式)，不含当日
+
+        Returns:
+            int: 删除的记录数
+        """
+        try:
+            with self._db.connect() as conn:
+                return conn.execute("DELETE FROM demand WHERE trade_date < ?", (before_date,)).rowcount
+        except sqlite3.Error as e:
+            logger.warning(f"清理请求次数记录失败: {e}")
+            return 0
+
+    def get_totals(self) -> Dict[str, Dict]:
+        """
+        获取各层级的文件数和总大小（读取汇总表，不遍历目录）
+
+        Returns:
+            dict: 层级 -> {'file_count', 'total_size_mb'}
+        """
+        with self._db.connect() as conn:
+            rows = {tier: (count, size) for tier, count, size in
+                    conn.execute("SELECT tier, file_count, total_bytes FROM totals").fetchall()}
+        return {
+            tier: {
+                'file_count': rows.get(tier, (0, 0))[0],
+                'total_size_mb': round(rows.get(tier, (0, 0))[1] / 1024 / 1024, 2),
+            }
+            for tier in MANAGED_TIERS
+        }
+
+    def _key(self, path: str) -> str:
+        """清单中的路径键（相对缓存根目录）"""
+        return os.path.relpath(path, self.cache_dir)
+
+    def _scan_existing_files(self):
+        """新建或升级清单时登记已有的缓存文件"""
+        count = 0
+        for tier in MANAGED_TIERS:
+            for root, _, files in os.walk(os.path.join(self.cache_dir, tier)):
+                for name in files:
+                    path = os.path.join(root, name)
+                    if name.endswith(('.json', '.npz', '.bundle')) and self.classify(path)[0] is not None:
+                        self.record_write(path)
+                        count += 1
+        if count:
+            logger.info(f"缓存清单已登记{count}个已有缓存文件")
+
+    def select_evictions(self, tier: str, max_age_days: Optional[float] = None,
+                         max_mb: Optional[float] = None, now: Optional[float] = None) -> List[str]:
+        """
+        按淘汰策略选出需要删除的缓存文件
+
+        Args:
+            tier: 缓存层级
+            max_age_days: 保留天数（daily层按交易日计算，其余层按最后访问时间计算）
+            max_mb: 容量上限(MB)，超出部分按最后访问时间从旧到新淘汰
+            now: 当前时间戳
+
+        Returns:
+            List[str]: 需要删除的文件路径
+        """
+        self.flush_access()
+        now = now or time.time()
+        selected: List[str] = []
+
+        with self._db.connect() as conn:
+            if max_age_days is not None:
+                if tier == 'daily':
+                    cutoff_date = (datetime.fromtimestamp(now) - timedelta(days=max_age_days)).strftime('%Y%m%d')
+                    rows = conn.execute("SELECT path FROM entries WHERE tier = ? AND trade_date < ?",
+                                        (tier, cutoff_date))
+                else:
+                    rows = conn.execute("SELECT path FROM entries WHERE tier = ? AND last_access < ?",
+                                        (tier, now - max_age_days * 86400))
+                selected.extend(path for path, in rows.fetchall())
+
+            if max_mb is not None:
+                excess = sum(size for size, in conn.execute(
+                    "SELECT total_bytes FROM totals WHERE tier = ?", (tier,)).fetchall())
+                excess -= int(max_mb * 1024 * 1024)
+                aged = set(selected)
+                if excess > 0:
+                    for path, size in conn.execute(
+                            "SELECT path, size FROM entries WHERE tier = ? ORDER BY last_access", (tier,)).fetchall():
+                        if excess <= 0:
+                            break
+                        excess -= size
+                        if path not in aged:
+                            selected.append(path)
+
+        return [os.path.join(self.cache_dir, path) for path in selected]
+
+
+class CacheEvictor:
+    """后台缓存淘汰任务"""
+
+    def __init__(self, manifest: CacheManifest,
+                 policies: Optional[Dict[str, Dict[str, Optional[float]]]] = None,
+                 on_evict: Optional[Callable[[str, str], None]] = None,
+                 interval: float = EVICTION_INTERVAL,
+                 purge_expired: Optional[Callable[[], int]] = None):
+        """
+        初始化淘汰任务
+
+        Args:
+            manifest: 缓存清单
+            policies: 各层级淘汰策略，未指定的层级使用默认策略
+            on_evict: 文件被删除后的回调 (层级, 文件路径)，用于清理内存缓存
+            interval: 后台淘汰间隔（秒）
+            purge_expired: 清理缓存后端中已过期条目的回调，返回删除数量
+        """
+        self.manifest = manifest
+        self.policies = {**DEFAULT_EVICTION_POLICIES, **(policies or {})}
+        self.on_evict = on_evict
+        self.interval = interval
+        self.purge_expired = purge_expired
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_run: Optional[Dict] = None
+
+    def run_once(self, now: Optional[float] = None) -> Dict:
+        """
+        执行一次淘汰
+
+        Args:
+            now: 当前时间戳
+
+        Returns:
+            dict: 各层级删除的文件数和释放的字节数
+        """
+        start_time = time.time()
+        report = {}
+        for tier, policy in self.policies.items():
+            paths = self.manifest.select_evictions(tier, policy.get('max_age_days'), policy.get('max_mb'), now)
+            freed = 0
+            for path in paths:
+                try:
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning(f"删除缓存文件失败: {path}, 错误: {e}")
+                    continue
+                self.manifest.record_delete(path)
+                if self.on_evict:
+                    self.on_evict(tier, path)
+            report[tier] = {'evicted': len(paths), 'freed_mb': round(freed / 1024 / 1024, 2)}
+
+        self._remove_empty_daily_dirs()
+        # 请求次数记录与交易日缓存保留相同的天数
+        demand_max_age = self.policies.get('daily', {}).get('max_age_days')
+        if demand_max_age is not None:
+            cutoff = datetime.fromtimestamp(now or time.time()) - timedelta(days=demand_max_age)
+            self.manifest.purge_demand(cutoff.strftime('%Y%m%d'))
+        if self.purge_expired:
+            report['expired'] = {'evicted': self.purge_expired(), 'freed_mb': 0}
+        self._last_run = {'at': datetime.now().isoformat(timespec='seconds'),
+                          'duration_seconds': round(time.time() - start_time, 3), 'tiers': report}
+        evicted = sum(tier_report['evicted'] for tier_report in report.values())
+        if evicted:
+            logger.info(f"缓存淘汰完成: 删除{evicted}个文件 {report}")
+        return report
+
+    def _remove_empty_daily_dirs(self):
+        """删除已清空的交易日目录"""
+        daily_dir = os.path.join(self.manifest.cache_dir, 'daily')
+        try:
+            names = os.listdir(daily_dir)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(daily_dir, name)
+            if os.path.isdir(path) and not os.listdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def start(self):
+        """启动后台淘汰线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="cache-eviction", daemon=True)
+        self._thread.start()
+        logger.info(f"缓存淘汰任务已启动: 每{self.interval}秒执行一次")
+
+    def stop(self):
+        """停止后台淘汰线程"""
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"缓存淘汰失败: {e}")
+
+    def get_status(self) -> Dict:
+        """获取淘汰任务状态"""
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'interval_seconds': self.interval,
+            'policies': self.policies,
+            'last_run': self._last_run,
+        }
@@ -1,32 +1,92 @@
 import os
-import json
+import copy
 import logging
 from datetime import datetime, timedelta
-from typing import Any, Optional, Dict, List
+from typing import Any, Callable, Optional, Dict, List, Tuple
 import pandas as pd
+from .bar_store import BarStore
+from .minute_bar_store import MinuteBarStore
+from .price_panel import PricePanel, build_price_panel
+from .memory_cache import LRUMemoryCache
+from .trading_calendar import TradingCalendar
+from .cache_manifest import CacheManifest, CacheEvictor, DEFAULT_EVICTION_POLICIES
+from .cache_file import KeyLocks
+from .cache_bundle import BUNDLE_SUFFIX
+from .cache_backends import create_cache_backend
 
 logger = logging.getLogger(__name__)
 
+# 参与缓存统计的文件后缀
+CACHE_FILE_SUFFIXES = ('.json', '.npz', '.npy', BUNDLE_SUFFIX)
+
+# 交易日缓存条目的有效期（秒），与交易日缓存的保留天数一致；永久缓存不过期
+DAILY_ENTRY_EXPIRE = int((DEFAULT_EVICTION_POLICIES['daily']['max_age_days'] or 30) * 86400)
+
 
 class EnhancedCache:
     """增强版缓存管理器 - 支持分层缓存策略"""
     
-    def __init__(self, cache_dir: str = "cache"):
+    def __init__(self, cache_dir: str = "cache",
+                 memory_max_entries: Optional[int] = None,
+                 memory_max_mb: Optional[float] = None,
+                 historical_memory_ttl: Optional[int] = None,
+                 storage_layout: Optional[str] = None,
+                 backend: Optional[str] = None):
         """
         初始化增强缓存管理器
         
         Args:
             cache_dir: 缓存根目录路径
+            memory_max_entries: 内存缓存最大条目数，默认读取环境变量CACHE_MAXSIZE
+            memory_max_mb: 内存缓存最大占用(MB)，默认读取环境变量CACHE_MEMORY_MAX_MB
+            historical_memory_ttl: 历史数据在内存缓存中的有效期(秒)，默认读取环境变量CACHE_TTL
+            storage_layout: 文件后端的存储方式(files或bundle)，默认读取环境变量CACHE_STORAGE_LAYOUT
+            backend: 永久/交易日缓存后端(memory、file或sqlite)，默认读取环境变量CACHE_BACKEND
         """
         self.cache_dir = cache_dir
         self.permanent_dir = os.path.join(cache_dir, "permanent")
         self.daily_dir = os.path.join(cache_dir, "daily")
         self.historical_dir = os.path.join(cache_dir, "historical")
+        self.panel_dir = os.path.join(cache_dir, "panel")
+        self.minute_dir = os.path.join(cache_dir, "minute")
         
         # 确保所有缓存目录存在
-        for dir_path in [self.cache_dir, self.permanent_dir, self.daily_dir, self.historical_dir]:
+        for dir_path in [self.cache_dir, self.permanent_dir, self.daily_dir, self.historical_dir, self.panel_dir,
+                         self.minute_dir]:
             os.makedirs(dir_path, exist_ok=True)
         
+        # 同一缓存键的写入由跨进程按键锁串行化
+        self.locks = KeyLocks(os.path.join(cache_dir, "locks"))
+        
+        # 历史日线使用列式存储，每只ETF一个文件
+        self.bar_store = BarStore(self.historical_dir, self.locks)
+        self._remove_legacy_historical_files()
+        
+        # 缓存文件清单（大小、层级、最后访问时间），用于O(1)统计和自动淘汰
+        self.manifest = CacheManifest(cache_dir)
+        
+        # 分钟行情按周期/ETF/月份分区存储，带获取进度检查点；分区登记在清单中按容量淘汰
+        self.minute_store = MinuteBarStore(self.minute_dir, self.locks, self.manifest)
+        
+        # 永久缓存和交易日缓存的存储后端
+        self.backend_name = backend or os.getenv('CACHE_BACKEND', 'file')
+        self.backend = create_cache_backend(self.backend_name, cache_dir, self.locks, self.manifest,
+                                            storage_layout or os.getenv('CACHE_STORAGE_LAYOUT', 'files'))
+        self.evictor = CacheEvictor(self.manifest, on_evict=self._on_evict,
+                                    purge_expired=self.backend.purge_expired)
+        
+        # 多ETF行情面板，各工作进程以内存映射方式共享
+        self.price_panel = PricePanel(self.panel_dir)
+        
+        # 文件缓存之前的进程内LRU缓存层
+        self.memory = LRUMemoryCache(
+            max_entries=memory_max_entries or int(os.getenv('CACHE_MAXSIZE', 1000)),
+            max_bytes=int((memory_max_mb or float(os.getenv('CACHE_MEMORY_MAX_MB', 64))) * 1024 * 1024)
+        )
+        # 永久缓存不过期；交易日缓存在交易日切换时清理；历史数据按TTL过期以感知其他进程的合并
+        self.historical_memory_ttl = historical_memory_ttl or int(os.getenv('CACHE_TTL', 3600))
+        self._memory_trade_date: Optional[str] = None
+        
         logger.info(f"增强缓存管理器初始化完成，缓存目录: {cache_dir}")
     
     def get_permanent_cache(self, cache_type: str, key: str) -> Optional[Any]:
@@ -40,8 +100,17 @@ class EnhancedCache:
         Returns:
             缓存的数据，如果不存在返回None
         """
-        cache_file = os.path.join(self.permanent_dir, f"{cache_type}_{key}.json")
-        return self._safe_load_cache(cache_file, f"永久缓存-{cache_type}-{key}")
+        memory_key = f"permanent:{cache_type}:{key}"
+        data = self.memory.get(memory_key)
+        if data is not None:
+            return copy.deepcopy(data)
+        
+        data = self.backend.get(memory_key)
+        if data is not None:
+            logger.debug(f"缓存命中: 永久缓存-{cache_type}-{key}")
+            self.memory.set(memory_key, data)
+            return copy.deepcopy(data)
+        return None
     
     def set_permanent_cache(self, cache_type: str, key: str, data: Any):
         """
@@ -56,8 +125,39 @@ class EnhancedCache:
             logger.debug(f"数据为空，不缓存: {cache_type}-{key}")
             return
         
-        cache_file = os.path.join(self.permanent_dir, f"{cache_type}_{key}.json")
-        self._safe_save_cache(cache_file, data, f"永久缓存-{cache_type}-{key}")
+        memory_key = f"permanent:{cache_type}:{key}"
+        if self.backend.set(memory_key, data, expire=0):
+            logger.debug(f"缓存保存成功: 永久缓存-{cache_type}-{key}")
+        self.memory.set(memory_key, copy.deepcopy(data))
+    
+    def is_negative_cached(self, cache_type: str, key: str) -> bool:
+        """
+        检查上游是否在短期内已确认该键不存在
+        
+        Args:
+            cache_type: 缓存类型 (security_basic, security_name)
+            key: 缓存键
+            
+        Returns:
+            bool: 不存在记录尚未过期时返回True
+        """
+        memory_key = f"permanent:missing_{cache_type}:{key}"
+        if self.memory.get(memory_key) is not None:
+            return True
+        return self.backend.get(memory_key) is not None
+    
+    def set_negative_cache(self, cache_type: str, key: str, ttl: int):
+        """
+        记录上游确认不存在的键（短期有效，无效或已退市代码不再反复请求上游）
+        
+        Args:
+            cache_type: 缓存类型
+            key: 缓存键
+            ttl: 有效期（秒）
+        """
+        memory_key = f"permanent:missing_{cache_type}:{key}"
+        self.backend.set(memory_key, {'missing': True}, expire=ttl)
+        self.memory.set(memory_key, True, ttl=ttl)
     
     def get_daily_cache(self, trade_date: str, cache_type: str, key: str) -> Optional[Any]:
         """
@@ -71,9 +171,18 @@ class EnhancedCache:
         Returns:
             缓存的数据，如果不存在返回None
         """
-        daily_cache_dir = os.path.join(self.daily_dir, trade_date)
-        cache_file = os.path.join(daily_cache_dir, f"{cache_type}_{key}.json")
-        return self._safe_load_cache(cache_file, f"交易日缓存-{trade_date}-{cache_type}-{key}")
+        self._roll_memory_trade_date(trade_date)
+        memory_key = f"daily:{trade_date}:{cache_type}:{key}"
+        data = self.memory.get(memory_key)
+        if data is not None:
+            return copy.deepcopy(data)
+        
+        data = self.backend.get(memory_key)
+        if data is not None:
+            logger.debug(f"缓存命中: 交易日缓存-{trade_date}-{cache_type}-{key}")
+            self.memory.set(memory_key, data)
+            return copy.deepcopy(data)
+        return None
     
     def set_daily_cache(self, trade_date: str, cache_type: str, key: str, data: Any):
         """
@@ -89,13 +198,53 @@ class EnhancedCache:
             logger.debug(f"数据为空，不缓存: {trade_date}-{cache_type}-{key}")
             return
         
-        daily_cache_dir = os.path.join(self.daily_dir, trade_date)
-        os.makedirs(daily_cache_dir, exist_ok=True)
+        memory_key = f"daily:{trade_date}:{cache_type}:{key}"
+        if self.backend.set(memory_key, data, expire=DAILY_ENTRY_EXPIRE):
+            logger.debug(f"缓存保存成功: 交易日缓存-{trade_date}-{cache_type}-{key}")
+        self._roll_memory_trade_date(trade_date)
+        self.memory.set(memory_key, copy.deepcopy(data))
+    
+    def list_daily_keys(self, trade_date: str, cache_type: str) -> List[str]:
+        """
+        列出某交易日某类型的所有缓存键
         
-        cache_file = os.path.join(daily_cache_dir, f"{cache_type}_{key}.json")
-        self._safe_save_cache(cache_file, data, f"交易日缓存-{trade_date}-{cache_type}-{key}")
+        Args:
+            trade_date: 交易日期 (YYYYMMDD格式)
+            cache_type: 缓存类型 (price, quote)
+            
+        Returns:
+            List[str]: 缓存键列表（通常是ETF代码）
+        """
+        prefix = f"daily:{trade_date}:{cache_type}:"
+        return sorted(key[len(prefix):] for key in self.backend.keys(prefix))
     
-    def get_historical_cache(self, etf_code: str, start_date: str, end_date: str) -> Optional[Any]:
+    def record_request(self, trade_date: str, etf_code: str):
+        """
+        记录一次用户对某ETF的请求（按交易日计数，多进程共享）
+        
+        Args:
+            trade_date: 请求所属的交易日 (YYYYMMDD格式)
+            etf_code: ETF代码
+        """
+        self.manifest.record_demand(trade_date, etf_code)
+    
+    def get_request_counts(self, trade_dates: List[str]) -> Dict[str, int]:
+        """
+        统计若干交易日内各ETF的用户请求次数
+        
+        Args:
+            trade_dates: 交易日列表 (YYYYMMDD格式)
+            
+        Returns:
+            Dict[str, int]: ETF代码到请求次数的映射
+        """
+        try:
+            return self.manifest.get_demand(trade_dates)
+        except Exception as e:
+            logger.error(f"统计ETF请求次数失败: {e}")
+            return {}
+    
+    def get_historical_cache(self, etf_code: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
         """
         获取历史数据缓存
         
@@ -105,77 +254,165 @@ class EnhancedCache:
             end_date: 结束日期 (YYYYMMDD格式)
             
         Returns:
-            缓存的数据，如果不存在返回None
+            DataFrame: 缓存的日线数据（副本，调用方可以修改），如果不存在或未完整覆盖该日期范围返回None
         """
-        cache_file = os.path.join(self.historical_dir, f"{etf_code}_{start_date}_{end_date}.json")
-        return self._safe_load_cache(cache_file, f"历史缓存-{etf_code}-{start_date}-{end_date}")
+        # 内存缓存中的数据框由各调用方共享，面板切片还是只读内存映射的视图，返回副本
+        memory_key = f"historical:{etf_code}:{start_date}:{end_date}"
+        df = self.memory.get(memory_key)
+        if df is not None:
+            return df.copy()
+        
+        # 优先从共享行情面板切片，面板未覆盖该窗口或构建后该ETF的存储又有写入时再读取存储文件
+        try:
+            try:
+                source_mtime = os.path.getmtime(self.bar_store.file_path(etf_code))
+            except OSError:
+                source_mtime = None
+            df = self.price_panel.slice(etf_code, start_date, end_date, source_mtime)
+            if df is not None:
+                logger.debug(f"缓存命中: 行情面板-{etf_code}-{start_date}-{end_date}")
+                self.memory.set(memory_key, df, ttl=self.historical_memory_ttl)
+                self.manifest.record_access(self.bar_store.file_path(etf_code))
+                return df.copy()
+        except Exception as e:
+            logger.warning(f"行情面板切片异常: {etf_code}-{start_date}-{end_date}, 错误: {e}")
+        
+        try:
+            df = self.bar_store.read(etf_code, start_date, end_date)
+        except Exception as e:
+            logger.error(f"加载历史缓存异常: {etf_code}-{start_date}-{end_date}, 错误: {e}")
+            return None
+        
+        if df is None:
+            return None
+        logger.debug(f"缓存命中: 历史缓存-{etf_code}-{start_date}-{end_date}")
+        self.memory.set(memory_key, df, ttl=self.historical_memory_ttl)
+        self.manifest.record_access(self.bar_store.file_path(etf_code))
+        return df.copy()
     
-    def set_historical_cache(self, etf_code: str, start_date: str, end_date: str, data: Any):
+    def get_historical_stale(self, etf_code: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
         """
-        保存历史数据缓存
+        获取历史缓存中该窗口内已有的数据（不要求完整覆盖，用于无法补充获取时）
         
         Args:
             etf_code: ETF代码
             start_date: 开始日期
             end_date: 结束日期
-            data: 要缓存的数据
+            
+        Returns:
+            DataFrame: 窗口内已缓存的日线数据，没有任何数据时返回None
         """
-        if not data:
-            logger.debug(f"数据为空，不缓存: {etf_code}-{start_date}-{end_date}")
-            return
-        
-        cache_file = os.path.join(self.historical_dir, f"{etf_code}_{start_date}_{end_date}.json")
-        self._safe_save_cache(cache_file, data, f"历史缓存-{etf_code}-{start_date}-{end_date}")
+        try:
+            df = self.bar_store.read_available(etf_code, start_date, end_date)
+        except Exception as e:
+            logger.warning(f"读取历史缓存失败: {etf_code}, 错误: {e}")
+            return None
+        return df if df is not None and len(df) else None
     
-    def _safe_load_cache(self, cache_file: str, cache_desc: str) -> Optional[Any]:
+    def get_historical_missing_ranges(self, etf_code: str, start_date: str, end_date: str) -> List[Tuple[str, str]]:
         """
-        安全加载缓存文件
+        获取历史数据缓存中尚未覆盖的日期区间
         
         Args:
-            cache_file: 缓存文件路径
-            cache_desc: 缓存描述（用于日志）
+            etf_code: ETF代码
+            start_date: 开始日期 (YYYYMMDD格式)
+            end_date: 结束日期 (YYYYMMDD格式)
             
         Returns:
-            缓存数据或None
+            List[Tuple[str, str]]: 需要补充获取的日期区间（头部、尾部或中间缺口）
         """
-        if not os.path.exists(cache_file):
-            return None
-        
         try:
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                logger.debug(f"缓存命中: {cache_desc}")
-                return data
-        except (json.JSONDecodeError, IOError, OSError) as e:
-            # 缓存文件损坏，删除并返回None
-            logger.warning(f"缓存文件损坏，已删除: {cache_file}, 错误: {e}")
-            try:
-                os.remove(cache_file)
-            except:
-                pass
-            return None
+            return self.bar_store.missing_ranges(etf_code, start_date, end_date)
         except Exception as e:
-            logger.error(f"加载缓存文件异常: {cache_file}, 错误: {e}")
-            return None
+            logger.error(f"计算历史缓存缺口异常: {etf_code}-{start_date}-{end_date}, 错误: {e}")
+            return [(start_date, end_date)]
     
-    def _safe_save_cache(self, cache_file: str, data: Any, cache_desc: str):
+    def set_historical_cache(self, etf_code: str, start_date: str, end_date: str, data: Optional[pd.DataFrame]):
         """
-        安全保存缓存文件
+        保存历史数据缓存（与该ETF已缓存的序列合并）
+        
+        数据为空时仍记录该日期区间已覆盖，避免节假日等无K线区间被重复请求
         
         Args:
-            cache_file: 缓存文件路径
-            data: 要保存的数据
-            cache_desc: 缓存描述（用于日志）
+            etf_code: ETF代码
+            start_date: 开始日期
+            end_date: 结束日期
+            data: 要缓存的日线数据
         """
+        # 该ETF的序列已变化，清理内存中已缓存的窗口
+        self.memory.purge(lambda memory_key: memory_key.startswith(f"historical:{etf_code}:"))
+        
         try:
-            # 确保目录存在
-            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
-            
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2, default=str)
-            logger.debug(f"缓存保存成功: {cache_desc}")
+            self.bar_store.merge(etf_code, start_date, end_date, data)
+            self.manifest.record_write(self.bar_store.file_path(etf_code))
+            logger.debug(f"缓存保存成功: 历史缓存-{etf_code}-{start_date}-{end_date}")
         except Exception as e:
-            logger.error(f"缓存保存失败: {cache_file}, 错误: {e}")
+            logger.error(f"历史缓存保存失败: {etf_code}-{start_date}-{end_date}, 错误: {e}")
+    
+    def _roll_memory_trade_date(self, trade_date: str):
+        """交易日切换时清理内存中旧交易日的缓存条目"""
+        if self._memory_trade_date is not None and trade_date <= self._memory_trade_date:
+            return
+        
+        previous_date = self._memory_trade_date
+        self._memory_trade_date = trade_date
+        if previous_date is not None:
+            removed = self.memory.purge(
+                lambda memory_key: memory_key.startswith('daily:') and memory_key.split(':', 2)[1] < trade_date
+            )
+            logger.debug(f"交易日切换 {previous_date} -> {trade_date}，清理{removed}条内存缓存")
+    
+    def _on_evict(self, tier: str, path: str):
+        """缓存文件被淘汰后清理对应的内存缓存条目"""
+        name = os.path.splitext(os.path.basename(path))[0]
+        if tier == 'historical':
+            self.memory.purge(lambda memory_key: memory_key.startswith(f"historical:{name}:"))
+        elif tier == 'daily':
+            trade_date = os.path.basename(os.path.dirname(path))
+            self.memory.purge(lambda memory_key: memory_key.startswith(f"daily:{trade_date}:"))
+        elif tier == 'minute':
+            # 分区路径为 minute/{周期}/{ETF}/{YYYYMM}.npz，淘汰后该月需重新获取
+            freq, etf_code = os.path.relpath(os.path.dirname(path), self.minute_dir).split(os.sep)
+            self.minute_store.uncover_month(etf_code, freq, name)
+        elif tier == 'permanent' and path.endswith(BUNDLE_SUFFIX):
+            self.memory.purge(lambda memory_key: memory_key.startswith('permanent:'))
+        elif tier == 'permanent':
+            # 永久缓存文件名为 {类型}_{键}.json，对应内存键 permanent:{类型}:{键}
+            self.memory.purge(lambda memory_key: memory_key.startswith('permanent:') and
+                              '_'.join(memory_key.split(':', 2)[1:]) == name)
+    
+    def start_eviction(self):
+        """启动后台缓存淘汰任务"""
+        self.evictor.start()
+    
+    def rebuild_price_panel(self) -> Optional[str]:
+        """
+        由历史日线存储重建共享行情面板
+        
+        Returns:
+            str: 新面板版本号，构建失败或无数据时返回None
+        """
+        try:
+            return build_price_panel(self.bar_store, self.panel_dir)
+        except Exception as e:
+            logger.error(f"行情面板构建失败: {e}")
+            return None
+    
+    def _remove_legacy_historical_files(self):
+        """清理旧版按日期窗口保存的历史JSON文件，这些窗口已由按ETF合并的序列取代"""
+        try:
+            legacy_files = [f for f in os.listdir(self.historical_dir) if f.endswith('.json')]
+        except OSError:
+            return
+        
+        for file in legacy_files:
+            try:
+                os.remove(os.path.join(self.historical_dir, file))
+            except OSError:
+                pass
+        
+        if legacy_files:
+            logger.info(f"已清理{len(legacy_files)}个旧版历史缓存文件")
     
     def get_cache_info(self) -> Dict:
         """
@@ -185,11 +422,11 @@ class EnhancedCache:
             dict: 缓存统计信息
         """
         try:
+            # 受管层级（含分钟行情分区）的统计直接读取清单汇总，不遍历目录；行情面板不在清单中
             info = {
                 'cache_dir': self.cache_dir,
-                'permanent': self._get_dir_info(self.permanent_dir),
-                'daily': self._get_dir_info(self.daily_dir),
-                'historical': self._get_dir_info(self.historical_dir)
+                **self.manifest.get_totals(),
+                'panel': self._get_dir_info(self.panel_dir)
             }
             
             # 计算总计
@@ -200,6 +437,9 @@ class EnhancedCache:
                 'file_count': total_files,
                 'total_size_mb': round(total_size, 2)
             }
+            info['backend'] = self.backend.get_stats()
+            info['memory'] = self.memory.get_stats()
+            info['eviction'] = self.evictor.get_status()
             
             return info
         except Exception as e:
@@ -222,7 +462,7 @@ class EnhancedCache:
             for root, dirs, files in os.walk(dir_path):
                 subdirs.extend(dirs)
                 for file in files:
-                    if file.endswith('.json'):
+                    if file.endswith(CACHE_FILE_SUFFIXES):
                         file_path = os.path.join(root, file)
                         total_size += os.path.getsize(file_path)
                         file_count += 1
@@ -240,25 +480,27 @@ class EnhancedCache:
 class TradingDateManager:
     """交易日管理器"""
     
-    def __init__(self, cache: EnhancedCache):
+    def __init__(self, cache: EnhancedCache, quote_ctx_provider: Optional[Callable] = None):
         """
         初始化交易日管理器
         
         Args:
             cache: 缓存管理器实例
+            quote_ctx_provider: 返回富途行情连接的函数，用于获取交易日历
         """
         self.cache = cache
+        self.calendar = TradingCalendar(cache, quote_ctx_provider)
         
         # A股交易时间配置
         self.market_open_time = "09:30"
         self.market_close_time = "15:00"
     
-    def get_latest_trading_date(self, tushare_pro) -> str:
+    def get_latest_trading_date(self, tushare_pro=None) -> str:
         """
-        获取最近的交易日
+        获取最近的已收盘交易日
         
         Args:
-            tushare_pro: tushare pro接口实例
+            tushare_pro: tushare pro接口实例（可选的交易日历备用数据源）
             
         Returns:
             str: 最近的交易日 (YYYYMMDD格式)
@@ -266,76 +508,33 @@ class TradingDateManager:
         current_time = datetime.now()
         current_date = current_time.strftime('%Y%m%d')
         
-        # 获取交易日历
-        trading_calendar = self._get_trading_calendar(tushare_pro, current_time.year)
-        
-        if not trading_calendar:
+        if not self.calendar.is_available(current_time.year, tushare_pro):
             # 如果获取交易日历失败，使用简单逻辑
             logger.warning("获取交易日历失败，使用简单逻辑判断交易日")
             return self._get_simple_trading_date(current_time)
         
-        # 判断当前日期是否为交易日
-        if current_date in trading_calendar:
-            # 当前是交易日，判断是否已收盘
-            if self._is_market_closed(current_time):
-                # 已收盘，当前日期就是最近交易日
-                return current_date
-            else:
-                # 未收盘，使用上一个交易日
-                return self._get_previous_trading_date(current_date, trading_calendar)
-        else:
-            # 当前不是交易日，获取上一个交易日
-            return self._get_previous_trading_date(current_date, trading_calendar)
-    
-    def _get_trading_calendar(self, tushare_pro, year: int) -> List[str]:
-        """
-        获取交易日历（带缓存）
+        # 当前是交易日且已收盘，当前日期就是最近交易日；否则使用上一个交易日
+        if self.calendar.is_trading_day(current_date) and self._is_market_closed(current_time):
+            return current_date
         
-        Args:
-            tushare_pro: tushare pro接口实例
-            year: 年份
-            
-        Returns:
-            List[str]: 交易日列表
-        """
-        # 先检查缓存
-        cached_calendar = self.cache.get_permanent_cache("trading_cal", str(year))
-        if cached_calendar:
-            logger.debug(f"从缓存获取{year}年交易日历")
-            return cached_calendar
-        
-        # 缓存未命中，检查tushare_pro是否可用
-        if not tushare_pro:
-            logger.warning(f"tushare_pro不可用，无法获取{year}年交易日历")
-            return []
-        
-        # 调用接口
-        try:
-            start_date = f"{year}0101"
-            end_date = f"{year}1231"
-            
-            df = tushare_pro.trade_cal(
-                exchange='SSE',
-                start_date=start_date,
-                end_date=end_date,
-                is_open='1'
-            )
-            
-            if df.empty:
-                logger.warning(f"获取{year}年交易日历失败：返回空数据")
-                return []
-            
-            trading_days = df['cal_date'].tolist()
-            
-            # 保存到缓存
-            self.cache.set_permanent_cache("trading_cal", str(year), trading_days)
-            logger.info(f"获取{year}年交易日历成功，共{len(trading_days)}个交易日")
-            
-            return trading_days
-            
-        except Exception as e:
-            logger.error(f"获取{year}年交易日历失败: {e}")
-            return []
+        previous_date = self.calendar.previous(current_date)
+        if previous_date is None:
+            # 年初且上一年日历不可用
+            logger.warning(f"交易日历中未找到{current_date}之前的交易日")
+            return self._get_simple_trading_date(current_time)
+        return previous_date
+    
+    def get_previous_trading_date(self, date: str) -> Optional[str]:
+        """获取指定日期之前的最近交易日，日历不可用时返回None"""
+        return self.calendar.previous(date)
+    
+    def get_next_trading_date(self, date: str) -> Optional[str]:
+        """获取指定日期之后的最近交易日，日历不可用时返回None"""
+        return self.calendar.next(date)
+    
+    def get_trading_days_between(self, start_date: str, end_date: str) -> Optional[List[str]]:
+        """获取区间内（含首尾）的所有交易日，日历不可用时返回None"""
+        return self.calendar.between(start_date, end_date)
     
     def _is_market_closed(self, current_time: datetime) -> bool:
         """
@@ -350,27 +549,6 @@ class TradingDateManager:
         current_time_str = current_time.strftime('%H:%M')
         return current_time_str >= self.market_close_time
     
-    def _get_previous_trading_date(self, current_date: str, trading_calendar: List[str]) -> str:
-        """
-        获取上一个交易日
-        
-        Args:
-            current_date: 当前日期 (YYYYMMDD格式)
-            trading_calendar: 交易日历列表
-            
-        Returns:
-            str: 上一个交易日
-        """
-        # 找到小于当前日期的最大交易日
-        previous_dates = [date for date in trading_calendar if date < current_date]
-        
-        if previous_dates:
-            return max(previous_dates)
-        else:
-            # 如果没有找到，可能是年初，尝试获取去年的交易日历
-            logger.warning(f"在当前年份交易日历中未找到{current_date}之前的交易日")
-            return self._get_simple_trading_date(datetime.strptime(current_date, '%Y%m%d'))
-    
     def _get_simple_trading_date(self, current_time: datetime) -> str:
         """
         简单的交易日判断逻辑（当交易日历获取失败时使用）
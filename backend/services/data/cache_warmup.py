@@ -0,0 +1,298 @@
+"""
+收盘后缓存预热
+每个交易日收盘后，为热门ETF和近期被查询最多的ETF预先获取最新价格、
+增量日线和基础信息，使第二天早盘的请求全部命中缓存。
+多个工作进程同时运行调度器时，通过锁文件保证每个交易日只预热一次
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from .rate_limiter import PRIORITY_BACKGROUND, request_priority
+
+logger = logging.getLogger(__name__)
+
+# 收盘后延迟多少分钟开始预热
+WARMUP_DELAY_MINUTES = int(os.getenv('CACHE_WARMUP_DELAY_MINUTES', 10))
+
+# 除热门ETF外，额外预热近期查询最多的ETF数量
+WARMUP_TOP_N = int(os.getenv('CACHE_WARMUP_TOP_N', 50))
+
+# 预热并发数（限制对富途OpenD网关的并发请求）
+WARMUP_MAX_WORKERS = int(os.getenv('CACHE_WARMUP_MAX_WORKERS', 4))
+
+# 统计近期查询时回看的交易日数
+WARMUP_LOOKBACK_TRADING_DAYS = 5
+
+# 预热的日线窗口（与策略分析使用的窗口一致）
+HISTORY_WINDOW_DAYS = 365
+
+# 调度器检查间隔（秒）
+SCHEDULER_CHECK_INTERVAL = 60
+
+# 锁文件超过该时间（秒）视为上次预热异常退出遗留
+STALE_LOCK_SECONDS = 3600
+
+
+class CacheWarmer:
+    """缓存预热任务"""
+
+    def __init__(self, client, popular_codes: List[str], top_n: int = WARMUP_TOP_N,
+                 max_workers: int = WARMUP_MAX_WORKERS,
+                 lookback_trading_days: int = WARMUP_LOOKBACK_TRADING_DAYS,
+                 ingestor=None):
+        """
+        初始化预热任务
+
+        Args:
+            client: 富途API数据客户端
+            popular_codes: 热门ETF代码列表
+            top_n: 额外预热的近期查询最多的ETF数量
+            max_workers: 预热并发数
+            lookback_trading_days: 统计近期查询时回看的交易日数
+            ingestor: 全市场日线截面入库任务（UniverseDataService），指定时先入库当日截面
+        """
+        self.client = client
+        self.ingestor = ingestor
+        self.popular_codes = list(popular_codes)
+        self.top_n = top_n
+        self.max_workers = max_workers
+        self.lookback_trading_days = lookback_trading_days
+
+    def recent_codes(self, trade_date: str) -> List[str]:
+        """
+        统计近期被查询最多的ETF
+
+        以最近几个交易日内用户请求最新价格和日线的次数为依据（预热自身的请求不计数，
+        不会因为上次预热写入了缓存而一直留在预热名单中）
+
+        Args:
+            trade_date: 预热的交易日 (YYYYMMDD格式)
+
+        Returns:
+            List[str]: 按查询热度排序的ETF代码，最多top_n只
+        """
+        dates = []
+        date = trade_date
+        for _ in range(self.lookback_trading_days):
+            dates.append(date)
+            date = self.client.trading_date_manager.get_previous_trading_date(date)
+            if date is None:
+                break
+        counts = Counter(self.client.cache.get_request_counts(dates))
+        return [code for code, _ in counts.most_common(self.top_n)]
+
+    def run(self, trade_date: Optional[str] = None) -> Dict:
+        """
+        执行一次预热（以后台优先级请求富途API，不占用为交互请求预留的额度）
+
+        Args:
+            trade_date: 预热的交易日，默认最近的已收盘交易日
+
+        Returns:
+            Dict: 预热报告（耗时、各类数据的覆盖情况和失败的ETF）
+        """
+        started_at = datetime.now()
+        start_time = time.time()
+        trade_date = trade_date or self.client.trading_date_manager.get_latest_trading_date(None)
+
+        recent_codes = [code for code in self.recent_codes(trade_date) if code not in self.popular_codes]
+        codes = self.popular_codes + recent_codes
+        logger.info(f"→ 开始缓存预热: 交易日{trade_date}, 热门ETF{len(self.popular_codes)}只, "
+                    f"近期查询ETF{len(recent_codes)}只")
+
+        # 全市场日线截面先入库，之后逐只ETF的日线增量大多直接命中存储
+        ingestion = None
+        if self.ingestor is not None:
+            with request_priority(PRIORITY_BACKGROUND):
+                ingestion = self.ingestor.run(end_date=trade_date)
+
+        # 最新价格一次批量快照获取
+        price_start = time.time()
+        with request_priority(PRIORITY_BACKGROUND):
+            prices = self.client.get_latest_prices(codes)
+        price_seconds = time.time() - price_start
+
+        # 日线增量和基础信息按ETF并发获取
+        end_date = trade_date
+        start_date = (datetime.strptime(trade_date, '%Y%m%d') - timedelta(days=HISTORY_WINDOW_DAYS)).strftime('%Y%m%d')
+        detail_start = time.time()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = dict(zip(codes, executor.map(
+                lambda code: self._warm_one(code, start_date, end_date), codes
+            )))
+        detail_seconds = time.time() - detail_start
+
+        # 新的日线已写入存储，重建共享行情面板
+        panel_version = self.client.cache.rebuild_price_panel()
+
+        history_ok = [code for code in codes if results[code]['history']]
+        basic_ok = [code for code in codes if results[code]['basic_info']]
+        failed = sorted(code for code in codes
+                        if code not in prices or not results[code]['history'] or not results[code]['basic_info'])
+
+        report = {
+            'trade_date': trade_date,
+            'started_at': started_at.isoformat(timespec='seconds'),
+            'duration_seconds': round(time.time() - start_time, 2),
+            'price_seconds': round(price_seconds, 2),
+            'detail_seconds': round(detail_seconds, 2),
+            'etf_count': len(codes),
+            'popular_count': len(self.popular_codes),
+            'recent_count': len(recent_codes),
+            'prices': len(prices),
+            'history': len(history_ok),
+            'basic_info': len(basic_ok),
+            'coverage': round((len(codes) - len(failed)) / len(codes), 4) if codes else 1.0,
+            'failed_codes': failed,
+            'panel_version': panel_version,
+            'ingestion': ingestion,
+        }
+        logger.info(f"✓ 缓存预热完成: 交易日{trade_date}, {len(codes)}只ETF, 耗时{report['duration_seconds']}s, "
+                    f"价格{report['prices']}/历史{report['history']}/基础信息{report['basic_info']}, "
+                    f"覆盖率{report['coverage']:.1%}")
+        return report
+
+    def _warm_one(self, etf_code: str, start_date: str, end_date: str) -> Dict[str, bool]:
+        """预热单只ETF的日线和基础信息（在线程池中执行，需单独设置优先级）"""
+        with request_priority(PRIORITY_BACKGROUND):
+            return self._warm_one_background(etf_code, start_date, end_date)
+
+    def _warm_one_background(self, etf_code: str, start_date: str, end_date: str) -> Dict[str, bool]:
+        """预热单只ETF的日线和基础信息"""
+        result = {'history': False, 'basic_info': False}
+        try:
+            df = self.client.get_etf_daily_data(etf_code, start_date, end_date)
+            result['history'] = df is not None
+        except Exception as e:
+            logger.warning(f"预热ETF {etf_code} 日线数据失败: {e}")
+        try:
+            result['basic_info'] = bool(self.client.get_etf_basic_info(etf_code))
+            self.client.get_etf_name(etf_code)
+        except Exception as e:
+            logger.warning(f"预热ETF {etf_code} 基础信息失败: {e}")
+        return result
+
+
+class CacheWarmupScheduler:
+    """收盘后缓存预热调度器（后台线程）"""
+
+    def __init__(self, warmer: CacheWarmer, delay_minutes: int = WARMUP_DELAY_MINUTES,
+                 check_interval: float = SCHEDULER_CHECK_INTERVAL):
+        """
+        初始化调度器
+
+        Args:
+            warmer: 预热任务
+            delay_minutes: 收盘后延迟多少分钟开始预热
+            check_interval: 检查间隔（秒）
+        """
+        self.warmer = warmer
+        self.delay_minutes = delay_minutes
+        self.check_interval = check_interval
+        self.state_dir = os.path.join(warmer.client.cache.cache_dir, "warmup")
+        os.makedirs(self.state_dir, exist_ok=True)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """启动后台调度线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="cache-warmup", daemon=True)
+        self._thread.start()
+        logger.info(f"缓存预热调度器已启动: 收盘后{self.delay_minutes}分钟开始预热")
+
+    def stop(self):
+        """停止后台调度线程"""
+        self._stop.set()
+
+    def _loop(self):
+        """定期检查是否需要预热"""
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.run_if_due()
+            except Exception as e:
+                logger.error(f"缓存预热失败: {e}")
+
+    def _report_file(self, trade_date: str) -> str:
+        return os.path.join(self.state_dir, f"{trade_date}.json")
+
+    def run_if_due(self, now: Optional[datetime] = None) -> Optional[Dict]:
+        """
+        到达预热时间且当日尚未预热时执行预热
+
+        Args:
+            now: 当前时间，默认系统时间
+
+        Returns:
+            Dict: 本次执行的预热报告；未执行时返回None
+        """
+        now = now or datetime.now()
+        today = now.strftime('%Y%m%d')
+        close_time = self.warmer.client.trading_date_manager.market_close_time
+        due_time = datetime.strptime(f"{today} {close_time}", '%Y%m%d %H:%M') + timedelta(minutes=self.delay_minutes)
+
+        # 仅在交易日收盘后（最近交易日已切换为当日）预热
+        if now < due_time or self.warmer.client.trading_date_manager.get_latest_trading_date(None) != today:
+            return None
+        if os.path.exists(self._report_file(today)):
+            return None
+
+        lock_file = os.path.join(self.state_dir, f"{today}.lock")
+        if not self._acquire_lock(lock_file):
+            return None
+        try:
+            if os.path.exists(self._report_file(today)):
+                return None
+            report = self.warmer.run(today)
+            self._save_report(today, report)
+            return report
+        finally:
+            try:
+                os.remove(lock_file)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _acquire_lock(lock_file: str) -> bool:
+        """创建锁文件，已被其他进程持有时返回False"""
+        try:
+            if time.time() - os.path.getmtime(lock_file) > STALE_LOCK_SECONDS:
+                os.remove(lock_file)
+        except OSError:
+            pass
+        try:
+            fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        return True
+
+    def _save_report(self, trade_date: str, report: Dict):
+        """原子写入预热报告"""
+        report_file = self._report_file(trade_date)
+        tmp_file = f"{report_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, report_file)
+
+    def get_last_report(self) -> Optional[Dict]:
+        """获取最近一次预热报告"""
+        try:
+            reports = sorted(name for name in os.listdir(self.state_dir) if name.endswith('.json'))
+            if not reports:
+                return None
+            with open(os.path.join(self.state_dir, reports[-1]), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
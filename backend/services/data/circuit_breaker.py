@@ -0,0 +1,160 @@
+"""
+富途行情连接熔断器
+OpenD不可用时每次请求都要等到socket超时才失败，所有工作线程的延迟随之堆积。
+连续失败达到阈值后熔断器打开，之后的调用立即抛出CircuitOpenError（调用方改用缓存中的旧数据）；
+打开一段时间后进入半开状态，只放行一次探测调用，成功则关闭，失败则重新打开
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Dict
+import futu as ft
+
+logger = logging.getLogger(__name__)
+
+# 连续失败多少次后打开熔断器
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('FUTU_CIRCUIT_FAILURE_THRESHOLD', 5))
+
+# 熔断器打开后多久进入半开状态探测（秒）
+CIRCUIT_RESET_SECONDS = float(os.getenv('FUTU_CIRCUIT_RESET_SECONDS', 30))
+
+# 熔断器状态
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+# 返回RET_ERROR时表示网关或连接故障的错误信息关键字（其余错误如代码不存在说明网关正常）
+GATEWAY_ERROR_KEYWORDS = ('连接', '断开', '超时', '网络', 'timeout', 'disconnect', 'connect')
+
+# 不访问网关、无需熔断保护的方法
+UNGUARDED_METHODS = ('set_handler', 'close')
+
+
+class CircuitOpenError(Exception):
+    """熔断器已打开，调用方应改用缓存中的旧数据"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} 熔断中，约{retry_after:.1f}秒后重试")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """连续失败计数熔断器（线程安全）"""
+
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_seconds: float = CIRCUIT_RESET_SECONDS):
+        """
+        初始化熔断器
+
+        Args:
+            name: 被保护的对象名称（用于日志和错误信息）
+            failure_threshold: 连续失败多少次后打开
+            reset_seconds: 打开后多久进入半开状态（秒）
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._stats = {'opens': 0, 'rejected': 0}
+
+    def before_call(self):
+        """
+        调用前检查，半开状态下只放行一次探测调用
+
+        Raises:
+            CircuitOpenError: 熔断器打开或半开状态下已有探测调用
+        """
+        with self._lock:
+            if self._state == STATE_CLOSED:
+                return
+            now = time.time()
+            if self._state == STATE_OPEN and now - self._opened_at >= self.reset_seconds:
+                self._state = STATE_HALF_OPEN
+                logger.info(f"{self.name} 熔断器进入半开状态，放行一次探测调用")
+            if self._state == STATE_HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            self._stats['rejected'] += 1
+            raise CircuitOpenError(self.name, max(self._opened_at + self.reset_seconds - now, 0))
+
+    def record_success(self):
+        """记录一次成功调用"""
+        with self._lock:
+            if self._state != STATE_CLOSED:
+                logger.info(f"{self.name} 探测调用成功，熔断器关闭")
+            self._state = STATE_CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self, error: object = None):
+        """记录一次失败调用，连续失败达到阈值或探测失败时打开熔断器"""
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._state == STATE_HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != STATE_OPEN:
+                    self._stats['opens'] += 1
+                    logger.warning(f"{self.name} 连续失败{self._failures}次，熔断器打开"
+                                   f"{self.reset_seconds:.0f}秒: {error}")
+                self._state = STATE_OPEN
+                self._opened_at = time.time()
+
+    def get_status(self) -> Dict:
+        """
+        获取熔断器状态
+
+        Returns:
+            dict: 状态、连续失败次数、距下次探测的秒数和统计
+        """
+        with self._lock:
+            retry_after = max(self._opened_at + self.reset_seconds - time.time(), 0) \
+                if self._state == STATE_OPEN else 0
+            return {
+                'state': self._state,
+                'consecutive_failures': self._failures,
+                'failure_threshold': self.failure_threshold,
+                'retry_after_seconds': round(retry_after, 1),
+                **self._stats
+            }
+
+
+def is_gateway_error(data: object) -> bool:
+    """判断RET_ERROR的错误信息是否为网关或连接故障"""
+    message = str(data).lower()
+    return any(keyword in message for keyword in GATEWAY_ERROR_KEYWORDS)
+
+
+class GuardedQuoteContext:
+    """受熔断器保护的行情连接：网关调用前检查熔断器，按调用结果记录成功或失败"""
+
+    def __init__(self, ctx, breaker: CircuitBreaker):
+        self._ctx = ctx
+        self._breaker = breaker
+
+    def __getattr__(self, name):
+        attr = getattr(self._ctx, name)
+        if not callable(attr) or name in UNGUARDED_METHODS:
+            return attr
+
+        def guarded(*args, **kwargs):
+            self._breaker.before_call()
+            try:
+                result = attr(*args, **kwargs)
+            except Exception as e:
+                self._breaker.record_failure(e)
+                raise
+            ret = result[0] if isinstance(result, tuple) and result else None
+            if ret == ft.RET_ERROR and is_gateway_error(result[1]):
+                self._breaker.record_failure(result[1])
+            else:
+                self._breaker.record_success()
+            return result
+
+        return guarded
@@ -0,0 +1,277 @@
+"""
+全市场日线按交易日入库
+每个交易日一次获取全部ETF的日线截面，按ETF合并进列式存储，
+维护约1000只ETF的日线只需每天一次截面请求，而不是逐只ETF请求K线。
+
+截面来源：
+    tushare   Tushare fund_daily按trade_date一次返回全部ETF（可补历史交易日，需要tushare包和积分）
+    futu      收盘后的富途行情快照（每400只一次请求，只能获取最近一个交易日）
+
+已完成的交易日记录在检查点文件中，任务可以重复执行（同一交易日的K线覆盖写入），
+中断后从未完成的交易日继续
+"""
+
+import os
+import time
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import pandas as pd
+
+from ..interfaces import DataInterface
+from .bar_store import BAR_COLUMNS
+from .cache_file import CacheEntryCorrupt, read_entry, write_entry
+from .rate_limiter import QuotaExhaustedError
+
+logger = logging.getLogger(__name__)
+
+# 截面来源
+INGESTION_SOURCE = os.getenv('DAILY_INGESTION_SOURCE', 'futu')
+
+# 未指定开始日期时的入库窗口（最近的交易日数），窗口内未完成的交易日每次执行都会重试
+# （futu来源只能获取最近一个交易日，更早的交易日跳过）
+INGESTION_BACKFILL_DAYS = int(os.getenv('DAILY_INGESTION_BACKFILL_DAYS', 10))
+
+# 检查点中保留的已完成交易日数量
+CHECKPOINT_KEEP_DATES = 400
+
+CROSS_SECTION_COLUMNS = ['ts_code', 'trade_date', 'open', 'high', 'low', 'close', 'vol', 'amount']
+
+
+class TushareFundDailySource:
+    """Tushare fund_daily截面来源：按trade_date分页获取全部ETF日线"""
+
+    # fund_daily单次最多返回的行数
+    PAGE_SIZE = 2000
+
+    def __init__(self, token: str, timeout: int = 30):
+        """
+        Args:
+            token: Tushare API Token
+            timeout: 请求超时(秒)
+        """
+        import tushare as ts
+        self.pro = ts.pro_api(token, timeout=timeout)
+
+    def fetch(self, trade_date: str, latest_trading_date: str) -> Optional[pd.DataFrame]:
+        """
+        获取某交易日全部ETF的日线截面
+
+        Args:
+            trade_date: 交易日 (YYYYMMDD格式)
+            latest_trading_date: 最近的已收盘交易日（本来源不受限制）
+
+        Returns:
+            DataFrame: 列格式同CROSS_SECTION_COLUMNS（成交量为股、成交额为元）
+        """
+        pages = []
+        offset = 0
+        while True:
+            page = self.pro.fund_daily(trade_date=trade_date, offset=offset, limit=self.PAGE_SIZE)
+            pages.append(page)
+            if len(page) < self.PAGE_SIZE:
+                break
+            offset += self.PAGE_SIZE
+
+        df = pd.concat(pages, ignore_index=True)
+        return pd.DataFrame({
+            'ts_code': df['ts_code'].str.split('.').str[0].to_numpy(),
+            'trade_date': pd.to_datetime(df['trade_date'], format='%Y%m%d').to_numpy(),
+            'open': df['open'].to_numpy(dtype=float),
+            'high': df['high'].to_numpy(dtype=float),
+            'low': df['low'].to_numpy(dtype=float),
+            'close': df['close'].to_numpy(dtype=float),
+            # fund_daily的成交量单位为手、成交额单位为千元，与富途K线统一为股和元
+            'vol': (df['vol'].to_numpy(dtype=float) * 100).round().astype('int64'),
+            'amount': df['amount'].to_numpy(dtype=float) * 1000,
+        }, columns=CROSS_SECTION_COLUMNS)
+
+
+class FutuSnapshotSource:
+    """富途行情快照截面来源：收盘后对全部ETF批量请求快照，只能获取最近一个交易日"""
+
+    def __init__(self, client):
+        """
+        Args:
+            client: 富途API数据客户端
+        """
+        self.client = client
+
+    def fetch(self, trade_date: str, latest_trading_date: str) -> Optional[pd.DataFrame]:
+        """
+        获取某交易日全部ETF的日线截面
+
+        Args:
+            trade_date: 交易日 (YYYYMMDD格式)
+            latest_trading_date: 最近的已收盘交易日
+
+        Returns:
+            DataFrame: 列格式同CROSS_SECTION_COLUMNS；不是最近交易日或获取失败时返回None
+        """
+        if trade_date != latest_trading_date:
+            logger.info(f"富途快照只能获取最近交易日{latest_trading_date}的截面，跳过{trade_date}")
+            return None
+        codes = self.client.list_etf_codes()
+        if not codes:
+            logger.error("✗ ETF代码表不可用，无法获取日线截面")
+            return None
+        return self.client.get_snapshot_bars(codes, trade_date)
+
+
+def create_cross_section_source(name: str, client):
+    """
+    按名称创建截面来源
+
+    Args:
+        name: tushare或futu
+        client: 富途API数据客户端
+
+    Returns:
+        截面来源；tushare不可用时退回futu
+    """
+    if name == 'tushare':
+        try:
+            from config.settings import settings
+            return TushareFundDailySource(settings.tushare_token, settings.tushare_timeout)
+        except ImportError:
+            logger.warning("未安装tushare，日线截面改用富途行情快照")
+    elif name != 'futu':
+        raise ValueError(f"不支持的日线截面来源: {name}，可选: tushare, futu")
+    return FutuSnapshotSource(client)
+
+
+class UniverseDataService(DataInterface):
+    """全市场日线数据服务：按交易日截面入库，单只ETF的读取从列式存储命中"""
+
+    def __init__(self, client, source=None, state_dir: Optional[str] = None):
+        """
+        初始化数据服务
+
+        Args:
+            client: 富途API数据客户端
+            source: 截面来源，默认按环境变量DAILY_INGESTION_SOURCE创建
+            state_dir: 检查点目录，默认为缓存目录下的ingestion
+        """
+        self.client = client
+        self.source = source or create_cross_section_source(INGESTION_SOURCE, client)
+        self.state_dir = state_dir or os.path.join(client.cache.cache_dir, "ingestion")
+        os.makedirs(self.state_dir, exist_ok=True)
+        self.checkpoint_file = os.path.join(self.state_dir, "daily_bars.json")
+
+    # ---- DataInterface ----
+
+    def get_etf_basic_info(self, etf_code: str) -> Dict:
+        """获取ETF基础信息"""
+        return self.client.get_etf_basic_info(etf_code)
+
+    def get_historical_data(self, etf_code: str, days: int) -> pd.DataFrame:
+        """获取最近days个自然日的日线数据（入库任务维护的区间直接命中列式存储）"""
+        end_date = self.client.trading_date_manager.get_latest_trading_date(None)
+        start_date = (datetime.strptime(end_date, '%Y%m%d') - timedelta(days=days)).strftime('%Y%m%d')
+        return self.client.get_etf_daily_data(etf_code, start_date, end_date)
+
+    def get_latest_price(self, etf_code: str) -> Dict:
+        """获取最新价格"""
+        return self.client.get_latest_price(etf_code)
+
+    # ---- 入库任务 ----
+
+    def completed_dates(self) -> List[str]:
+        """已完成入库的交易日（升序）"""
+        try:
+            return read_entry(self.checkpoint_file)['completed']
+        except FileNotFoundError:
+            return []
+        except (CacheEntryCorrupt, KeyError, TypeError) as e:
+            logger.warning(f"日线入库检查点损坏，视为未入库: {self.checkpoint_file}, 错误: {e}")
+            return []
+
+    def _mark_completed(self, trade_date: str):
+        """记录已完成的交易日（持锁读-改-写，多进程同时执行时不丢失记录）"""
+        with self.client.cache.locks.lock(self.checkpoint_file):
+            completed = sorted(set(self.completed_dates()) | {trade_date})[-CHECKPOINT_KEEP_DATES:]
+            write_entry(self.checkpoint_file, {'completed': completed})
+
+    def ingest_date(self, trade_date: str, latest_trading_date: Optional[str] = None) -> Optional[int]:
+        """
+        获取一个交易日的全市场截面并按ETF合并进列式存储
+
+        Args:
+            trade_date: 交易日 (YYYYMMDD格式)
+            latest_trading_date: 最近的已收盘交易日，默认从交易日管理器获取
+
+        Returns:
+            int: 入库的ETF数量；截面不可用时返回None
+        """
+        latest_trading_date = latest_trading_date or self.client.trading_date_manager.get_latest_trading_date(None)
+        df = self.source.fetch(trade_date, latest_trading_date)
+        if df is None or df.empty:
+            return None
+
+        # 覆盖区间从上一交易日的次日开始，使周末和节假日与前一段覆盖区间相连，读取窗口时不产生缺口
+        previous_date = self.client.trading_date_manager.get_previous_trading_date(trade_date)
+        cover_start = (datetime.strptime(previous_date, '%Y%m%d') + timedelta(days=1)).strftime('%Y%m%d') \
+            if previous_date else trade_date
+
+        # 派生列在合并时按完整序列重新计算
+        df = df.assign(pre_close=0.0, change=0.0, pct_chg=0.0, amplitude=0.0)[BAR_COLUMNS]
+        for etf_code, bars in df.groupby('ts_code', sort=False):
+            self.client.cache.set_historical_cache(etf_code, cover_start, trade_date, bars)
+
+        self._mark_completed(trade_date)
+        logger.info(f"✓ 交易日{trade_date}日线截面入库完成，共{len(df)}只ETF")
+        return len(df)
+
+    def run(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict:
+        """
+        入库区间内尚未完成的交易日（可重复执行）
+
+        Args:
+            start_date: 开始日期，默认为最近DAILY_INGESTION_BACKFILL_DAYS个交易日的第一天
+                （窗口内失败或跳过的交易日下次执行时重试）
+            end_date: 结束日期，默认最近的已收盘交易日
+
+        Returns:
+            Dict: 入库报告（完成、跳过和失败的交易日及耗时）
+        """
+        start_time = time.time()
+        trading_date_manager = self.client.trading_date_manager
+        latest_trading_date = trading_date_manager.get_latest_trading_date(None)
+        end_date = min(end_date or latest_trading_date, latest_trading_date)
+
+        completed = set(self.completed_dates())
+        if start_date is None:
+            # 按交易日数的两倍再加两周估算自然日跨度，覆盖周末和长假
+            backfill_days = max(INGESTION_BACKFILL_DAYS, 1)
+            window_start = (datetime.strptime(end_date, '%Y%m%d') -
+                            timedelta(days=backfill_days * 2 + 14)).strftime('%Y%m%d')
+            trading_days = (trading_date_manager.get_trading_days_between(window_start, end_date) or
+                            [end_date])[-backfill_days:]
+            start_date = trading_days[0]
+        else:
+            trading_days = trading_date_manager.get_trading_days_between(start_date, end_date) or [end_date]
+        pending = [date for date in trading_days if date not in completed]
+
+        report = {'start_date': start_date, 'end_date': end_date, 'completed': [], 'skipped': [],
+                  'failed': [], 'etf_count': 0}
+        for trade_date in pending:
+            try:
+                count = self.ingest_date(trade_date, latest_trading_date)
+            except QuotaExhaustedError as e:
+                logger.warning(f"⚠ {e}，日线入库在交易日{trade_date}中止，下次从此处继续")
+                report['failed'].append(trade_date)
+                break
+            except Exception as e:
+                logger.error(f"✗ 交易日{trade_date}日线截面入库失败: {e}")
+                report['failed'].append(trade_date)
+                continue
+            if count is None:
+                report['skipped'].append(trade_date)
+            else:
+                report['completed'].append(trade_date)
+                report['etf_count'] += count
+
+        report['duration_seconds'] = round(time.time() - start_time, 2)
+        logger.info(f"日线截面入库结束: 完成{len(report['completed'])}个交易日, 跳过{len(report['skipped'])}个, "
+                    f"失败{len(report['failed'])}个, 耗时{report['duration_seconds']}s")
+        return report
@@ -1,13 +1,56 @@
 import os
+import numpy as np
 import pandas as pd
 import logging
 from datetime import datetime, timedelta
-from typing import Optional, Dict, List
+from typing import Optional, Dict, Iterator, List
+from .bar_store import BAR_COLUMNS, compute_price_fields
+from .adjustment import ADJUST_QFQ, ADJUST_HFQ, apply_adjustment, rehab_to_factors
+from .minute_bar_store import MINUTE_BAR_COLUMNS, MINUTE_FREQS, month_chunks
 from .cache_service import EnhancedCache, TradingDateManager
+from .single_flight import single_flight
+from .quote_context import get_quote_context_manager
+from .futu_replay import PROVIDER_MODE, PROVIDER_LIVE
+from .price_book import QUOTE_PUSH_ENABLED, get_quote_subscriber
+from .symbol_index import SymbolIndex
+from .rate_limiter import PRIORITY_BACKGROUND, QuotaExhaustedError, current_priority, get_rate_limiter
+from .revalidate import background_refresher
+from .circuit_breaker import is_gateway_error
 import futu as ft
+from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# 富途行情快照单次请求的最大代码数
+SNAPSHOT_BATCH_SIZE = 400
+
+# 历史K线每页请求的最大条数（富途API单页上限为1000）
+HISTORY_PAGE_SIZE = 1000
+
+# 新交易日尚无价格缓存时，不超过该交易日数的旧价格先返回并在后台刷新
+PRICE_REVALIDATE_MAX_AGE_DAYS = int(os.getenv('PRICE_REVALIDATE_MAX_AGE_DAYS', 1))
+
+# 网关出错或额度用完时可以返回的旧价格的最大交易日数
+STALE_PRICE_MAX_AGE_DAYS = int(os.getenv('STALE_PRICE_MAX_AGE_DAYS', 5))
+
+# 证券基本信息超过该天数后在后台刷新（刷新失败继续使用旧信息）
+BASIC_INFO_REFRESH_DAYS = int(os.getenv('BASIC_INFO_REFRESH_DAYS', 30))
+
+# 上游确认证券代码不存在后，短期内不再请求的时间（秒）
+NEGATIVE_CACHE_TTL = int(os.getenv('NEGATIVE_CACHE_TTL', 600))
+
+# get_stock_basicinfo返回RET_ERROR时表示代码不存在的错误信息关键字
+NOT_FOUND_KEYWORDS = ('未知', '不存在', 'unknown', 'not exist')
+
+# 分钟周期对应的富途K线类型
+MINUTE_KTYPES = {
+    '1min': ft.KLType.K_1M,
+    '5min': ft.KLType.K_5M,
+    '15min': ft.KLType.K_15M,
+    '30min': ft.KLType.K_30M,
+    '60min': ft.KLType.K_60M,
+}
+
 
 class futuClient:
     """富途API数据客户端 - 使用增强缓存策略（兼容原TushareClient接口）"""
@@ -17,140 +60,454 @@ class futuClient:
         self.host = os.getenv('FUTU_HOST', '127.0.0.1')
         self.port = int(os.getenv('FUTU_PORT', 11111))
         
-        # 初始化富途API连接
-        self.quote_ctx = ft.OpenQuoteContext(host=self.host, port=self.port)
+        # 进程级共享的富途行情连接，首次使用时才建立
+        self.quote_context_manager = get_quote_context_manager(self.host, self.port)
         
         # 初始化增强缓存管理器
-        self.cache = EnhancedCache(cache_dir)
+        self.cache = EnhancedCache(cache_dir, storage_layout=settings.cache_storage_layout,
+                                   backend=settings.cache_backend)
         
         # 初始化交易日管理器
-        self.trading_date_manager = TradingDateManager(self.cache)
+        self.trading_date_manager = TradingDateManager(self.cache, lambda: self.quote_ctx)
+        
+        # 进程级并发请求合并
+        self.single_flight = single_flight
+        
+        # 进程级后台刷新任务池（先返回旧缓存，后台刷新）
+        self.background_refresher = background_refresher
+        
+        # 各工作进程共享的富途接口限流器
+        self.rate_limiter = get_rate_limiter(os.path.join(cache_dir, "ratelimit"))
+        
+        # 进程级共享的报价推送订阅器（只在直连模式启用：录制和回放都不经过推送，使用行情快照）
+        self.quote_subscriber = get_quote_subscriber(self.quote_context_manager) \
+            if QUOTE_PUSH_ENABLED and PROVIDER_MODE == PROVIDER_LIVE else None
+        
+        # ETF代码索引（按交易日刷新）
+        self._symbol_index: Optional[SymbolIndex] = None
         
         logger.info("富途API客户端初始化成功（增强缓存版本）")
     
-    def get_etf_daily_data(self, etf_code: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+    @property
+    def quote_ctx(self) -> ft.OpenQuoteContext:
+        """当前进程共享的富途行情连接"""
+        return self.quote_context_manager.get()
+    
+    def get_etf_daily_data(self, etf_code: str, start_date: str, end_date: str,
+                           adj: str = ADJUST_QFQ) -> Optional[pd.DataFrame]:
         """
-        获取ETF日线数据（历史数据范围缓存）
+        获取ETF日线数据（按ETF合并的增量历史缓存）
+        
+        每只ETF只维护一份合并后的不复权日线序列，请求窗口中未缓存的头部、尾部或中间缺口
+        才会向富途API补充获取，日常刷新只需拉取最新的增量K线；复权在读取时按复权因子计算
         
         Args:
             etf_code: ETF代码（不含市场后缀）
             start_date: 开始日期 (YYYYMMDD格式)
             end_date: 结束日期 (YYYYMMDD格式)
+            adj: 复权方式（qfq前复权、hfq后复权、none不复权）
             
         Returns:
             DataFrame: ETF日线数据
         """
+        self._record_request(etf_code)
+        df = self._get_raw_daily_data(etf_code, start_date, end_date)
+        if df is None:
+            return None
+        return self._adjust_daily_bars(etf_code, df, adj)
+    
+    def _get_raw_daily_data(self, etf_code: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        """获取不复权日线数据（历史缓存未覆盖的区间向富途API补充获取）"""
+        # 结束日期不超过最近的已收盘交易日，未收盘的当日K线不进入缓存
+        latest_trading_date = self.trading_date_manager.get_latest_trading_date(None)
+        end_date = min(end_date, latest_trading_date)
+        
         # 1. 先检查历史数据缓存
-        cached_data = self.cache.get_historical_cache(etf_code, start_date, end_date)
-        if cached_data:
+        cached_df = self.cache.get_historical_cache(etf_code, start_date, end_date)
+        if cached_df is not None:
             logger.info(f"✓ 从历史缓存获取ETF {etf_code} 日线数据 ({start_date}~{end_date})")
-            # 将缓存的字典数据转换回DataFrame
-            df = pd.DataFrame(cached_data)
-            # 确保trade_date是datetime类型
-            df['trade_date'] = pd.to_datetime(df['trade_date'])
-            return df
+            return cached_df
+        
+        # 2. 同一窗口的并发未命中合并为一次补充获取
+        return self.single_flight.do(
+            f"historical:{etf_code}:{start_date}:{end_date}",
+            self._fill_daily_data, etf_code, start_date, end_date
+        )
+    
+    def _fill_daily_data(self, etf_code: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        """
+        补充获取历史缓存中缺失的区间并返回完整窗口数据
         
-        # 2. 缓存未命中，使用富途API获取真实数据
-        logger.info(f"→ 历史缓存未命中，使用富途API获取ETF {etf_code} 日线数据 ({start_date}~{end_date})")
+        Args:
+            etf_code: ETF代码（不含市场后缀）
+            start_date: 开始日期 (YYYYMMDD格式)
+            end_date: 结束日期 (YYYYMMDD格式)
+            
+        Returns:
+            DataFrame: ETF日线数据，获取失败返回None
+        """
+        # 仅获取缓存中缺失的日期区间
+        missing_ranges = self.cache.get_historical_missing_ranges(etf_code, start_date, end_date)
+        logger.info(f"→ 历史缓存缺少{len(missing_ranges)}个区间，使用富途API补充获取ETF {etf_code} 日线数据 "
+                    f"({', '.join(f'{s}~{e}' for s, e in missing_ranges)})")
         
         try:
-            # 补全ETF代码，添加市场前缀
-            full_etf_code = self._complete_etf_code(etf_code)
+            for gap_start, gap_end in missing_ranges:
+                # 逐页获取并写入历史缓存，中途失败时已写入的页保留，下次只补剩余部分
+                if not self._stream_daily_bars(etf_code, gap_start, gap_end):
+                    return None
+        except QuotaExhaustedError as e:
+            logger.warning(f"⚠ {e}，返回历史缓存中已有的ETF {etf_code} 日线数据")
+            return self.cache.get_historical_stale(etf_code, start_date, end_date)
+        
+        df = self.cache.get_historical_cache(etf_code, start_date, end_date)
+        if df is None:
+            logger.warning(f"历史缓存合并后读取失败: ETF {etf_code} ({start_date}~{end_date})")
+        
+        return df
+    
+    def _iter_history_kline_pages(self, full_code: str, start_date: str, end_date: str,
+                                  ktype=ft.KLType.K_DAY, autype=ft.AuType.QFQ) -> Iterator[pd.DataFrame]:
+        """
+        分页获取K线数据，按时间顺序逐页返回
+        
+        按request_history_kline返回的page_req_key继续请求下一页，直到数据取完，
+        只保留当前页，长区间不会一次性占用全部内存
+        
+        Args:
+            full_code: 带市场前缀的证券代码
+            start_date: 开始日期 (YYYYMMDD格式)
+            end_date: 结束日期 (YYYYMMDD格式)
+            ktype: K线类型
+            autype: 复权类型
             
-            # 将YYYYMMDD格式转换为富途API期望的YYYY-MM-DD格式
-            start_date_formatted = f"{start_date[:4]}-{start_date[4:6]}-{start_date[6:]}"
-            end_date_formatted = f"{end_date[:4]}-{end_date[4:6]}-{end_date[6:]}"
+        Yields:
+            DataFrame: 富途API返回的单页K线数据
             
-            # 使用富途API获取日线数据，不指定fields参数，使用默认值
+        Raises:
+            RuntimeError: 富途API返回错误
+            QuotaExhaustedError: 接口额度已用完
+        """
+        # 将YYYYMMDD格式转换为富途API期望的YYYY-MM-DD格式
+        start_date_formatted = f"{start_date[:4]}-{start_date[4:6]}-{start_date[6:]}"
+        end_date_formatted = f"{end_date[:4]}-{end_date[4:6]}-{end_date[6:]}"
+        
+        page_req_key = None
+        while True:
+            self.rate_limiter.acquire('history_kline')
             ret, data, page_req_key = self.quote_ctx.request_history_kline(
-                code=full_etf_code,
+                code=full_code,
                 start=start_date_formatted,
                 end=end_date_formatted,
-                ktype=ft.KLType.K_DAY,
-                autype=ft.AuType.QFQ
+                ktype=ktype,
+                autype=autype,
+                max_count=HISTORY_PAGE_SIZE,
+                page_req_key=page_req_key
             )
             
             if ret != ft.RET_OK:
-                logger.error(f"✗ 富途API获取ETF {etf_code} 日线数据失败: {data}")
-                return None
+                raise RuntimeError(f"富途API获取 {full_code} K线数据失败: {data}")
+            
+            yield data
+            
+            if page_req_key is None:
+                break
+    
+    def _stream_daily_bars(self, etf_code: str, start_date: str, end_date: str) -> bool:
+        """
+        分页获取指定区间的ETF不复权日线数据，每页到达后立即合并到历史缓存
+        
+        每页覆盖到该页最后一根K线的日期，全部取完后整个区间记为已覆盖
+        
+        Args:
+            etf_code: ETF代码（不含市场后缀）
+            start_date: 开始日期 (YYYYMMDD格式)
+            end_date: 结束日期 (YYYYMMDD格式)
             
-            # 转换为DataFrame
-            df = pd.DataFrame(data)
-            
-            # 转换日期格式
-            df['trade_date'] = pd.to_datetime(df['time_key']).dt.strftime('%Y%m%d')
-            df['trade_date'] = pd.to_datetime(df['trade_date'])
-            
-            # 转换数据类型为Python原生类型
-            df['open'] = df['open'].astype(float)
-            df['high'] = df['high'].astype(float)
-            df['low'] = df['low'].astype(float)
-            df['close'] = df['close'].astype(float)
-            df['volume'] = df['volume'].astype(int)
-            df['turnover'] = df['turnover'].astype(float)
-            
-            # 计算前收盘价
-            df['pre_close'] = df['close'].shift(1)
-            df.loc[0, 'pre_close'] = df.loc[0, 'open']  # 第一个数据的前收盘价设为开盘价
-            df['pre_close'] = df['pre_close'].astype(float)
-            
-            # 计算涨跌额和涨跌幅
-            df['change'] = df['close'] - df['pre_close']
-            df['pct_chg'] = df['change'] / df['pre_close'] * 100
-            df['change'] = df['change'].astype(float)
-            df['pct_chg'] = df['pct_chg'].astype(float)
-            
-            # 计算日振幅
-            df['amplitude'] = (df['high'] - df['low']) / df['pre_close'] * 100
-            df['amplitude'] = df['amplitude'].astype(float)
-            
-            # 重命名列以匹配Tushare格式
-            df = df.rename(columns={
-                'volume': 'vol',
-                'turnover': 'amount'
-            })
-            
-            # 添加ts_code列
-            df['ts_code'] = etf_code
-            
-            # 只保留Tushare格式的列
-            df = df[['ts_code', 'trade_date', 'open', 'high', 'low', 'close', 
-                     'pre_close', 'change', 'pct_chg', 'vol', 'amount', 'amplitude']]
-            
-            # 数据排序和重置索引
-            df = df.sort_values('trade_date')
-            df = df.reset_index(drop=True)
-            
-            # 3. 保存真实数据到历史缓存（转换为字典格式）
-            cache_data = df.to_dict('records')
-            self.cache.set_historical_cache(etf_code, start_date, end_date, cache_data)
-            logger.info(f"✓ ETF {etf_code} 日线数据获取成功并已缓存，共{len(df)}条记录")
+        Returns:
+            bool: 区间是否全部获取成功
+            
+        Raises:
+            QuotaExhaustedError: 接口额度已用完（已获取的页保留在缓存中）
+        """
+        # 补全ETF代码，添加市场前缀
+        full_etf_code = self._complete_etf_code(etf_code)
+        
+        page_start = start_date
+        pages = 0
+        bars = 0
+        try:
+            for data in self._iter_history_kline_pages(full_etf_code, start_date, end_date,
+                                                       autype=ft.AuType.NONE):
+                pages += 1
+                if data.empty:
+                    continue
+                
+                df = self._kline_to_daily_bars(data, etf_code)
+                page_end = df['trade_date'].iloc[-1].strftime('%Y%m%d')
+                self.cache.set_historical_cache(etf_code, page_start, page_end, df)
+                bars += len(df)
+                page_start = page_end
+            
+            # 最后一页之后直到区间结束没有K线（如节假日），同样记为已覆盖
+            self.cache.set_historical_cache(etf_code, page_start, end_date, None)
+            
+        except QuotaExhaustedError:
+            raise
+        except Exception as e:
+            logger.error(f"✗ 获取ETF {etf_code} 日线数据失败 ({start_date}~{end_date})，"
+                         f"已缓存{pages}页: {str(e)}")
+            return False
+        
+        logger.info(f"✓ ETF {etf_code} 日线数据获取成功 ({start_date}~{end_date})，共{pages}页{bars}条记录")
+        return True
+    
+    def _adjust_daily_bars(self, etf_code: str, df: pd.DataFrame, adj: str) -> pd.DataFrame:
+        """
+        按复权因子对不复权日线做前复权或后复权
+        
+        Args:
+            etf_code: ETF代码（不含市场后缀）
+            df: 不复权日线数据
+            adj: 复权方式
             
+        Returns:
+            DataFrame: 复权后的日线数据；复权因子不可用时返回不复权数据
+        """
+        if adj not in (ADJUST_QFQ, ADJUST_HFQ):
+            return apply_adjustment(df, None, adj)
+        
+        factors = self.get_adjust_factors(etf_code)
+        if factors is None:
+            logger.warning(f"⚠ ETF {etf_code} 复权因子不可用，返回不复权日线数据")
             return df
+        return apply_adjustment(df, factors, adj)
+    
+    def get_adjust_factors(self, etf_code: str) -> Optional[List[Dict]]:
+        """
+        获取ETF复权因子（永久缓存，每个交易日刷新一次）
+        
+        分红、拆分等公司行为只改变复权因子，历史缓存中的不复权日线不受影响
+        
+        Args:
+            etf_code: ETF代码（不含市场后缀）
+            
+        Returns:
+            List[Dict]: 按除权日升序的复权因子；获取失败且没有缓存时返回None
+        """
+        latest_trading_date = self.trading_date_manager.get_latest_trading_date(None)
+        cached = self.cache.get_permanent_cache("adj_factors", etf_code)
+        if cached and cached.get('trade_date') == latest_trading_date:
+            return cached['factors']
+        
+        try:
+            full_etf_code = self._complete_etf_code(etf_code)
+            self.rate_limiter.acquire('rehab')
+            ret, data = self.quote_ctx.get_rehab(full_etf_code)
+            if ret != ft.RET_OK:
+                raise RuntimeError(f"富途API获取 {full_etf_code} 复权因子失败: {data}")
+            
+            factors = rehab_to_factors(data)
+            self.cache.set_permanent_cache("adj_factors", etf_code,
+                                           {'trade_date': latest_trading_date, 'factors': factors})
+            logger.info(f"✓ ETF {etf_code} 复权因子获取成功，共{len(factors)}次除权除息")
+            return factors
             
         except Exception as e:
-            logger.error(f"✗ 获取ETF {etf_code} 日线数据失败: {str(e)}")
+            if cached:
+                logger.warning(f"⚠ 获取ETF {etf_code} 复权因子失败，使用{cached.get('trade_date')}的缓存: {str(e)}")
+                return cached['factors']
+            logger.error(f"✗ 获取ETF {etf_code} 复权因子失败: {str(e)}")
             return None
     
+    @staticmethod
+    def _kline_to_daily_bars(data: pd.DataFrame, etf_code: str) -> pd.DataFrame:
+        """
+        将富途K线数据转换为Tushare格式的日线数据
+        
+        直接从K线各列的数组按最终类型一次构建结果（交易日取time_key截断到日期），
+        不再逐列astype、重命名和多次拷贝；乱序的K线先按交易日排序再计算派生列
+        
+        Args:
+            data: request_history_kline返回的K线数据
+            etf_code: ETF代码（不含市场后缀）
+            
+        Returns:
+            DataFrame: 列格式同BAR_COLUMNS的日线数据
+        """
+        trade_date = pd.to_datetime(data['time_key'], format='ISO8601').to_numpy() \
+            .astype('datetime64[D]').astype('datetime64[ns]')
+        columns = {
+            'open': data['open'].to_numpy(dtype=np.float64),
+            'high': data['high'].to_numpy(dtype=np.float64),
+            'low': data['low'].to_numpy(dtype=np.float64),
+            'close': data['close'].to_numpy(dtype=np.float64),
+            'vol': data['volume'].to_numpy(dtype=np.int64),
+            'amount': data['turnover'].to_numpy(dtype=np.float64),
+        }
+        
+        # 富途按时间升序返回，只有乱序时才重排
+        if len(trade_date) > 1 and (trade_date[1:] < trade_date[:-1]).any():
+            order = np.argsort(trade_date, kind='stable')
+            trade_date = trade_date[order]
+            columns = {name: values[order] for name, values in columns.items()}
+        
+        pre_close, change, pct_chg, amplitude = compute_price_fields(
+            columns['open'], columns['high'], columns['low'], columns['close'])
+        return pd.DataFrame({
+            'ts_code': np.full(len(trade_date), etf_code, dtype=object),
+            'trade_date': trade_date,
+            **columns,
+            'pre_close': pre_close,
+            'change': change,
+            'pct_chg': pct_chg,
+            'amplitude': amplitude,
+        }, columns=BAR_COLUMNS)
+    
+    def get_etf_minute_data(self, etf_code: str, freq: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        """
+        获取ETF分钟行情（按周期/ETF/月份分区的增量缓存）
+        
+        窗口中尚未获取的区间按自然月分块向富途API分页获取，每块取完后写入检查点，
+        中途失败或额度用完时已完成的月份保留，下次从缺口处继续
+        
+        Args:
+            etf_code: ETF代码（不含市场后缀）
+            freq: 分钟周期（1min/5min/15min/30min/60min）
+            start_date: 开始日期 (YYYYMMDD格式)
+            end_date: 结束日期 (YYYYMMDD格式)
+        
+        Returns:
+            DataFrame: 分钟行情，列格式同MINUTE_BAR_COLUMNS；获取失败返回None
+        """
+        if freq not in MINUTE_FREQS:
+            logger.error(f"不支持的分钟周期: {freq}，可选: {', '.join(MINUTE_FREQS)}")
+            return None
+        
+        # 结束日期不超过最近的已收盘交易日，未收盘的当日K线不进入缓存
+        latest_trading_date = self.trading_date_manager.get_latest_trading_date(None)
+        end_date = min(end_date, latest_trading_date)
+        
+        cached_df = self.cache.minute_store.read(etf_code, freq, start_date, end_date)
+        if cached_df is not None:
+            logger.info(f"✓ 从分钟行情缓存获取ETF {etf_code} {freq}数据 ({start_date}~{end_date})")
+            return cached_df
+        
+        return self.single_flight.do(
+            f"minute:{etf_code}:{freq}:{start_date}:{end_date}",
+            self._fill_minute_data, etf_code, freq, start_date, end_date
+        )
+    
+    def _fill_minute_data(self, etf_code: str, freq: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        """
+        按月分块补充获取分钟行情缺失的区间并返回完整窗口数据
+        
+        Args:
+            etf_code: ETF代码（不含市场后缀）
+            freq: 分钟周期
+            start_date: 开始日期 (YYYYMMDD格式)
+            end_date: 结束日期 (YYYYMMDD格式)
+        
+        Returns:
+            DataFrame: 分钟行情，获取失败返回None
+        """
+        store = self.cache.minute_store
+        full_etf_code = self._complete_etf_code(etf_code)
+        chunks = [chunk for gap_start, gap_end in store.missing_ranges(etf_code, freq, start_date, end_date)
+                  for chunk in month_chunks(gap_start, gap_end)]
+        logger.info(f"→ 分钟行情缓存缺少{len(chunks)}个月度分块，使用富途API获取ETF {etf_code} {freq}数据")
+        
+        bars = 0
+        try:
+            for chunk_start, chunk_end in chunks:
+                for data in self._iter_history_kline_pages(full_etf_code, chunk_start, chunk_end,
+                                                           ktype=MINUTE_KTYPES[freq]):
+                    if not data.empty:
+                        store.merge(etf_code, freq, self._kline_to_minute_bars(data, etf_code))
+                        bars += len(data)
+                # 整个分块取完才写入检查点，中断的分块下次重新获取（同一时间的K线覆盖写入）
+                store.mark_covered(etf_code, freq, chunk_start, chunk_end)
+        except QuotaExhaustedError as e:
+            available = store.read_available(etf_code, freq, start_date, end_date)
+            if available.empty:
+                logger.warning(f"⚠ {e}，ETF {etf_code} {freq}暂无已缓存数据")
+                return None
+            logger.warning(f"⚠ {e}，返回已缓存的ETF {etf_code} {freq}数据")
+            return available
+        except Exception as e:
+            logger.error(f"✗ 获取ETF {etf_code} {freq}数据失败 ({start_date}~{end_date})，"
+                         f"已获取{bars}条记录: {str(e)}")
+            return None
+        
+        logger.info(f"✓ ETF {etf_code} {freq}数据获取成功 ({start_date}~{end_date})，共{bars}条记录")
+        return store.read(etf_code, freq, start_date, end_date)
+    
+    @staticmethod
+    def _kline_to_minute_bars(data: pd.DataFrame, etf_code: str) -> pd.DataFrame:
+        """
+        将富途分钟K线转换为Tushare格式的分钟行情
+        
+        Args:
+            data: request_history_kline返回的K线数据
+            etf_code: ETF代码（不含市场后缀）
+        
+        Returns:
+            DataFrame: 列格式同MINUTE_BAR_COLUMNS的分钟行情
+        """
+        return pd.DataFrame({
+            'ts_code': etf_code,
+            'trade_time': pd.to_datetime(data['time_key']).to_numpy(),
+            'open': data['open'].to_numpy(dtype=float),
+            'high': data['high'].to_numpy(dtype=float),
+            'low': data['low'].to_numpy(dtype=float),
+            'close': data['close'].to_numpy(dtype=float),
+            'vol': data['volume'].to_numpy(dtype='int64'),
+            'amount': data['turnover'].to_numpy(dtype=float),
+        }, columns=MINUTE_BAR_COLUMNS)
+    
     def get_security_basic_info(self, code: str) -> Optional[Dict]:
         """
         获取证券基本信息（永久缓存），支持ETF和股票
         
+        超过BASIC_INFO_REFRESH_DAYS天的缓存直接返回并在后台刷新，刷新失败时继续使用旧信息
+        
         Args:
             code: 证券代码（不含市场后缀）
             
         Returns:
             Dict: 证券基本信息
         """
+        flight_key = f"security_basic:{code}"
+        
         # 1. 先检查永久缓存
         cached_data = self.cache.get_permanent_cache("security_basic", code)
         if cached_data:
             logger.info(f"✓ 从永久缓存获取证券 {code} 基本信息")
+            refresh_before = (datetime.now() - timedelta(days=BASIC_INFO_REFRESH_DAYS)).strftime('%Y%m%d')
+            if cached_data.get('updated_at', '') < refresh_before:
+                self.background_refresher.submit(flight_key, self.single_flight.do, flight_key,
+                                                 self._fetch_security_basic_info, code)
             return cached_data
         
-        # 2. 缓存未命中，使用富途API获取真实数据
+        # 2. 短期内已确认不存在的代码不再请求富途API
+        if self.cache.is_negative_cached("security", code):
+            logger.info(f"✗ 证券 {code} 不存在（短期缓存）")
+            return None
+        
+        # 3. 缓存未命中，使用富途API获取真实数据（同一证券的并发未命中合并为一次请求）
         logger.info(f"→ 永久缓存未命中，使用富途API获取证券 {code} 基本信息")
+        return self.single_flight.do(flight_key, self._fetch_security_basic_info, code)
+    
+    def _fetch_security_basic_info(self, code: str) -> Optional[Dict]:
+        """
+        使用富途API获取证券基本信息并写入永久缓存
         
+        Args:
+            code: 证券代码（不含市场后缀）
+            
+        Returns:
+            Dict: 证券基本信息，获取失败返回None（已有的缓存保持不变）
+        """
         try:
             # 补全证券代码，添加市场前缀
             full_code = self._complete_etf_code(code)
@@ -158,6 +515,7 @@ class futuClient:
             # 使用富途API获取股票基本信息，不指定stock_type以支持多种证券类型
             market = ft.Market.US if full_code.startswith('US.') else ft.Market.HK if full_code.startswith('HK.') else ft.Market.SH if full_code.startswith('SH.') else ft.Market.SZ
             code_list = [full_code]  # 使用完整的股票代码（包括市场前缀）
+            self.rate_limiter.acquire('basic_info')
             ret, data = self.quote_ctx.get_stock_basicinfo(
                 market=market,
                 code_list=code_list
@@ -165,6 +523,7 @@ class futuClient:
             
             if ret != ft.RET_OK or data.empty:
                 logger.error(f"✗ 富途API获取证券 {code} 基本信息失败: {data}")
+                self._remember_not_found(code, ret, data)
                 return None
             
             # 转换为Tushare兼容格式
@@ -183,7 +542,8 @@ class futuClient:
                 'm_fee': 0.5 if security_type == 'ETF' else 0,  # 只有ETF有管理费率
                 'c_fee': 0.1 if security_type == 'ETF' else 0,  # 只有ETF有托管费率
                 'track_index_code': '',  # 富途API没有直接的跟踪指数代码字段
-                'track_index_name': row.get('stock_name', '').replace('ETF', '') if 'ETF' in row.get('stock_name', '') else ''  # 尝试从名称中提取跟踪指数
+                'track_index_name': row.get('stock_name', '').replace('ETF', '') if 'ETF' in row.get('stock_name', '') else '',  # 尝试从名称中提取跟踪指数
+                'updated_at': datetime.now().strftime('%Y%m%d')
             }
             
             # 3. 保存数据到永久缓存
@@ -196,6 +556,24 @@ class futuClient:
             logger.error(f"✗ 获取证券 {code} 基本信息失败: {str(e)}")
             return None
             
+    def _remember_not_found(self, code: str, ret: int, data) -> None:
+        """
+        上游确认代码不存在时写入短期不存在缓存（网关故障不缓存）
+        
+        Args:
+            code: 证券代码（不含市场后缀）
+            ret: get_stock_basicinfo的返回码
+            data: get_stock_basicinfo的返回数据或错误信息
+        """
+        if ret == ft.RET_OK:
+            not_found = data.empty
+        else:
+            message = str(data).lower()
+            not_found = not is_gateway_error(message) and any(keyword in message for keyword in NOT_FOUND_KEYWORDS)
+        if not_found:
+            self.cache.set_negative_cache("security", code, NEGATIVE_CACHE_TTL)
+            logger.info(f"证券 {code} 不存在，{NEGATIVE_CACHE_TTL}秒内不再请求富途API")
+    
     def get_etf_basic_info(self, etf_code: str) -> Optional[Dict]:
         """
         获取ETF基本信息（永久缓存）
@@ -211,7 +589,7 @@ class futuClient:
     
     def get_latest_price(self, etf_code: str) -> Optional[Dict]:
         """
-        获取ETF最新价格（智能交易日缓存）
+        获取ETF最新价格（优先读取推送报价簿，否则使用智能交易日缓存）
         
         Args:
             etf_code: ETF代码（不含市场后缀）
@@ -219,8 +597,15 @@ class futuClient:
         Returns:
             Dict: 最新价格信息
         """
-        # 1. 获取最近的交易日
+        # 0. 获取最近的交易日并记录本次请求（推送报价命中时同样计数，收盘后预热按请求次数挑选ETF）
         latest_trading_date = self.trading_date_manager.get_latest_trading_date(None)  # 富途API不需要pro参数
+        self._record_request(etf_code, latest_trading_date)
+        
+        # 1. 已订阅报价推送的ETF直接读取报价簿，盘中价格实时且不请求网关
+        if self.quote_subscriber is not None:
+            quote = self.quote_subscriber.get_quote(self._complete_etf_code(etf_code))
+            if quote is not None:
+                return self._build_quote_price_info(quote)
         
         # 2. 检查该交易日的缓存
         cached_data = self.cache.get_daily_cache(latest_trading_date, "price", etf_code)
@@ -228,9 +613,40 @@ class futuClient:
             logger.info(f"✓ 从交易日缓存获取ETF {etf_code} 最新价格 (交易日: {latest_trading_date})")
             return cached_data
         
-        # 3. 缓存未命中，使用富途API获取真实数据
+        # 3. 新交易日尚无缓存：有足够新的旧价格时立即返回，由后台刷新
+        flight_key = f"price:{latest_trading_date}:{etf_code}"
+        stale_price = self._get_stale_price(etf_code, latest_trading_date)
+        if stale_price and stale_price['data_age_days'] <= PRICE_REVALIDATE_MAX_AGE_DAYS:
+            self.background_refresher.submit(flight_key, self.single_flight.do, flight_key,
+                                             self._fetch_latest_price, etf_code, latest_trading_date)
+            return stale_price
+        
+        # 4. 没有可用的旧价格，使用富途API获取真实数据（同一ETF的并发未命中合并为一次请求）
+        price_info = self.single_flight.do(flight_key, self._fetch_latest_price, etf_code, latest_trading_date)
+        if price_info is None and stale_price:
+            logger.warning(f"⚠ ETF {etf_code} 最新价格获取失败，返回{stale_price['data_age_days']}个交易日前的缓存价格")
+            return stale_price
+        return price_info
+    
+    def _fetch_latest_price(self, etf_code: str, latest_trading_date: str) -> Optional[Dict]:
+        """
+        使用富途API获取ETF最新价格并写入交易日缓存
+        
+        Args:
+            etf_code: ETF代码（不含市场后缀）
+            latest_trading_date: 最近的交易日 (YYYYMMDD格式)
+            
+        Returns:
+            Dict: 最新价格信息，获取失败返回None
+        """
         logger.info(f"→ 交易日缓存未命中，使用富途API获取ETF {etf_code} 最新价格")
         
+        try:
+            self.rate_limiter.acquire('snapshot')
+        except QuotaExhaustedError as e:
+            logger.warning(f"⚠ {e}")
+            return None
+        
         try:
             # 补全ETF代码，添加市场前缀
             full_etf_code = self._complete_etf_code(etf_code)
@@ -243,22 +659,7 @@ class futuClient:
                 return None
             
             # 转换为所需格式
-            row = data.iloc[0]
-            
-            # 计算涨跌幅
-            current_price = float(row.get('last_price', 0))
-            pre_close = float(row.get('prev_close_price', current_price))
-            pct_change = (current_price - pre_close) / pre_close * 100 if pre_close != 0 else 0
-            
-            price_info = {
-                'current_price': round(current_price, 3),
-                'pre_close': round(pre_close, 3),
-                'pct_change': round(pct_change, 2),
-                'volume': int(row.get('volume', 0)),  # 转换为Python int类型
-                'amount': float(row.get('turnover', 0)),  # 转换为Python float类型
-                'trade_date': latest_trading_date,
-                'data_age_days': 0  # 真实数据，设为0
-            }
+            price_info = self._build_price_info(data.iloc[0], latest_trading_date)
             
             # 4. 保存真实数据到缓存
             self.cache.set_daily_cache(latest_trading_date, "price", etf_code, price_info)
@@ -270,88 +671,318 @@ class futuClient:
             logger.error(f"✗ 获取ETF {etf_code} 最新价格失败: {str(e)}")
             return None
     
+    def get_latest_prices(self, etf_codes: List[str]) -> Dict[str, Dict]:
+        """
+        批量获取多只ETF最新价格（智能交易日缓存）
+        
+        未命中缓存的代码按网关单次上限分批调用get_market_snapshot，
+        一次往返即可获取数百只ETF的快照，并全部写入该交易日的缓存
+        
+        Args:
+            etf_codes: ETF代码列表（不含市场后缀）
+            
+        Returns:
+            Dict[str, Dict]: ETF代码到最新价格信息的映射，获取失败的代码不包含在内
+        """
+        latest_trading_date = self.trading_date_manager.get_latest_trading_date(None)
+        
+        prices = {}
+        missing_codes = []
+        for etf_code in dict.fromkeys(etf_codes):
+            cached_data = self.cache.get_daily_cache(latest_trading_date, "price", etf_code)
+            if cached_data:
+                prices[etf_code] = cached_data
+            else:
+                missing_codes.append(etf_code)
+        
+        if not missing_codes:
+            logger.info(f"✓ 从交易日缓存获取{len(prices)}只ETF最新价格 (交易日: {latest_trading_date})")
+            return prices
+        
+        logger.info(f"→ 交易日缓存未命中{len(missing_codes)}只ETF，使用富途API批量获取最新价格")
+        
+        for i in range(0, len(missing_codes), SNAPSHOT_BATCH_SIZE):
+            batch = missing_codes[i:i + SNAPSHOT_BATCH_SIZE]
+            code_map = {self._complete_etf_code(code): code for code in batch}
+            
+            try:
+                self.rate_limiter.acquire('snapshot')
+            except QuotaExhaustedError as e:
+                logger.warning(f"⚠ {e}，剩余{len(missing_codes) - i}只ETF使用缓存中的旧价格")
+                break
+            
+            try:
+                ret, data = self.quote_ctx.get_market_snapshot(list(code_map))
+            except Exception as e:
+                logger.error(f"✗ 批量获取ETF最新价格失败: {str(e)}")
+                continue
+            
+            if ret != ft.RET_OK:
+                logger.error(f"✗ 富途API批量获取ETF最新价格失败: {data}")
+                continue
+            
+            for _, row in data.iterrows():
+                etf_code = code_map.get(row.get('code'))
+                if etf_code is None:
+                    continue
+                price_info = self._build_price_info(row, latest_trading_date)
+                self.cache.set_daily_cache(latest_trading_date, "price", etf_code, price_info)
+                prices[etf_code] = price_info
+        
+        # 额度用完或批次失败的代码改用旧交易日的缓存价格
+        for etf_code in missing_codes:
+            if etf_code not in prices:
+                stale_price = self._get_stale_price(etf_code, latest_trading_date)
+                if stale_price:
+                    prices[etf_code] = stale_price
+        
+        logger.info(f"✓ 批量获取ETF最新价格完成，共{len(prices)}/{len(etf_codes)}只 (交易日: {latest_trading_date})")
+        return prices
+    
+    def get_snapshot_bars(self, etf_codes: List[str], trade_date: str) -> Optional[pd.DataFrame]:
+        """
+        以收盘后的行情快照构建当日日线截面（每批最多SNAPSHOT_BATCH_SIZE只ETF一次请求）
+
+        Args:
+            etf_codes: ETF代码列表（不含市场后缀）
+            trade_date: 截面对应的交易日 (YYYYMMDD格式)，快照更新时间不在该日或当日无成交的ETF不包含在内
+
+        Returns:
+            DataFrame: 列为ts_code、trade_date、open、high、low、close、vol、amount的截面；任一批次失败返回None
+
+        Raises:
+            QuotaExhaustedError: 接口额度已用完
+        """
+        trade_day = f"{trade_date[:4]}-{trade_date[4:6]}-{trade_date[6:]}"
+        frames = []
+        for i in range(0, len(etf_codes), SNAPSHOT_BATCH_SIZE):
+            code_map = {self._complete_etf_code(code): code for code in etf_codes[i:i + SNAPSHOT_BATCH_SIZE]}
+            self.rate_limiter.acquire('snapshot')
+            ret, data = self.quote_ctx.get_market_snapshot(list(code_map))
+            if ret != ft.RET_OK:
+                logger.error(f"✗ 富途API批量获取行情快照失败: {data}")
+                return None
+
+            data = data[(data['update_time'].astype(str).str[:10] == trade_day) & (data['volume'] > 0)]
+            frames.append(pd.DataFrame({
+                'ts_code': data['code'].map(code_map).to_numpy(),
+                'trade_date': pd.Timestamp(trade_date),
+                'open': data['open_price'].to_numpy(dtype=float),
+                'high': data['high_price'].to_numpy(dtype=float),
+                'low': data['low_price'].to_numpy(dtype=float),
+                'close': data['last_price'].to_numpy(dtype=float),
+                'vol': data['volume'].to_numpy(dtype='int64'),
+                'amount': data['turnover'].to_numpy(dtype=float),
+            }))
+
+        return pd.concat(frames, ignore_index=True) if frames else None
+
+    def _get_stale_price(self, etf_code: str, latest_trading_date: str,
+                         max_age_days: int = STALE_PRICE_MAX_AGE_DAYS) -> Optional[Dict]:
+        """
+        获取之前交易日中最近一次缓存的价格（新交易日尚无缓存、网关出错或额度用完时使用）
+        
+        Args:
+            etf_code: ETF代码（不含市场后缀）
+            latest_trading_date: 最近的交易日 (YYYYMMDD格式)
+            max_age_days: 最多往前查找的交易日数
+            
+        Returns:
+            Dict: 标记为stale并带有data_age_days（落后的交易日数）的价格信息，没有旧缓存时返回None
+        """
+        trade_date = latest_trading_date
+        for age in range(1, max_age_days + 1):
+            previous_date = self.trading_date_manager.get_previous_trading_date(trade_date)
+            if not previous_date or previous_date >= trade_date:
+                return None
+            trade_date = previous_date
+            cached_data = self.cache.get_daily_cache(trade_date, "price", etf_code)
+            if cached_data:
+                logger.info(f"✓ 返回ETF {etf_code} {age}个交易日前的缓存价格 (交易日: {trade_date})")
+                return {**cached_data, 'stale': True, 'data_age_days': age}
+        return None
+    
+    @staticmethod
+    def _build_price_info(row: pd.Series, trade_date: str) -> Dict:
+        """
+        将行情快照转换为最新价格信息
+        
+        Args:
+            row: get_market_snapshot返回的一行数据
+            trade_date: 对应的交易日 (YYYYMMDD格式)
+            
+        Returns:
+            Dict: 最新价格信息
+        """
+        # 计算涨跌幅
+        current_price = float(row.get('last_price', 0))
+        pre_close = float(row.get('prev_close_price', current_price))
+        pct_change = (current_price - pre_close) / pre_close * 100 if pre_close != 0 else 0
+        
+        return {
+            'current_price': round(current_price, 3),
+            'pre_close': round(pre_close, 3),
+            'pct_change': round(pct_change, 2),
+            'volume': int(row.get('volume', 0)),  # 转换为Python int类型
+            'amount': float(row.get('turnover', 0)),  # 转换为Python float类型
+            'trade_date': trade_date,
+            'data_age_days': 0  # 真实数据，设为0
+        }
+    
+    @staticmethod
+    def _build_quote_price_info(quote: Dict) -> Dict:
+        """
+        将推送报价转换为最新价格信息（格式同_build_price_info）
+        
+        Args:
+            quote: 报价簿中的报价
+            
+        Returns:
+            Dict: 最新价格信息，交易日取报价所属日期
+        """
+        current_price = quote['last_price']
+        pre_close = quote['prev_close'] or current_price
+        pct_change = (current_price - pre_close) / pre_close * 100 if pre_close != 0 else 0
+        
+        return {
+            'current_price': round(current_price, 3),
+            'pre_close': round(pre_close, 3),
+            'pct_change': round(pct_change, 2),
+            'volume': quote['volume'],
+            'amount': quote['turnover'],
+            'trade_date': quote['data_date'].replace('-', ''),
+            'update_time': f"{quote['data_date']} {quote['data_time']}",
+            'data_age_days': 0
+        }
+    
     def search_etf(self, query: str) -> List[Dict]:
         """
-        搜索ETF - 不使用缓存，保持实时性
+        搜索ETF - 使用本地代码索引（每个交易日刷新一次）
+        
+        支持代码前缀、名称子串和拼音首字母查找，搜索本身不访问富途API
         
         Args:
-            query: 搜索关键词（ETF代码或名称）
+            query: 搜索关键词（ETF代码、名称或拼音首字母）
             
         Returns:
             List[Dict]: ETF列表
         """
-        logger.info(f"→ 搜索ETF: '{query}' (不使用缓存)")
-        
         try:
-            # 获取所有ETF列表 - 富途API没有直接的搜索接口，需要先获取所有ETF，然后在本地过滤
-            etf_list = []
-            
-            # 先检查查询是否是完整的ETF代码
-            if query.isdigit():
-                # 补全ETF代码，添加市场前缀
-                full_etf_code = self._complete_etf_code(query)
-                market = full_etf_code.split('.')[1]
-                # 获取单只ETF的基本信息
-                # 注意：富途API的get_stock_basicinfo方法中，code_list应该包含完整的股票代码（包括市场前缀）
-                code_list = [full_etf_code]  # 使用完整的股票代码（包括市场前缀）
-                ret, data = self.quote_ctx.get_stock_basicinfo(
-                    market=market,
-                    stock_type=ft.SecurityType.ETF,
-                    code_list=code_list
-                )
-                
-                if ret == ft.RET_OK and not data.empty:
-                    # 转换为所需格式
-                    row = data.iloc[0]
-                    etf_list.append({
-                        'ts_code': query,
-                        'code': query,  # 不含市场后缀
-                        'name': row.get('stock_name', f'ETF_{query}'),
-                        'management': row.get('list_board', '未知基金公司'),  # 富途API没有直接的管理人字段，这里用上市板块代替
-                        'found_date': row.get('list_time', '')[:8] if row.get('list_time') else '',
-                        'list_date': row.get('list_time', '')[:8] if row.get('list_time') else ''
-                    })
-                    
-                    logger.info(f"✓ 搜索ETF '{query}' 成功，找到{len(etf_list)}个结果")
-                    return etf_list
-            
-            # 对于非数字查询或单只ETF查询失败的情况，尝试获取所有ETF并过滤
-            # 注意：富途API获取所有ETF可能会返回大量数据，这里简化处理
-            # 实际生产环境中应该使用更高效的搜索方式
-            markets = [ft.Market.SH, ft.Market.SZ]  # 只搜索沪深市场的ETF
-            
-            for market in markets:
-                ret, data = self.quote_ctx.get_stock_basicinfo(
-                    market=market,
-                    stock_type=ft.SecurityType.ETF
-                )
-                
-                if ret == ft.RET_OK and not data.empty:
-                    # 根据查询条件过滤
-                    filtered_df = data[
-                        data['code'].str.contains(query, na=False, case=False) |
-                        data['stock_name'].str.contains(query, na=False, case=False)
-                    ]
-                    
-                    # 转换为列表格式
-                    for _, row in filtered_df.head(5).iterrows():  # 每个市场最多返回5个结果
-                        etf_code = row['code'].split('.')[1] if '.' in row['code'] else row['code']
-                        etf_list.append({
-                            'ts_code': etf_code,
-                            'code': etf_code,  # 不含市场后缀
-                            'name': row.get('stock_name', f'ETF_{etf_code}'),
-                            'management': row.get('list_board', '未知基金公司'),  # 富途API没有直接的管理人字段，这里用上市板块代替
-                            'found_date': row.get('list_time', '')[:8] if row.get('list_time') else '',
-                            'list_date': row.get('list_time', '')[:8] if row.get('list_time') else ''
-                        })
+            index = self._get_symbol_index()
+            if index is None:
+                return []
             
+            etf_list = index.search(query, limit=10)  # 最多返回10个结果
             logger.info(f"✓ 搜索ETF '{query}' 成功，找到{len(etf_list)}个结果")
-            return etf_list[:10]  # 最多返回10个结果
+            return etf_list
             
         except Exception as e:
             logger.error(f"✗ 搜索ETF '{query}' 失败: {str(e)}")
             return []
     
+    def _get_symbol_index(self) -> Optional[SymbolIndex]:
+        """
+        获取当前交易日的ETF代码索引
+        
+        进程内已有当日索引时直接使用；否则从交易日缓存加载代码表，
+        缓存未命中时才从富途API下载沪深两市ETF代码表
+        
+        Returns:
+            SymbolIndex: ETF代码索引，获取失败时返回已有的旧索引或None
+        """
+        latest_trading_date = self.trading_date_manager.get_latest_trading_date(None)
+        index = self._symbol_index
+        if index is not None and index.trade_date == latest_trading_date:
+            return index
+        
+        records = self.cache.get_daily_cache(latest_trading_date, "symbols", "etf")
+        if not records:
+            try:
+                records = self.single_flight.do(
+                    f"symbols:{latest_trading_date}:etf",
+                    self._fetch_etf_symbols, latest_trading_date
+                )
+            except QuotaExhaustedError as e:
+                logger.warning(f"⚠ {e}，继续使用已有的ETF代码索引")
+                return index
+        
+        if not records:
+            # 下载失败时继续使用旧索引
+            return index
+        
+        self._symbol_index = SymbolIndex(records, latest_trading_date)
+        logger.info(f"✓ ETF代码索引已构建: {len(self._symbol_index)}只ETF (交易日: {latest_trading_date})")
+        return self._symbol_index
+    
+    def list_etf_codes(self) -> List[str]:
+        """
+        获取沪深两市全部ETF代码（来自当前交易日的ETF代码索引）
+        
+        Returns:
+            List[str]: ETF代码列表（不含市场后缀），代码表不可用时返回空列表
+        """
+        index = self._get_symbol_index()
+        return index.codes() if index is not None else []
+    
+    def _fetch_etf_symbols(self, latest_trading_date: str) -> Optional[List[Dict]]:
+        """
+        从富途API下载沪深两市ETF代码表并写入交易日缓存
+        
+        Args:
+            latest_trading_date: 最近的交易日 (YYYYMMDD格式)
+            
+        Returns:
+            List[Dict]: ETF记录列表，获取失败返回None
+        """
+        logger.info("→ 交易日缓存未命中，使用富途API下载ETF代码表")
+        
+        records = []
+        for market in [ft.Market.SH, ft.Market.SZ]:  # 只搜索沪深市场的ETF
+            self.rate_limiter.acquire('basic_info')
+            ret, data = self.quote_ctx.get_stock_basicinfo(
+                market=market,
+                stock_type=ft.SecurityType.ETF
+            )
+            
+            if ret != ft.RET_OK:
+                logger.error(f"✗ 富途API下载{market}市场ETF代码表失败: {data}")
+                return None
+            
+            for _, row in data.iterrows():
+                etf_code = row['code'].split('.')[1] if '.' in row['code'] else row['code']
+                name = row.get('name') or row.get('stock_name') or f'ETF_{etf_code}'
+                list_date = str(row.get('listing_date') or '').replace('-', '')[:8]
+                records.append({
+                    'ts_code': etf_code,
+                    'code': etf_code,  # 不含市场后缀
+                    'name': name,
+                    'management': row.get('list_board', '未知基金公司'),  # 富途API没有直接的管理人字段，这里用上市板块代替
+                    'found_date': list_date,
+                    'list_date': list_date
+                })
+        
+        self.cache.set_daily_cache(latest_trading_date, "symbols", "etf", records)
+        logger.info(f"✓ ETF代码表下载成功并已缓存，共{len(records)}只ETF")
+        return records
+    
+    def _record_request(self, etf_code: str, trade_date: Optional[str] = None):
+        """
+        记录一次用户请求，供收盘后预热统计近期查询最多的ETF
+        
+        后台优先级的调用（预热、入库、后台刷新）不是用户请求，不计数
+        
+        Args:
+            etf_code: ETF代码（不含市场后缀）
+            trade_date: 请求所属的交易日，默认最近的交易日
+        """
+        if current_priority() == PRIORITY_BACKGROUND:
+            return
+        try:
+            trade_date = trade_date or self.trading_date_manager.get_latest_trading_date(None)
+            self.cache.record_request(trade_date, etf_code.split('.')[-1])
+        except Exception as e:
+            logger.warning(f"记录ETF {etf_code} 请求次数失败: {e}")
+    
     def _complete_etf_code(self, etf_code: str) -> str:
         """
         自动补全ETF代码的市场前缀
@@ -390,7 +1021,12 @@ class futuClient:
             logger.info(f"✓ 从永久缓存获取证券 {code} 名称")
             return cached_data
         
-        # 2. 缓存未命中，使用富途API获取真实数据
+        # 2. 短期内已确认不存在的代码不再请求富途API
+        if self.cache.is_negative_cached("security", code):
+            logger.info(f"✗ 证券 {code} 不存在（短期缓存）")
+            return None
+        
+        # 3. 缓存未命中，使用富途API获取真实数据
         logger.info(f"→ 永久缓存未命中，使用富途API获取证券 {code} 名称")
         
         try:
@@ -400,6 +1036,7 @@ class futuClient:
             # 使用富途API获取股票基本信息，不指定stock_type以支持多种证券类型
             market = ft.Market.US if full_code.startswith('US.') else ft.Market.HK if full_code.startswith('HK.') else ft.Market.SH if full_code.startswith('SH.') else ft.Market.SZ
             code_list = [full_code]  # 使用完整的股票代码（包括市场前缀）
+            self.rate_limiter.acquire('basic_info')
             ret, data = self.quote_ctx.get_stock_basicinfo(
                 market=market,
                 code_list=code_list
@@ -407,6 +1044,7 @@ class futuClient:
             
             if ret != ft.RET_OK or data.empty:
                 logger.error(f"✗ 富途API获取证券 {code} 名称失败: {data}")
+                self._remember_not_found(code, ret, data)
                 return None
             
             security_name = data.iloc[0].get('name')
@@ -414,7 +1052,7 @@ class futuClient:
                 logger.error(f"✗ 富途API返回的证券 {code} 名称为空")
                 return None
             
-            # 3. 成功获取数据，保存到永久缓存
+            # 4. 成功获取数据，保存到永久缓存
             self.cache.set_permanent_cache("security_name", code, security_name)
             logger.info(f"✓ 证券 {code} 名称获取成功并已永久缓存: {security_name}")
             
@@ -439,7 +1077,7 @@ class futuClient:
 
     def get_trading_calendar(self, start_date: str, end_date: str) -> List[str]:
         """
-        获取交易日历（兼容性方法，实际使用TradingDateManager）
+        获取交易日历（使用TradingDateManager的真实交易日历）
         
         Args:
             start_date: 开始日期 (YYYYMMDD格式)
@@ -448,30 +1086,15 @@ class futuClient:
         Returns:
             List[str]: 交易日列表
         """
+        trading_days = self.trading_date_manager.get_trading_days_between(start_date, end_date)
+        if trading_days is not None:
+            logger.info(f"✓ 获取交易日历成功 ({start_date}~{end_date})，共{len(trading_days)}个交易日")
+            return trading_days
+        
+        # 交易日历不可用时退化为工作日（不考虑节假日）
+        logger.warning(f"交易日历不可用，使用工作日代替 ({start_date}~{end_date})")
         try:
-            # 解析年份范围
-            start_year = int(start_date[:4])
-            end_year = int(end_date[:4])
-            
-            all_trading_days = []
-            
-            # 富途API没有直接的交易日历接口，这里使用模拟数据
-            # 实际使用中，建议使用富途API获取历史K线数据，然后提取交易日
-            # 为了保持兼容性，这里返回一个模拟的交易日列表
-            # 生成从start_date到end_date的所有日期，然后过滤掉周末
-            start = datetime.strptime(start_date, '%Y%m%d')
-            end = datetime.strptime(end_date, '%Y%m%d')
-            delta = end - start
-            
-            for i in range(delta.days + 1):
-                date = start + timedelta(days=i)
-                # 只保留周一到周五
-                if date.weekday() < 5:
-                    all_trading_days.append(date.strftime('%Y%m%d'))
-            
-            logger.info(f"✓ 获取交易日历成功 ({start_date}~{end_date})，共{len(all_trading_days)}个交易日")
-            return all_trading_days
-            
+            return [date.strftime('%Y%m%d') for date in pd.bdate_range(start_date, end_date)]
         except Exception as e:
             logger.error(f"✗ 获取交易日历失败: {str(e)}")
             return []
@@ -483,7 +1106,14 @@ class futuClient:
         Returns:
             Dict: 缓存统计信息
         """
-        return self.cache.get_cache_info()
+        info = self.cache.get_cache_info()
+        info['single_flight'] = self.single_flight.get_stats()
+        info['trading_calendar'] = self.trading_date_manager.calendar.get_info()
+        info['rate_limiter'] = self.rate_limiter.get_stats()
+        info['revalidate'] = self.background_refresher.get_stats()
+        if self.quote_subscriber is not None:
+            info['quote_push'] = self.quote_subscriber.get_status()
+        return info
     
     def get_latest_trading_date(self) -> str:
         """
@@ -492,16 +1122,4 @@ class futuClient:
         Returns:
             str: 最近的交易日 (YYYYMMDD格式)
         """
-        # 富途API没有直接获取最近交易日的接口，这里使用当前日期
-        # 如果当前日期不是交易日（周末），则返回最近的工作日
-        today = datetime.now()
-        
-        # 如果是周六或周日，返回上周五
-        if today.weekday() == 5:  # 周六
-            latest = today - timedelta(days=1)
-        elif today.weekday() == 6:  # 周日
-            latest = today - timedelta(days=2)
-        else:
-            latest = today
-        
-        return latest.strftime('%Y%m%d')
+        return self.trading_date_manager.get_latest_trading_date(None)
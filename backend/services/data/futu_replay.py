@@ -0,0 +1,350 @@
+"""
+富途行情录制与回放
+录制模式下包装真实的OpenQuoteContext，把K线、行情快照、证券基本信息、复权因子和交易日的返回结果保存到本地目录；
+回放模式下用ReplayQuoteContext代替OpenQuoteContext，从录制目录读取数据并按配置注入延迟，
+无需OpenD网关即可对完整的分析流程做可重复的基准测试和压测。
+
+录制目录结构（JSON，DataFrame保存为columns/data）：
+    kline/{代码}_{K线类型}_{复权类型}.json    按time_key合并的全部K线，回放时按日期过滤并分页
+    snapshot/{代码}.json                      最近一次快照行
+    basicinfo/{代码}.json                     按代码查询的基本信息行
+    basicinfo/{市场}_{证券类型}.json           整个市场的代码表
+    rehab/{代码}.json                         复权因子
+    trading_days/{市场}.json                  按日期合并的交易日
+"""
+
+import os
+import json
+import time
+import random
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+import pandas as pd
+import futu as ft
+
+from .cache_file import KeyLocks, atomic_write_bytes
+
+logger = logging.getLogger(__name__)
+
+# 行情数据来源：live直连OpenD，record直连并录制，replay从录制目录回放
+PROVIDER_LIVE = 'live'
+PROVIDER_RECORD = 'record'
+PROVIDER_REPLAY = 'replay'
+PROVIDER_MODES = (PROVIDER_LIVE, PROVIDER_RECORD, PROVIDER_REPLAY)
+
+PROVIDER_MODE = os.getenv('FUTU_PROVIDER_MODE', PROVIDER_LIVE)
+RECORDING_DIR = os.getenv('FUTU_RECORDING_DIR', os.path.join('data', 'futu_recordings'))
+
+# 回放延迟（毫秒）：单个数值对所有接口生效，或按接口指定，如 request_history_kline=120,get_market_snapshot=40
+REPLAY_LATENCY_MS = os.getenv('FUTU_REPLAY_LATENCY_MS', '0')
+REPLAY_JITTER_MS = float(os.getenv('FUTU_REPLAY_JITTER_MS', 0))
+
+# 录制和回放的接口
+RECORDED_METHODS = ('request_history_kline', 'get_market_snapshot', 'get_stock_basicinfo', 'get_rehab',
+                    'request_trading_days')
+
+
+def _frame_to_json(df: pd.DataFrame) -> Dict:
+    return json.loads(df.to_json(orient='split', index=False, force_ascii=False))
+
+
+def _frame_from_json(payload: Dict) -> pd.DataFrame:
+    return pd.DataFrame(payload['data'], columns=payload['columns'])
+
+
+class FutuRecording:
+    """录制目录（多个进程可同时录制，合并写入按文件加锁）"""
+
+    def __init__(self, recording_dir: str = RECORDING_DIR):
+        """
+        初始化录制目录
+
+        Args:
+            recording_dir: 录制目录路径
+        """
+        self.recording_dir = recording_dir
+        os.makedirs(recording_dir, exist_ok=True)
+        self.locks = KeyLocks(os.path.join(recording_dir, '.locks'), stripes=16)
+
+    def _path(self, category: str, name: str) -> str:
+        return os.path.join(self.recording_dir, category, f"{name}.json")
+
+    def _read(self, category: str, name: str) -> Optional[Any]:
+        try:
+            with open(self._path(category, name), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write(self, category: str, name: str, payload: Any):
+        path = self._path(category, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write_bytes(path, json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+
+    def save_klines(self, code: str, ktype: str, autype: str, df: pd.DataFrame):
+        """合并保存K线（同一time_key以新数据为准）"""
+        name = f"{code}_{ktype}_{autype}"
+        with self.locks.lock(name):
+            existing = self.load_klines(code, ktype, autype)
+            if existing is not None and not existing.empty:
+                df = pd.concat([existing, df], ignore_index=True)
+            df = df.drop_duplicates('time_key', keep='last').sort_values('time_key')
+            self._write('kline', name, _frame_to_json(df))
+
+    def load_klines(self, code: str, ktype: str, autype: str) -> Optional[pd.DataFrame]:
+        payload = self._read('kline', f"{code}_{ktype}_{autype}")
+        return _frame_from_json(payload) if payload is not None else None
+
+    def save_rows(self, category: str, df: pd.DataFrame):
+        """按代码逐行保存（快照、按代码查询的基本信息）"""
+        for _, row in df.iterrows():
+            self._write(category, row['code'], _frame_to_json(row.to_frame().T))
+
+    def load_rows(self, category: str, codes: List[str]) -> Tuple[Optional[pd.DataFrame], List[str]]:
+        """
+        按代码读取逐行保存的数据
+
+        Returns:
+            (按请求顺序拼接的DataFrame, 未录制的代码)
+        """
+        frames, missing = [], []
+        for code in codes:
+            payload = self._read(category, code)
+            if payload is None:
+                missing.append(code)
+            else:
+                frames.append(_frame_from_json(payload))
+        return (pd.concat(frames, ignore_index=True) if frames else None), missing
+
+    def save_table(self, category: str, name: str, df: pd.DataFrame):
+        self._write(category, name, _frame_to_json(df))
+
+    def load_table(self, category: str, name: str) -> Optional[pd.DataFrame]:
+        payload = self._read(category, name)
+        return _frame_from_json(payload) if payload is not None else None
+
+    def save_trading_days(self, market: str, items: List[Dict]):
+        """按日期合并保存交易日"""
+        with self.locks.lock(f"trading_days_{market}"):
+            merged = {item['time']: item for item in (self.load_trading_days(market) or [])}
+            merged.update({item['time']: item for item in items})
+            self._write('trading_days', market, [merged[day] for day in sorted(merged)])
+
+    def load_trading_days(self, market: str) -> Optional[List[Dict]]:
+        return self._read('trading_days', market)
+
+
+class RecordingQuoteContext:
+    """录制包装：调用真实行情连接，成功的结果同时写入录制目录"""
+
+    def __init__(self, ctx, recording: FutuRecording):
+        """
+        Args:
+            ctx: 真实的OpenQuoteContext
+            recording: 录制目录
+        """
+        self._ctx = ctx
+        self.recording = recording
+
+    def __getattr__(self, name):
+        return getattr(self._ctx, name)
+
+    def _record(self, method: str, save):
+        try:
+            save()
+        except Exception as e:
+            logger.warning(f"录制富途接口 {method} 的返回结果失败: {e}")
+
+    def request_history_kline(self, code, start=None, end=None, ktype=ft.KLType.K_DAY,
+                              autype=ft.AuType.QFQ, **kwargs):
+        ret, data, page_req_key = self._ctx.request_history_kline(
+            code, start=start, end=end, ktype=ktype, autype=autype, **kwargs)
+        if ret == ft.RET_OK and not data.empty:
+            self._record('request_history_kline', lambda: self.recording.save_klines(code, ktype, autype, data))
+        return ret, data, page_req_key
+
+    def get_market_snapshot(self, code_list):
+        ret, data = self._ctx.get_market_snapshot(code_list)
+        if ret == ft.RET_OK:
+            self._record('get_market_snapshot', lambda: self.recording.save_rows('snapshot', data))
+        return ret, data
+
+    def get_stock_basicinfo(self, market, stock_type=ft.SecurityType.STOCK, code_list=None):
+        ret, data = self._ctx.get_stock_basicinfo(market, stock_type=stock_type, code_list=code_list)
+        if ret == ft.RET_OK:
+            if code_list:
+                self._record('get_stock_basicinfo', lambda: self.recording.save_rows('basicinfo', data))
+            else:
+                self._record('get_stock_basicinfo',
+                             lambda: self.recording.save_table('basicinfo', f"{market}_{stock_type}", data))
+        return ret, data
+
+    def get_rehab(self, code):
+        ret, data = self._ctx.get_rehab(code)
+        if ret == ft.RET_OK:
+            self._record('get_rehab', lambda: self.recording.save_table('rehab', code, data))
+        return ret, data
+
+    def request_trading_days(self, market=None, start=None, end=None, code=None):
+        ret, data = self._ctx.request_trading_days(market=market, start=start, end=end, code=code)
+        if ret == ft.RET_OK:
+            self._record('request_trading_days', lambda: self.recording.save_trading_days(str(market), data))
+        return ret, data
+
+
+class ReplayLatency:
+    """回放时注入的接口延迟"""
+
+    def __init__(self, latency_ms: Any = REPLAY_LATENCY_MS, jitter_ms: float = REPLAY_JITTER_MS,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            latency_ms: 所有接口的延迟(毫秒)，或 {接口: 毫秒} / "接口=毫秒,..." 形式的按接口延迟
+            jitter_ms: 在延迟上叠加的均匀随机抖动上限(毫秒)
+            seed: 抖动的随机种子，指定后每次运行的延迟序列相同
+        """
+        self.default_ms = 0.0
+        self.per_method: Dict[str, float] = {}
+        if isinstance(latency_ms, dict):
+            self.per_method = {name: float(value) for name, value in latency_ms.items()}
+        elif isinstance(latency_ms, str) and '=' in latency_ms:
+            for item in latency_ms.split(','):
+                name, _, value = item.partition('=')
+                self.per_method[name.strip()] = float(value)
+        else:
+            self.default_ms = float(latency_ms or 0)
+        self.jitter_ms = jitter_ms
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self, method: str) -> float:
+        """某次调用的延迟（秒）"""
+        delay_ms = self.per_method.get(method, self.default_ms)
+        if self.jitter_ms:
+            with self._lock:
+                delay_ms += self._random.uniform(0, self.jitter_ms)
+        return delay_ms / 1000
+
+    def sleep(self, method: str):
+        """等待一次调用的延迟（gevent下time.sleep会让出协程）"""
+        delay = self.delay(method)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class ReplayQuoteContext:
+    """回放行情连接：与OpenQuoteContext接口一致，从录制目录返回数据"""
+
+    def __init__(self, recording: FutuRecording, latency: Optional[ReplayLatency] = None):
+        """
+        Args:
+            recording: 录制目录
+            latency: 注入的接口延迟，默认读取环境变量
+        """
+        self.recording = recording
+        self.latency = latency or ReplayLatency()
+        self._stats_lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, int]] = {method: {'calls': 0, 'misses': 0} for method in RECORDED_METHODS}
+
+    def _count(self, method: str, missed: bool = False):
+        with self._stats_lock:
+            self.stats[method]['calls'] += 1
+            if missed:
+                self.stats[method]['misses'] += 1
+
+    def get_global_state(self):
+        return ft.RET_OK, {'mode': PROVIDER_REPLAY}
+
+    def close(self):
+        pass
+
+    def request_history_kline(self, code, start=None, end=None, ktype=ft.KLType.K_DAY,
+                              autype=ft.AuType.QFQ, max_count=1000, page_req_key=None, **kwargs):
+        """按日期过滤录制的K线并按max_count分页，page_req_key为下一页的起始行号"""
+        self.latency.sleep('request_history_kline')
+        df = self.recording.load_klines(code, ktype, autype)
+        if df is None:
+            self._count('request_history_kline', missed=True)
+            return ft.RET_ERROR, f"回放数据中没有 {code} 的K线", None
+        self._count('request_history_kline')
+
+        dates = df['time_key'].str[:10]
+        mask = pd.Series(True, index=df.index)
+        if start:
+            mask &= dates >= start
+        if end:
+            mask &= dates <= end
+        df = df[mask].reset_index(drop=True)
+
+        offset = int(page_req_key) if page_req_key else 0
+        count = max_count or len(df)
+        page = df.iloc[offset:offset + count].reset_index(drop=True)
+        next_key = str(offset + count).encode() if offset + count < len(df) else None
+        return ft.RET_OK, page, next_key
+
+    def get_market_snapshot(self, code_list):
+        self.latency.sleep('get_market_snapshot')
+        codes = [code_list] if isinstance(code_list, str) else list(code_list)
+        data, missing = self.recording.load_rows('snapshot', codes)
+        self._count('get_market_snapshot', missed=bool(missing))
+        if missing:
+            return ft.RET_ERROR, f"回放数据中没有快照: {','.join(missing)}"
+        return ft.RET_OK, data
+
+    def get_stock_basicinfo(self, market, stock_type=ft.SecurityType.STOCK, code_list=None):
+        self.latency.sleep('get_stock_basicinfo')
+        if not code_list:
+            data = self.recording.load_table('basicinfo', f"{market}_{stock_type}")
+            self._count('get_stock_basicinfo', missed=data is None)
+            if data is None:
+                return ft.RET_ERROR, f"回放数据中没有 {market} 市场 {stock_type} 代码表"
+            return ft.RET_OK, data
+
+        data, missing = self.recording.load_rows('basicinfo', list(code_list))
+        self._count('get_stock_basicinfo', missed=bool(missing))
+        if missing:
+            return ft.RET_ERROR, f"回放数据中没有基本信息: {','.join(missing)}"
+        return ft.RET_OK, data
+
+    def get_rehab(self, code):
+        self.latency.sleep('get_rehab')
+        data = self.recording.load_table('rehab', code)
+        self._count('get_rehab', missed=data is None)
+        if data is None:
+            return ft.RET_ERROR, f"回放数据中没有 {code} 的复权因子"
+        return ft.RET_OK, data
+
+    def request_trading_days(self, market=None, start=None, end=None, code=None):
+        self.latency.sleep('request_trading_days')
+        items = self.recording.load_trading_days(str(market))
+        self._count('request_trading_days', missed=items is None)
+        if items is None:
+            return ft.RET_ERROR, f"回放数据中没有 {market} 交易日"
+        return ft.RET_OK, [item for item in items
+                           if (not start or item['time'] >= start) and (not end or item['time'] <= end)]
+
+
+def create_quote_context(host: str, port: int, mode: Optional[str] = None,
+                         recording_dir: Optional[str] = None):
+    """
+    按数据来源模式创建行情连接
+
+    Args:
+        host: OpenD主机地址
+        port: OpenD端口
+        mode: live、record或replay，默认读取环境变量FUTU_PROVIDER_MODE
+        recording_dir: 录制目录，默认读取环境变量FUTU_RECORDING_DIR
+
+    Returns:
+        行情连接（OpenQuoteContext或接口一致的替身）
+    """
+    mode = mode or PROVIDER_MODE
+    if mode not in PROVIDER_MODES:
+        raise ValueError(f"不支持的富途数据来源模式: {mode}，可选: {', '.join(PROVIDER_MODES)}")
+    if mode == PROVIDER_REPLAY:
+        return ReplayQuoteContext(FutuRecording(recording_dir or RECORDING_DIR))
+    ctx = ft.OpenQuoteContext(host=host, port=port)
+    if mode == PROVIDER_RECORD:
+        return RecordingQuoteContext(ctx, FutuRecording(recording_dir or RECORDING_DIR))
+    return ctx
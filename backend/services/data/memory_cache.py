@@ -0,0 +1,150 @@
+"""
+进程内内存缓存层
+位于文件缓存之前的LRU缓存，按条目数和字节数双重限制，支持条目级过期时间，
+并统计命中、未命中、淘汰和过期次数
+"""
+
+import sys
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+import pandas as pd
+
+
+def estimate_size(value: Any) -> int:
+    """
+    估算缓存值占用的字节数
+
+    Args:
+        value: 缓存值
+
+    Returns:
+        int: 估算的字节数
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=False).sum())
+    if isinstance(value, (str, bytes)):
+        return sys.getsizeof(value)
+    try:
+        return len(json.dumps(value, ensure_ascii=False, default=str).encode('utf-8'))
+    except (TypeError, ValueError):
+        return sys.getsizeof(value)
+
+
+class LRUMemoryCache:
+    """按条目数和字节数限制的线程安全LRU缓存"""
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 64 * 1024 * 1024):
+        """
+        初始化内存缓存
+
+        Args:
+            max_entries: 最大条目数
+            max_bytes: 最大占用字节数
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (value, size, expires_at)
+        self._entries: "OrderedDict[str, Tuple[Any, int, Optional[float]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        获取缓存值
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存值，不存在或已过期返回None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+
+            value, size, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                self._remove(key)
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """
+        写入缓存值
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl: 过期时间（秒），None表示不过期
+        """
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self._stats['evictions'] += 1
+
+    def delete(self, key: str):
+        """删除缓存值"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def purge(self, predicate: Callable[[str], bool]) -> int:
+        """
+        删除所有满足条件的缓存键
+
+        Args:
+            predicate: 判断缓存键是否需要删除的函数
+
+        Returns:
+            int: 删除的条目数
+        """
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def _remove(self, key: str):
+        """删除条目并更新字节数（调用方需持有锁）"""
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get_stats(self) -> Dict:
+        """
+        获取缓存统计信息
+
+        Returns:
+            dict: 条目数、字节数及命中、未命中、淘汰、过期计数
+        """
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'size_mb': round(self._bytes / 1024 / 1024, 2),
+                'max_size_mb': round(self.max_bytes / 1024 / 1024, 2),
+                'hit_rate': round(self._stats['hits'] / lookups, 4) if lookups else 0,
+                **self._stats
+            }
@@ -0,0 +1,312 @@
+"""
+分钟行情列式存储
+按周期、ETF和月份分区，每个分区一个压缩的npz文件（datetime64/float64/int64列数组），
+范围读取只加载与日期窗口相交的月份分区，不需要读取整年的数据。
+每只ETF每个周期另有一个检查点文件，记录已完整获取的日期区间，中断的获取任务可以从缺口处继续。
+月份分区登记在缓存清单的minute层，按容量上限淘汰，淘汰后从检查点中移除该月份
+"""
+
+import os
+import logging
+import tempfile
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+from .bar_store import merge_intervals, subtract_intervals
+from .cache_file import KeyLocks, CacheEntryCorrupt, read_entry, write_entry
+from .cache_manifest import CacheManifest
+
+logger = logging.getLogger(__name__)
+
+# 支持的分钟周期（与Tushare stk_mins的freq参数一致）
+MINUTE_FREQS = ('1min', '5min', '15min', '30min', '60min')
+
+# 输出列顺序（与Tushare分钟行情格式保持一致）
+MINUTE_BAR_COLUMNS = ['ts_code', 'trade_time', 'open', 'high', 'low', 'close', 'vol', 'amount']
+
+# 各数值列的存储类型
+FLOAT_COLUMNS = ['open', 'high', 'low', 'close', 'amount']
+INT_COLUMNS = ['vol']
+
+# 文件格式版本，格式不兼容时递增，旧文件视为未命中
+STORE_FORMAT_VERSION = 1
+
+CHECKPOINT_FILE = 'checkpoint.json'
+
+
+def month_chunks(start_date: str, end_date: str) -> List[Tuple[str, str]]:
+    """
+    将日期区间按自然月切分
+
+    Args:
+        start_date: 开始日期 (YYYYMMDD格式)
+        end_date: 结束日期 (YYYYMMDD格式)
+
+    Returns:
+        按时间顺序排列的(开始日期, 结束日期)列表，首尾两段按原区间截断
+    """
+    chunks = []
+    cursor = datetime.strptime(start_date, '%Y%m%d')
+    end = datetime.strptime(end_date, '%Y%m%d')
+    while cursor <= end:
+        next_month = (cursor.replace(day=1) + timedelta(days=32)).replace(day=1)
+        chunk_end = min(end, next_month - timedelta(days=1))
+        chunks.append((cursor.strftime('%Y%m%d'), chunk_end.strftime('%Y%m%d')))
+        cursor = next_month
+    return chunks
+
+
+class MinuteBarStore:
+    """分钟行情列式存储 - 按周期/ETF/月份分区"""
+
+    def __init__(self, store_dir: str, locks: Optional[KeyLocks] = None,
+                 manifest: Optional[CacheManifest] = None):
+        """
+        初始化分钟行情存储
+
+        Args:
+            store_dir: 存储目录路径
+            locks: 跨进程的按键锁，用于串行化同一分区和检查点的读-改-写；不指定时不加锁
+            manifest: 缓存清单，登记分区文件的写入和读取；不指定时不登记
+        """
+        self.store_dir = store_dir
+        self.locks = locks
+        self.manifest = manifest
+        os.makedirs(store_dir, exist_ok=True)
+
+    def _series_dir(self, etf_code: str, freq: str) -> str:
+        if freq not in MINUTE_FREQS:
+            raise ValueError(f"不支持的分钟周期: {freq}，可选: {', '.join(MINUTE_FREQS)}")
+        return os.path.join(self.store_dir, freq, etf_code)
+
+    def partition_path(self, etf_code: str, freq: str, month: str) -> str:
+        """获取某月(YYYYMM)分区的文件路径"""
+        return os.path.join(self._series_dir(etf_code, freq), f"{month}.npz")
+
+    def _lock(self, path: str):
+        return self.locks.lock(path) if self.locks else nullcontext()
+
+    def list_months(self, etf_code: str, freq: str) -> List[str]:
+        """
+        列出已有数据的月份分区
+
+        Returns:
+            List[str]: YYYYMM格式的月份列表
+        """
+        try:
+            return sorted(f[:-len('.npz')] for f in os.listdir(self._series_dir(etf_code, freq))
+                          if f.endswith('.npz'))
+        except OSError:
+            return []
+
+    # ---- 检查点 ----
+
+    def get_coverage(self, etf_code: str, freq: str) -> List[Tuple[str, str]]:
+        """
+        获取已完整获取的日期区间
+
+        Returns:
+            覆盖区间列表，元素为(开始日期, 结束日期)，YYYYMMDD格式
+        """
+        path = os.path.join(self._series_dir(etf_code, freq), CHECKPOINT_FILE)
+        try:
+            return [tuple(interval) for interval in read_entry(path)['covered']]
+        except FileNotFoundError:
+            return []
+        except (CacheEntryCorrupt, KeyError, TypeError) as e:
+            logger.warning(f"分钟行情检查点损坏，视为未获取: {path}, 错误: {e}")
+            return []
+
+    def mark_covered(self, etf_code: str, freq: str, start_date: str, end_date: str):
+        """
+        将日期区间记为已完整获取（区间内的分区需已写入）
+
+        Args:
+            etf_code: ETF代码
+            freq: 分钟周期
+            start_date: 开始日期 (YYYYMMDD格式)
+            end_date: 结束日期 (YYYYMMDD格式)
+        """
+        path = os.path.join(self._series_dir(etf_code, freq), CHECKPOINT_FILE)
+        with self._lock(path):
+            intervals = merge_intervals(self.get_coverage(etf_code, freq) + [(start_date, end_date)])
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_entry(path, {'covered': [list(interval) for interval in intervals]})
+
+    def uncover_month(self, etf_code: str, freq: str, month: str):
+        """
+        将某月从已获取区间中移除（该月分区被淘汰后调用，下次读取时重新获取）
+
+        Args:
+            etf_code: ETF代码
+            freq: 分钟周期
+            month: 月份 (YYYYMM格式)
+        """
+        first_day = datetime.strptime(f"{month}01", '%Y%m%d')
+        next_month = (first_day + timedelta(days=32)).replace(day=1)
+        month_start, month_end = first_day.strftime('%Y%m%d'), (next_month - timedelta(days=1)).strftime('%Y%m%d')
+        day_before = (first_day - timedelta(days=1)).strftime('%Y%m%d')
+        day_after = next_month.strftime('%Y%m%d')
+
+        path = os.path.join(self._series_dir(etf_code, freq), CHECKPOINT_FILE)
+        with self._lock(path):
+            covered = self.get_coverage(etf_code, freq)
+            intervals = []
+            for start, end in covered:
+                if start < month_start:
+                    intervals.append((start, min(end, day_before)))
+                if end > month_end:
+                    intervals.append((max(start, day_after), end))
+            if intervals != covered:
+                write_entry(path, {'covered': [list(interval) for interval in intervals]})
+
+    def missing_ranges(self, etf_code: str, freq: str, start_date: str, end_date: str) -> List[Tuple[str, str]]:
+        """
+        计算日期窗口中尚未获取的区间
+
+        Returns:
+            需要补充获取的日期区间列表
+        """
+        if start_date > end_date:
+            return []
+        return subtract_intervals(start_date, end_date, self.get_coverage(etf_code, freq))
+
+    # ---- 分区读写 ----
+
+    def _load_partition(self, path: str) -> Optional[Dict[str, np.ndarray]]:
+        """加载一个月份分区的列数组，文件不存在、损坏或格式版本不匹配时返回None"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                arrays = {name: npz[name] for name in npz.files}
+        except (OSError, ValueError) as e:
+            logger.warning(f"分钟行情分区文件损坏，已删除: {path}, 错误: {e}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+        if int(arrays.get('format_version', 0)) != STORE_FORMAT_VERSION:
+            logger.info(f"分钟行情分区格式版本不匹配，视为未命中: {path}")
+            return None
+        return arrays
+
+    def merge(self, etf_code: str, freq: str, df: Optional[pd.DataFrame]):
+        """
+        将分钟K线按月份合并进对应分区，同一时间以新数据为准
+
+        Args:
+            etf_code: ETF代码
+            freq: 分钟周期
+            df: 分钟行情，列格式同MINUTE_BAR_COLUMNS；可以为空
+        """
+        if df is None or df.empty:
+            return
+        months = df['trade_time'].dt.strftime('%Y%m')
+        for month, part in df.groupby(months, sort=True):
+            path = self.partition_path(etf_code, freq, month)
+            # 其他进程可能同时合并同一分区，加锁避免后写入者覆盖先写入者的数据
+            with self._lock(path):
+                frames = [part[MINUTE_BAR_COLUMNS]]
+                arrays = self._load_partition(path)
+                if arrays is not None:
+                    frames.insert(0, self._frame_from_arrays(etf_code, arrays))
+                merged = pd.concat(frames, ignore_index=True)
+                merged = merged.drop_duplicates('trade_time', keep='last').sort_values('trade_time')
+                self._write_partition(path, merged)
+
+    def _write_partition(self, path: str, df: pd.DataFrame):
+        """压缩写入一个月份分区（先写临时文件再重命名）"""
+        arrays = {
+            'format_version': np.array(STORE_FORMAT_VERSION, dtype=np.int64),
+            'trade_time': df['trade_time'].to_numpy(dtype='datetime64[ns]').view(np.int64),
+        }
+        for column in FLOAT_COLUMNS:
+            arrays[column] = df[column].to_numpy(dtype=np.float64)
+        for column in INT_COLUMNS:
+            arrays[column] = df[column].to_numpy(dtype=np.int64)
+
+        partition_dir = os.path.dirname(path)
+        os.makedirs(partition_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=partition_dir, prefix='.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        if self.manifest is not None:
+            self.manifest.record_write(path)
+
+    def read(self, etf_code: str, freq: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        """
+        读取日期窗口内的分钟行情
+
+        Args:
+            etf_code: ETF代码
+            freq: 分钟周期
+            start_date: 开始日期 (YYYYMMDD格式)
+            end_date: 结束日期 (YYYYMMDD格式，包含当日全部K线)
+
+        Returns:
+            DataFrame: 分钟行情；窗口未被完整获取时返回None
+        """
+        if self.missing_ranges(etf_code, freq, start_date, end_date):
+            return None
+        return self.read_available(etf_code, freq, start_date, end_date)
+
+    def read_available(self, etf_code: str, freq: str, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        读取日期窗口内已有的分钟行情，只加载与窗口相交的月份分区
+
+        Args:
+            etf_code: ETF代码
+            freq: 分钟周期
+            start_date: 开始日期 (YYYYMMDD格式)
+            end_date: 结束日期 (YYYYMMDD格式，包含当日全部K线)
+
+        Returns:
+            DataFrame: 窗口内已有的分钟行情（可能为空）
+        """
+        start = np.datetime64(pd.Timestamp(start_date), 'ns')
+        end = np.datetime64(pd.Timestamp(end_date) + pd.Timedelta(days=1), 'ns')
+
+        frames = []
+        for month_start, _ in month_chunks(start_date, end_date):
+            path = self.partition_path(etf_code, freq, month_start[:6])
+            arrays = self._load_partition(path)
+            if arrays is not None:
+                frames.append(self._frame_from_arrays(etf_code, arrays, start, end))
+                if self.manifest is not None:
+                    self.manifest.record_access(path)
+
+        if not frames:
+            return pd.DataFrame({column: [] for column in MINUTE_BAR_COLUMNS})
+        return pd.concat(frames, ignore_index=True)
+
+    @staticmethod
+    def _frame_from_arrays(etf_code: str, arrays: Dict[str, np.ndarray],
+                           start: Optional[np.datetime64] = None,
+                           end: Optional[np.datetime64] = None) -> pd.DataFrame:
+        """按时间窗口[start, end)切片并构建DataFrame，未指定时返回全部数据"""
+        trade_time = arrays['trade_time'].view('datetime64[ns]')
+        lo = np.searchsorted(trade_time, start, side='left') if start is not None else 0
+        hi = np.searchsorted(trade_time, end, side='left') if end is not None else len(trade_time)
+
+        columns = {
+            'ts_code': np.full(hi - lo, etf_code, dtype=object),
+            'trade_time': trade_time[lo:hi],
+        }
+        for column in MINUTE_BAR_COLUMNS[2:]:
+            columns[column] = arrays[column][lo:hi]
+
+        return pd.DataFrame(columns, columns=MINUTE_BAR_COLUMNS)
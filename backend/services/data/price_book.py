@@ -0,0 +1,306 @@
+"""
+富途推送行情报价簿
+按需为被查询的ETF订阅富途报价推送（StockQuoteHandlerBase），推送线程把最新价、昨收、成交量和成交额
+写入进程内报价簿，盘中查询最新价格直接读取报价簿，不再每次请求行情快照。
+
+报价簿中每只证券对应一个报价字典，推送更新时整体替换（不修改已发布的字典），
+读取方无需加锁；订阅登记由订阅器持锁维护，长时间无人查询的订阅由后台线程退订，
+释放富途的订阅额度
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+import futu as ft
+
+logger = logging.getLogger(__name__)
+
+# 是否启用推送报价（回放模式下不可用，自动退回行情快照）
+QUOTE_PUSH_ENABLED = os.getenv('QUOTE_PUSH_ENABLED', 'true').lower() == 'true'
+
+# 多久无人查询后退订（秒）
+QUOTE_PUSH_IDLE_SECONDS = float(os.getenv('QUOTE_PUSH_IDLE_SECONDS', 600))
+
+# 同时保持的最大订阅数（富途按账户限制订阅额度）
+QUOTE_PUSH_MAX_SUBSCRIPTIONS = int(os.getenv('QUOTE_PUSH_MAX_SUBSCRIPTIONS', 100))
+
+# 富途要求订阅至少保持1分钟才能退订
+MIN_SUBSCRIPTION_SECONDS = 60
+
+# 订阅失败后暂停重试的时间（秒）
+SUBSCRIBE_RETRY_SECONDS = 60
+
+# 后台退订检查间隔（秒）
+SWEEP_INTERVAL = 30
+
+
+class PriceBook:
+    """进程内最新报价簿：推送线程整体替换报价，读取无需加锁"""
+
+    def __init__(self):
+        self._quotes: Dict[str, Dict] = {}
+
+    def get(self, code: str) -> Optional[Dict]:
+        """
+        获取最新报价
+
+        Args:
+            code: 完整证券代码（含市场前缀）
+
+        Returns:
+            Dict: 报价（last_price、prev_close、volume、turnover、data_date、data_time、received_at），没有报价时返回None
+        """
+        return self._quotes.get(code)
+
+    def update_from_frame(self, data) -> int:
+        """
+        用get_stock_quote或报价推送返回的数据更新报价簿
+
+        Args:
+            data: 报价DataFrame
+
+        Returns:
+            int: 更新的证券数量
+        """
+        received_at = time.time()
+        count = 0
+        for row in data.itertuples(index=False):
+            self._quotes[row.code] = {
+                'last_price': float(row.last_price),
+                'prev_close': float(row.prev_close_price),
+                'volume': int(row.volume),
+                'turnover': float(row.turnover),
+                'data_date': str(row.data_date),
+                'data_time': str(row.data_time),
+                'received_at': received_at,
+            }
+            count += 1
+        return count
+
+    def discard(self, codes: List[str]):
+        """移除已退订证券的报价"""
+        for code in codes:
+            self._quotes.pop(code, None)
+
+    def clear(self):
+        """清空报价簿（连接重建后原订阅失效）"""
+        self._quotes = {}
+
+    def __len__(self) -> int:
+        return len(self._quotes)
+
+
+class LiveQuoteHandler(ft.StockQuoteHandlerBase):
+    """富途报价推送回调：把推送的报价写入报价簿"""
+
+    def __init__(self, book: PriceBook, stats: Dict):
+        super().__init__()
+        self.book = book
+        self.stats = stats
+
+    def on_recv_rsp(self, rsp_pb):
+        ret, data = super().on_recv_rsp(rsp_pb)
+        if ret != ft.RET_OK:
+            logger.warning(f"富途报价推送解析失败: {data}")
+            return ret, data
+        self.stats['pushes'] += self.book.update_from_frame(data)
+        return ft.RET_OK, data
+
+
+class QuoteSubscriber:
+    """按需订阅报价推送，无人查询的订阅超时后退订"""
+
+    def __init__(self, get_ctx: Callable, book: Optional[PriceBook] = None,
+                 idle_seconds: float = QUOTE_PUSH_IDLE_SECONDS,
+                 max_subscriptions: int = QUOTE_PUSH_MAX_SUBSCRIPTIONS,
+                 sweep_interval: float = SWEEP_INTERVAL):
+        """
+        初始化订阅器
+
+        Args:
+            get_ctx: 返回当前行情连接的函数
+            book: 报价簿，默认新建
+            idle_seconds: 多久无人查询后退订（秒）
+            max_subscriptions: 同时保持的最大订阅数
+            sweep_interval: 后台退订检查间隔（秒）
+        """
+        self.get_ctx = get_ctx
+        self.book = book or PriceBook()
+        self.idle_seconds = idle_seconds
+        self.max_subscriptions = max_subscriptions
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        # 订阅所属的行情连接，连接重建后原订阅失效，需要重新订阅
+        self._ctx = None
+        self._subscribed: Dict[str, float] = {}
+        self._last_demand: Dict[str, float] = {}
+        self._retry_after = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {'hits': 0, 'misses': 0, 'subscribes': 0, 'unsubscribes': 0, 'pushes': 0, 'failures': 0}
+
+    def get_quote(self, code: str) -> Optional[Dict]:
+        """
+        读取最新报价，未订阅的证券先订阅
+
+        Args:
+            code: 完整证券代码（含市场前缀）
+
+        Returns:
+            Dict: 最新报价；订阅失败或暂无报价时返回None（调用方退回行情快照）
+        """
+        self._last_demand[code] = time.time()
+        if self.get_ctx() is self._ctx and code in self._subscribed:
+            quote = self.book.get(code)
+            if quote is not None:
+                self.stats['hits'] += 1
+                return quote
+
+        self.stats['misses'] += 1
+        if not self._subscribe(code):
+            return None
+        return self.book.get(code)
+
+    def _subscribe(self, code: str) -> bool:
+        """订阅一只证券并用当前报价初始化报价簿"""
+        with self._lock:
+            now = time.time()
+            try:
+                ctx = self.get_ctx()
+                if ctx is not self._ctx:
+                    self._attach(ctx)
+                if code in self._subscribed:
+                    return True
+                if now < self._retry_after:
+                    return False
+                if len(self._subscribed) >= self.max_subscriptions and not self._evict_one(ctx, now):
+                    logger.info(f"报价订阅数已达上限{self.max_subscriptions}，{code}使用行情快照")
+                    return False
+
+                ret, data = ctx.subscribe([code], [ft.SubType.QUOTE], subscribe_push=True)
+                if ret != ft.RET_OK:
+                    raise RuntimeError(data)
+                self._subscribed[code] = now
+                self.stats['subscribes'] += 1
+
+                # 订阅后的报价查询不消耗行情快照额度，推送到达前先用它初始化报价簿
+                ret, data = ctx.get_stock_quote([code])
+                if ret == ft.RET_OK:
+                    self.book.update_from_frame(data)
+            except Exception as e:
+                self.stats['failures'] += 1
+                self._retry_after = now + SUBSCRIBE_RETRY_SECONDS
+                logger.warning(f"订阅{code}报价推送失败，{SUBSCRIBE_RETRY_SECONDS}秒内使用行情快照: {e}")
+                return False
+
+        self._ensure_sweeper()
+        logger.info(f"已订阅{code}报价推送 (当前订阅{len(self._subscribed)}只)")
+        return True
+
+    def _attach(self, ctx):
+        """在新的行情连接上注册推送回调，丢弃旧连接的订阅（调用方需持有锁）"""
+        ctx.set_handler(LiveQuoteHandler(self.book, self.stats))
+        self._ctx = ctx
+        self._subscribed = {}
+        self.book.clear()
+
+    def _evict_one(self, ctx, now: float) -> bool:
+        """订阅数已满时退订最久未被查询且可退订的证券（调用方需持有锁）"""
+        candidates = [code for code, subscribed_at in self._subscribed.items()
+                      if now - subscribed_at >= MIN_SUBSCRIPTION_SECONDS]
+        if not candidates:
+            return False
+        code = min(candidates, key=lambda c: self._last_demand.get(c, 0))
+        return self._unsubscribe(ctx, [code]) > 0
+
+    def _unsubscribe(self, ctx, codes: List[str]) -> int:
+        """退订并移除报价（调用方需持有锁）"""
+        ret, data = ctx.unsubscribe(codes, [ft.SubType.QUOTE])
+        if ret != ft.RET_OK:
+            logger.warning(f"退订报价推送失败: {data}")
+            return 0
+        for code in codes:
+            self._subscribed.pop(code, None)
+            self._last_demand.pop(code, None)
+        self.book.discard(codes)
+        self.stats['unsubscribes'] += len(codes)
+        return len(codes)
+
+    def expire_idle(self, now: Optional[float] = None) -> List[str]:
+        """
+        退订超过idle_seconds无人查询的证券
+
+        Args:
+            now: 当前时间戳
+
+        Returns:
+            List[str]: 已退订的证券代码
+        """
+        now = now or time.time()
+        with self._lock:
+            # 订阅失败的证券只记录了查询时间，同样按空闲时间清理
+            for code in [code for code, demand_at in list(self._last_demand.items())
+                         if code not in self._subscribed and now - demand_at >= self.idle_seconds]:
+                self._last_demand.pop(code, None)
+            if self._ctx is None:
+                return []
+            idle = [code for code, subscribed_at in self._subscribed.items()
+                    if now - subscribed_at >= MIN_SUBSCRIPTION_SECONDS
+                    and now - self._last_demand.get(code, 0) >= self.idle_seconds]
+            if not idle or not self._unsubscribe(self._ctx, idle):
+                return []
+        logger.info(f"退订{len(idle)}只无人查询的报价推送: {idle}")
+        return idle
+
+    def _ensure_sweeper(self):
+        """启动后台退订线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="quote-subscriber", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止后台退订线程"""
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.expire_idle()
+            except Exception as e:
+                logger.error(f"退订报价推送失败: {e}")
+
+    def get_status(self) -> Dict:
+        """获取订阅状态"""
+        return {
+            'subscribed': len(self._subscribed),
+            'max_subscriptions': self.max_subscriptions,
+            'idle_seconds': self.idle_seconds,
+            'quotes': len(self.book),
+            **self.stats
+        }
+
+
+_subscribers: Dict[int, QuoteSubscriber] = {}
+_subscribers_lock = threading.Lock()
+
+
+def get_quote_subscriber(context_manager) -> QuoteSubscriber:
+    """
+    获取连接管理器对应的进程级订阅器（同一行情连接只能注册一个报价推送回调）
+
+    Args:
+        context_manager: 行情连接管理器
+
+    Returns:
+        QuoteSubscriber: 订阅器
+    """
+    with _subscribers_lock:
+        subscriber = _subscribers.get(id(context_manager))
+        if subscriber is None:
+            subscriber = QuoteSubscriber(lambda: context_manager.get())
+            _subscribers[id(context_manager)] = subscriber
+        return subscriber
@@ -0,0 +1,234 @@
+"""
+多ETF行情面板（内存映射）
+把列式存储中所有ETF的日线合并为 字段 × ETF × 交易日 的只读数组，
+各gunicorn工作进程以mmap方式打开同一份文件，共享操作系统页缓存，
+按ETF和日期窗口切片时直接返回数组视图，不再逐进程加载和解析缓存文件
+"""
+
+import os
+import json
+import time
+import shutil
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+from .bar_store import BarStore, BAR_COLUMNS, FLOAT_COLUMNS, STORE_FORMAT_VERSION, subtract_intervals
+
+logger = logging.getLogger(__name__)
+
+# 当前面板版本指针文件
+CURRENT_POINTER = "CURRENT"
+
+# 检查面板是否更新的最小间隔（秒）
+RELOAD_CHECK_INTERVAL = 30
+
+
+def read_current_version(panel_dir: str) -> Optional[str]:
+    """读取当前面板版本号，尚未构建时返回None"""
+    try:
+        with open(os.path.join(panel_dir, CURRENT_POINTER), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def build_price_panel(bar_store: BarStore, panel_dir: str) -> Optional[str]:
+    """
+    由列式存储构建行情面板
+
+    新面板写入独立的版本目录，完成后原子替换版本指针，
+    已打开旧版本的进程在下次检查时切换到新版本
+
+    Args:
+        bar_store: 日线列式存储
+        panel_dir: 面板根目录
+
+    Returns:
+        str: 新面板版本号，没有可用数据时返回None
+    """
+    start_time = time.time()
+    series: Dict[str, Tuple[pd.DataFrame, List[Tuple[str, str]]]] = {}
+    for etf_code in bar_store.list_codes():
+        df, intervals = bar_store.load_series(etf_code)
+        if df is not None and len(df):
+            series[etf_code] = (df, intervals)
+
+    if not series:
+        logger.info("列式存储中没有日线数据，跳过行情面板构建")
+        return None
+
+    symbols = sorted(series)
+    dates = np.unique(np.concatenate([
+        series[code][0]['trade_date'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        for code in symbols
+    ]))
+
+    prices = np.full((len(FLOAT_COLUMNS), len(symbols), len(dates)), np.nan, dtype=np.float64)
+    volumes = np.zeros((len(symbols), len(dates)), dtype=np.int64)
+    for i, code in enumerate(symbols):
+        df = series[code][0]
+        positions = np.searchsorted(dates, df['trade_date'].to_numpy(dtype='datetime64[ns]').view(np.int64))
+        prices[:, i, positions] = df[FLOAT_COLUMNS].to_numpy(dtype=np.float64).T
+        volumes[i, positions] = df['vol'].to_numpy(dtype=np.int64)
+
+    version = datetime.now().strftime('%Y%m%d%H%M%S%f')
+    version_dir = os.path.join(panel_dir, version)
+    os.makedirs(version_dir, exist_ok=True)
+    np.save(os.path.join(version_dir, 'prices.npy'), prices)
+    np.save(os.path.join(version_dir, 'volumes.npy'), volumes)
+    np.save(os.path.join(version_dir, 'dates.npy'), dates)
+    with open(os.path.join(version_dir, 'index.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            'store_format': STORE_FORMAT_VERSION,
+            'symbols': symbols,
+            'fields': FLOAT_COLUMNS,
+            'coverage': {code: series[code][1] for code in symbols},
+            # 开始读取列式存储的时间，之后写入存储的日线不在面板中
+            'built_at': start_time,
+        }, f, ensure_ascii=False)
+
+    # 原子替换版本指针
+    replaced = read_current_version(panel_dir)
+    pointer_tmp = os.path.join(panel_dir, f"{CURRENT_POINTER}.{os.getpid()}.tmp")
+    with open(pointer_tmp, 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(pointer_tmp, os.path.join(panel_dir, CURRENT_POINTER))
+
+    # 只清理比被替换版本更早的版本（已映射旧文件的进程在文件删除后仍可继续读取）：
+    # 被替换的版本留到下次构建再删，其他进程可能正在切换到它；更新的目录可能是并发构建正在写入的面板
+    if replaced:
+        for name in os.listdir(panel_dir):
+            old_dir = os.path.join(panel_dir, name)
+            if name < replaced and os.path.isdir(old_dir):
+                shutil.rmtree(old_dir, ignore_errors=True)
+
+    logger.info(f"行情面板构建完成: 版本{version}, {len(symbols)}只ETF × {len(dates)}个交易日, "
+                f"耗时{time.time() - start_time:.2f}s")
+    return version
+
+
+class PricePanel:
+    """只读行情面板 - 以内存映射方式共享给所有工作进程"""
+
+    def __init__(self, panel_dir: str):
+        """
+        初始化行情面板
+
+        Args:
+            panel_dir: 面板根目录
+        """
+        self.panel_dir = panel_dir
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self._last_check = 0.0
+        self._prices: Optional[np.ndarray] = None
+        self._volumes: Optional[np.ndarray] = None
+        self._dates: Optional[np.ndarray] = None
+        self._symbol_index: Dict[str, int] = {}
+        self._coverage: Dict[str, List[Tuple[str, str]]] = {}
+        self._built_at = 0.0
+
+    def _ensure_loaded(self) -> bool:
+        """按需映射当前版本的面板文件，返回面板是否可用"""
+        now = time.time()
+        if now - self._last_check < RELOAD_CHECK_INTERVAL:
+            return self._prices is not None
+
+        with self._lock:
+            if now - self._last_check < RELOAD_CHECK_INTERVAL:
+                return self._prices is not None
+            self._last_check = now
+
+            version = read_current_version(self.panel_dir)
+            if version is None or version == self._version:
+                return self._prices is not None
+
+            version_dir = os.path.join(self.panel_dir, version)
+            try:
+                with open(os.path.join(version_dir, 'index.json'), 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+                prices = np.load(os.path.join(version_dir, 'prices.npy'), mmap_mode='r')
+                volumes = np.load(os.path.join(version_dir, 'volumes.npy'), mmap_mode='r')
+                dates = np.load(os.path.join(version_dir, 'dates.npy'), mmap_mode='r')
+            except (OSError, ValueError) as e:
+                logger.warning(f"加载行情面板失败: 版本{version}, 错误: {e}")
+                return self._prices is not None
+            if index.get('store_format') != STORE_FORMAT_VERSION:
+                logger.info(f"行情面板与列式存储格式版本不匹配，等待重建: 版本{version}")
+                return self._prices is not None
+
+            # 转为普通ndarray视图（仍由mmap支撑），避免memmap子类混入DataFrame
+            self._prices, self._volumes = np.asarray(prices), np.asarray(volumes)
+            self._dates = np.asarray(dates).view('datetime64[ns]')
+            self._symbol_index = {code: i for i, code in enumerate(index['symbols'])}
+            self._coverage = {code: [tuple(interval) for interval in intervals]
+                              for code, intervals in index['coverage'].items()}
+            self._built_at = float(index.get('built_at', 0))
+            self._version = version
+            logger.info(f"行情面板已映射: 版本{version}, {len(self._symbol_index)}只ETF")
+            return True
+
+    def slice(self, etf_code: str, start_date: str, end_date: str,
+              source_mtime: Optional[float] = None) -> Optional[pd.DataFrame]:
+        """
+        切片获取单只ETF的日线数据
+
+        面板只在启动和收盘后预热时重建，构建后该ETF的存储又有写入时，面板中的数据可能过旧，
+        此时返回None由调用方读取存储
+
+        Args:
+            etf_code: ETF代码
+            start_date: 开始日期 (YYYYMMDD格式)
+            end_date: 结束日期 (YYYYMMDD格式)
+            source_mtime: 该ETF列式存储文件的修改时间，晚于面板构建时间时不使用面板
+
+        Returns:
+            DataFrame: 日线数据（数值列为面板的只读视图）；面板不可用、过旧或未完整覆盖该窗口时返回None
+        """
+        if not self._ensure_loaded():
+            return None
+
+        i = self._symbol_index.get(etf_code)
+        if i is None or subtract_intervals(start_date, end_date, self._coverage[etf_code]):
+            return None
+        if source_mtime is not None and source_mtime > self._built_at:
+            return None
+
+        dates = self._dates
+        lo = np.searchsorted(dates, np.datetime64(pd.Timestamp(start_date), 'ns'), side='left')
+        hi = np.searchsorted(dates, np.datetime64(pd.Timestamp(end_date), 'ns'), side='right')
+
+        prices = self._prices[:, i, lo:hi]
+        volumes = self._volumes[i, lo:hi]
+        trade_date = dates[lo:hi]
+
+        # 面板按所有ETF交易日的并集对齐，剔除该ETF没有K线的日期（仅此时发生复制）
+        valid = ~np.isnan(prices[FLOAT_COLUMNS.index('close')])
+        if not valid.all():
+            prices, volumes, trade_date = prices[:, valid], volumes[valid], trade_date[valid]
+
+        columns = {
+            'ts_code': np.full(len(trade_date), etf_code, dtype=object),
+            'trade_date': trade_date,
+        }
+        for column in BAR_COLUMNS[2:]:
+            if column == 'vol':
+                columns[column] = volumes
+            else:
+                columns[column] = prices[FLOAT_COLUMNS.index(column)]
+
+        return pd.DataFrame(columns, columns=BAR_COLUMNS, copy=False)
+
+    def get_info(self) -> Dict:
+        """获取面板状态信息"""
+        self._ensure_loaded()
+        return {
+            'version': self._version,
+            'symbol_count': len(self._symbol_index),
+            'day_count': 0 if self._dates is None else len(self._dates),
+            'built_at': datetime.fromtimestamp(self._built_at).isoformat(timespec='seconds') if self._built_at else None,
+        }
@@ -0,0 +1,166 @@
+"""
+富途行情连接管理
+每个进程按(host, port)共享一个OpenQuoteContext，首次使用时才建立连接，
+fork后的子进程会丢弃继承的连接重新建立，并定期做健康检查、失败时重连；
+返回的连接受熔断器保护，OpenD不可用时快速失败
+"""
+
+import os
+import time
+import atexit
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+import futu as ft
+
+from .circuit_breaker import CircuitBreaker, CircuitOpenError, GuardedQuoteContext
+from .futu_replay import create_quote_context, PROVIDER_MODE
+
+logger = logging.getLogger(__name__)
+
+# 健康检查最小间隔（秒）
+HEALTH_CHECK_INTERVAL = 30
+
+
+class QuoteContextManager:
+    """进程级富途行情连接管理器"""
+
+    def __init__(self, host: str, port: int, health_check_interval: float = HEALTH_CHECK_INTERVAL):
+        """
+        初始化连接管理器（不立即建立连接）
+
+        Args:
+            host: OpenD主机地址
+            port: OpenD端口
+            health_check_interval: 健康检查最小间隔（秒）
+        """
+        self.host = host
+        self.port = port
+        self.health_check_interval = health_check_interval
+        self._lock = threading.RLock()
+        self._ctx: Optional[ft.OpenQuoteContext] = None
+        self._guarded: Optional[GuardedQuoteContext] = None
+        self.breaker = CircuitBreaker(f"富途行情连接 {host}:{port}")
+        self._owner_pid: Optional[int] = None
+        self._last_health_check = 0.0
+        self._stats = {'connects': 0, 'reconnects': 0, 'health_check_failures': 0}
+
+    def get(self) -> ft.OpenQuoteContext:
+        """
+        获取当前进程的共享行情连接
+
+        Returns:
+            OpenQuoteContext: 受熔断器保护的行情连接（熔断期间调用立即抛出CircuitOpenError）
+        """
+        with self._lock:
+            if self._ctx is not None and self._owner_pid != os.getpid():
+                # fork继承的连接属于父进程，子进程不能复用也不应关闭
+                logger.info(f"检测到进程fork，为进程 {os.getpid()} 重新建立富途行情连接")
+                self._ctx = None
+
+            if self._ctx is None:
+                self._connect()
+            elif time.time() - self._last_health_check >= self.health_check_interval:
+                self._health_check()
+
+            return self._guarded
+
+    def _connect(self):
+        """建立新的行情连接（调用方需持有锁）"""
+        self._ctx = create_quote_context(self.host, self.port)
+        self._guarded = GuardedQuoteContext(self._ctx, self.breaker)
+        self._owner_pid = os.getpid()
+        self._last_health_check = time.time()
+        self._stats['connects'] += 1
+        logger.info(f"富途行情连接已建立: {self.host}:{self.port} (进程 {self._owner_pid})")
+
+    def _health_check(self):
+        """
+        检查连接状态，失败时重连（调用方需持有锁）
+
+        检查经过熔断器：熔断期间跳过检查和重连，半开状态下检查本身就是探测调用
+        """
+        self._last_health_check = time.time()
+        try:
+            ret, data = self._guarded.get_global_state()
+            if ret == ft.RET_OK:
+                return
+            logger.warning(f"富途行情连接健康检查失败: {data}")
+        except CircuitOpenError:
+            return
+        except Exception as e:
+            logger.warning(f"富途行情连接健康检查异常: {e}")
+
+        self._stats['health_check_failures'] += 1
+        self.reconnect()
+
+    def reconnect(self):
+        """关闭当前连接并重新建立"""
+        with self._lock:
+            self._close_current()
+            self._connect()
+            self._stats['reconnects'] += 1
+
+    def close(self):
+        """关闭当前进程持有的连接"""
+        with self._lock:
+            self._close_current()
+
+    def _close_current(self):
+        """关闭连接（调用方需持有锁）"""
+        if self._ctx is not None and self._owner_pid == os.getpid():
+            try:
+                self._ctx.close()
+            except Exception as e:
+                logger.warning(f"关闭富途行情连接异常: {e}")
+        self._ctx = None
+        self._guarded = None
+        self._owner_pid = None
+
+    def get_status(self) -> Dict:
+        """
+        获取连接状态
+
+        Returns:
+            dict: 连接地址、数据来源模式、是否已连接、熔断器状态及连接统计
+        """
+        with self._lock:
+            return {
+                'address': f"{self.host}:{self.port}",
+                'mode': PROVIDER_MODE,
+                'connected': self._ctx is not None and self._owner_pid == os.getpid(),
+                'circuit_breaker': self.breaker.get_status(),
+                **self._stats
+            }
+
+
+_managers: Dict[Tuple[str, int], QuoteContextManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_quote_context_manager(host: Optional[str] = None, port: Optional[int] = None) -> QuoteContextManager:
+    """
+    获取进程级共享的连接管理器
+
+    Args:
+        host: OpenD主机地址，默认读取环境变量FUTU_HOST
+        port: OpenD端口，默认读取环境变量FUTU_PORT
+
+    Returns:
+        QuoteContextManager: 连接管理器
+    """
+    host = host or os.getenv('FUTU_HOST', '127.0.0.1')
+    port = int(port or os.getenv('FUTU_PORT', 11111))
+    with _managers_lock:
+        manager = _managers.get((host, port))
+        if manager is None:
+            manager = QuoteContextManager(host, port)
+            _managers[(host, port)] = manager
+        return manager
+
+
+@atexit.register
+def _close_all():
+    """进程退出时关闭所有连接"""
+    for manager in list(_managers.values()):
+        manager.close()
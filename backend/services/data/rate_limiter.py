@@ -0,0 +1,203 @@
+"""
+富途接口跨进程限流
+富途OpenD按账户限制历史K线、行情快照等接口的调用频率，各gunicorn工作进程共享同一份额度。
+每个接口一个令牌桶，状态保存在本地文件中并用文件锁保护，所有进程共用；
+后台任务（如收盘后预热）只能使用预留额度之外的令牌，交互请求优先。
+令牌不足时立即抛出QuotaExhaustedError，由调用方改用缓存中的旧数据，而不是阻塞等待
+"""
+
+import os
+import time
+import struct
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows下没有fcntl，退化为进程内限流
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 各接口的额度：(令牌桶容量, 补满所需秒数)，参考富途OpenAPI的接口限频（30秒内最多请求次数）
+ENDPOINT_QUOTAS: Dict[str, Tuple[int, float]] = {
+    'history_kline': (60, 30),
+    'snapshot': (60, 30),
+    'basic_info': (60, 30),
+    'rehab': (60, 30),
+}
+
+# 为交互请求预留的令牌比例，后台任务不能使用这部分令牌
+BACKGROUND_RESERVE_RATIO = float(os.getenv('FUTU_BACKGROUND_RESERVE_RATIO', 0.3))
+
+# 请求优先级
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_BACKGROUND = 'background'
+
+# 当前调用链的优先级（默认交互请求）
+_priority: contextvars.ContextVar = contextvars.ContextVar('futu_request_priority', default=PRIORITY_INTERACTIVE)
+
+# 令牌桶文件格式：剩余令牌数、上次补充时间
+_BUCKET_FORMAT = '<dd'
+_BUCKET_SIZE = struct.calcsize(_BUCKET_FORMAT)
+
+
+class QuotaExhaustedError(Exception):
+    """接口额度已用完，调用方应改用缓存中的旧数据"""
+
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(f"富途接口 {endpoint} 额度已用完，约{retry_after:.1f}秒后恢复")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+@contextmanager
+def request_priority(priority: str) -> Iterator[None]:
+    """
+    在上下文中设置富途请求的优先级
+
+    Args:
+        priority: PRIORITY_INTERACTIVE 或 PRIORITY_BACKGROUND
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    """获取当前调用链的请求优先级"""
+    return _priority.get()
+
+
+class RateLimiter:
+    """按接口划分的跨进程令牌桶"""
+
+    def __init__(self, state_dir: str, quotas: Optional[Dict[str, Tuple[int, float]]] = None,
+                 background_reserve_ratio: float = BACKGROUND_RESERVE_RATIO):
+        """
+        初始化限流器
+
+        Args:
+            state_dir: 令牌桶状态文件目录（同一主机上的进程共用）
+            quotas: 各接口的额度，未指定的使用默认值
+            background_reserve_ratio: 为交互请求预留的令牌比例
+        """
+        self.state_dir = state_dir
+        self.quotas = {**ENDPOINT_QUOTAS, **(quotas or {})}
+        self.background_reserve_ratio = background_reserve_ratio
+        os.makedirs(state_dir, exist_ok=True)
+        # 没有文件锁时的进程内状态，以及本进程的放行/拒绝统计
+        self._local_lock = threading.Lock()
+        self._local_buckets: Dict[str, Tuple[float, float]] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, endpoint: str, key: str):
+        with self._local_lock:
+            stats = self._stats.setdefault(endpoint, {'granted': 0, 'rejected': 0})
+            stats[key] += 1
+
+    def try_acquire(self, endpoint: str, priority: Optional[str] = None) -> float:
+        """
+        尝试获取一个令牌，不等待
+
+        Args:
+            endpoint: 接口名称，见ENDPOINT_QUOTAS
+            priority: 请求优先级，默认取当前调用链的优先级
+
+        Returns:
+            float: 0表示获取成功，否则为预计需要等待的秒数
+        """
+        capacity, period = self.quotas[endpoint]
+        rate = capacity / period
+        priority = priority or current_priority()
+        floor = capacity * self.background_reserve_ratio if priority == PRIORITY_BACKGROUND else 0.0
+
+        def update(tokens: float, updated_at: float, now: float) -> Tuple[float, float, float]:
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            if tokens - 1 >= floor:
+                return tokens - 1, now, 0.0
+            return tokens, now, (floor + 1 - tokens) / rate
+
+        if fcntl is None:
+            with self._local_lock:
+                now = time.time()
+                tokens, updated_at = self._local_buckets.get(endpoint, (capacity, now))
+                tokens, updated_at, wait = update(tokens, updated_at, now)
+                self._local_buckets[endpoint] = (tokens, updated_at)
+        else:
+            wait = self._update_shared(endpoint, capacity, update)
+
+        self._count(endpoint, 'granted' if wait == 0 else 'rejected')
+        return wait
+
+    def _update_shared(self, endpoint: str, capacity: int, update) -> float:
+        """在文件锁保护下读取、更新并写回令牌桶状态"""
+        fd = os.open(os.path.join(self.state_dir, f"{endpoint}.bucket"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            now = time.time()
+            raw = os.pread(fd, _BUCKET_SIZE, 0)
+            tokens, updated_at = struct.unpack(_BUCKET_FORMAT, raw) if len(raw) == _BUCKET_SIZE else (capacity, now)
+            tokens, updated_at, wait = update(tokens, updated_at, now)
+            os.pwrite(fd, struct.pack(_BUCKET_FORMAT, tokens, updated_at), 0)
+            return wait
+        finally:
+            os.close(fd)  # 关闭文件即释放锁
+
+    def acquire(self, endpoint: str, priority: Optional[str] = None):
+        """
+        获取一个令牌，额度不足时立即抛出异常
+
+        Args:
+            endpoint: 接口名称
+            priority: 请求优先级，默认取当前调用链的优先级
+
+        Raises:
+            QuotaExhaustedError: 额度已用完
+        """
+        wait = self.try_acquire(endpoint, priority)
+        if wait > 0:
+            raise QuotaExhaustedError(endpoint, wait)
+
+    def get_stats(self) -> Dict:
+        """
+        获取限流统计信息
+
+        Returns:
+            dict: 各接口本进程内放行和拒绝的次数
+        """
+        with self._local_lock:
+            endpoints = {endpoint: dict(stats) for endpoint, stats in self._stats.items()}
+        return {
+            'shared': fcntl is not None,
+            'background_reserve_ratio': self.background_reserve_ratio,
+            'endpoints': endpoints,
+        }
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(state_dir: str) -> RateLimiter:
+    """
+    获取进程级共享的限流器
+
+    Args:
+        state_dir: 令牌桶状态文件目录
+
+    Returns:
+        RateLimiter: 限流器
+    """
+    state_dir = os.path.abspath(state_dir)
+    with _limiters_lock:
+        limiter = _limiters.get(state_dir)
+        if limiter is None:
+            limiter = RateLimiter(state_dir)
+            _limiters[state_dir] = limiter
+        return limiter
@@ -0,0 +1,88 @@
+"""
+后台刷新（stale-while-revalidate）
+缓存过期或新交易日尚无缓存时先返回最近的旧值，由后台线程刷新缓存，
+请求延迟不再受网关往返影响；同一键同时只有一个刷新任务
+"""
+
+import os
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 后台刷新线程数
+REVALIDATE_WORKERS = int(os.getenv('REVALIDATE_WORKERS', 2))
+
+
+class BackgroundRefresher:
+    """按键去重的后台刷新任务池"""
+
+    def __init__(self, max_workers: int = REVALIDATE_WORKERS):
+        """
+        Args:
+            max_workers: 后台刷新线程数
+        """
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._owner_pid: Optional[int] = None
+        self._pending: Dict[str, Future] = {}
+        self._stats = {'scheduled': 0, 'deduplicated': 0, 'failed': 0}
+
+    def submit(self, key: str, fn: Callable, *args) -> bool:
+        """
+        提交刷新任务，同一键已有进行中的任务时忽略
+
+        Args:
+            key: 刷新键（通常为缓存键）
+            fn: 刷新函数
+            *args: 函数位置参数
+
+        Returns:
+            bool: 是否提交了新任务
+        """
+        with self._lock:
+            if key in self._pending:
+                self._stats['deduplicated'] += 1
+                return False
+            if self._executor is None or self._owner_pid != os.getpid():
+                # fork后的子进程没有父进程的工作线程，需要新建线程池
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="revalidate")
+                self._owner_pid = os.getpid()
+                self._pending = {}
+            self._stats['scheduled'] += 1
+            future = self._executor.submit(self._run, key, fn, *args)
+            self._pending[key] = future
+            return True
+
+    def _run(self, key: str, fn: Callable, *args):
+        try:
+            fn(*args)
+        except Exception as e:
+            self._stats['failed'] += 1
+            logger.warning(f"后台刷新失败: {key}, 错误: {e}")
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def wait(self, timeout: Optional[float] = None):
+        """等待当前所有刷新任务完成"""
+        with self._lock:
+            futures = list(self._pending.values())
+        wait(futures, timeout=timeout)
+
+    def get_stats(self) -> Dict:
+        """
+        获取刷新统计信息
+
+        Returns:
+            dict: 提交、去重和失败的任务数及当前进行中的任务数
+        """
+        with self._lock:
+            return {**self._stats, 'in_flight': len(self._pending)}
+
+
+# 进程级共享的后台刷新任务池
+background_refresher = BackgroundRefresher()
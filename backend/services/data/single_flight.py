@@ -0,0 +1,82 @@
+"""
+并发请求合并（single-flight）
+同一缓存键的并发未命中只由第一个调用方向上游获取数据，
+其余调用方等待并共享该结果，避免重复请求富途OpenD网关
+"""
+
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class _Call:
+    """进行中的一次上游调用"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """按键合并并发调用"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._stats = {'calls': 0, 'executions': 0, 'collapsed': 0}
+
+    def do(self, key: str, fn: Callable, *args, **kwargs) -> Any:
+        """
+        执行调用，同一键已有进行中的调用时等待其结果
+
+        Args:
+            key: 合并键（通常为缓存键）
+            fn: 实际执行的函数
+            *args: 函数位置参数
+            **kwargs: 函数关键字参数
+
+        Returns:
+            函数返回值；等待方得到与首个调用方相同的结果或异常
+        """
+        with self._lock:
+            self._stats['calls'] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self._stats['collapsed'] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._stats['executions'] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def get_stats(self) -> Dict:
+        """
+        获取合并统计信息
+
+        Returns:
+            dict: 总调用数、实际执行数、被合并的调用数和当前进行中的调用数
+        """
+        with self._lock:
+            return {**self._stats, 'in_flight': len(self._calls)}
+
+
+# 进程级共享实例，同一工作进程内的所有客户端共用
+single_flight = SingleFlight()
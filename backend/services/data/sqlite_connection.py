@@ -0,0 +1,66 @@
+"""
+进程级共享的SQLite连接
+缓存清单和SQLite缓存后端每个进程只打开一个连接，各线程（gevent下为各协程）持锁串行使用，
+连接数和文件句柄不随线程数增长；fork后的子进程丢弃继承的连接和锁，重新连接
+"""
+
+import os
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteConnection:
+    """按进程共享的SQLite连接（WAL模式）"""
+
+    def __init__(self, db_path: str, timeout: float = 10):
+        """
+        初始化连接（首次使用时才打开）
+
+        Args:
+            db_path: 数据库文件路径
+            timeout: 等待其他进程释放写锁的时间（秒）
+        """
+        self.db_path = db_path
+        self.timeout = timeout
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._owner_pid = os.getpid()
+
+    @contextmanager
+    def connect(self) -> Iterator[sqlite3.Connection]:
+        """
+        持锁获取当前进程的连接，语句及其结果需在with块内执行和读取
+
+        Yields:
+            sqlite3.Connection: 自动提交模式的连接
+        """
+        if self._owner_pid != os.getpid():
+            # fork继承的连接和锁属于父进程：锁可能在fork时被其他线程持有，连接不能跨进程使用
+            self._lock = threading.RLock()
+            self._conn = None
+            self._owner_pid = os.getpid()
+        with self._lock:
+            if self._conn is None:
+                conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None,
+                                       check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                self._conn = conn
+            yield self._conn
+
+    def close(self):
+        """关闭当前进程打开的连接"""
+        if self._owner_pid != os.getpid():
+            return
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.close()
+                except sqlite3.Error as e:
+                    logger.warning(f"关闭SQLite连接失败: {self.db_path}, 错误: {e}")
+                self._conn = None
@@ -0,0 +1,112 @@
+"""
+ETF代码索引
+在进程内保存沪深ETF代码表，支持代码前缀、名称子串和拼音首字母查找，
+每个交易日只从富途API下载一次代码表，搜索时不再访问网关
+"""
+
+import bisect
+import logging
+from typing import Dict, List, Optional, Set
+
+try:
+    from pypinyin import lazy_pinyin, Style
+except ImportError:  # 拼音首字母查找为可选功能
+    lazy_pinyin = None
+
+logger = logging.getLogger(__name__)
+
+
+def pinyin_initials(name: str) -> str:
+    """
+    计算名称的拼音首字母（小写），非汉字字符保持原样
+
+    Args:
+        name: 证券名称，如"沪深300ETF"
+
+    Returns:
+        str: 拼音首字母，如"hs300etf"；未安装pypinyin时返回空字符串
+    """
+    if lazy_pinyin is None:
+        return ''
+    return ''.join(lazy_pinyin(name, style=Style.FIRST_LETTER, errors='default')).lower()
+
+
+class SymbolIndex:
+    """ETF代码表的内存索引"""
+
+    def __init__(self, records: List[Dict], trade_date: Optional[str] = None):
+        """
+        构建索引
+
+        Args:
+            records: ETF记录列表，每条至少包含code和name字段
+            trade_date: 代码表对应的交易日 (YYYYMMDD格式)
+        """
+        self.trade_date = trade_date
+        self._records = sorted(records, key=lambda record: record['code'])
+        self._codes = [record['code'] for record in self._records]
+        self._names = [record['name'].lower() for record in self._records]
+        self._initials = [pinyin_initials(record['name']) for record in self._records]
+
+        # 名称中的每个字符 -> 包含该字符的记录位置
+        self._char_index: Dict[str, Set[int]] = {}
+        for i, text in enumerate(self._names):
+            for char in set(text):
+                self._char_index.setdefault(char, set()).add(i)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def codes(self) -> List[str]:
+        """全部ETF代码（升序）"""
+        return list(self._codes)
+
+    def _code_prefix(self, query: str) -> List[int]:
+        """代码前缀匹配的记录位置"""
+        lo = bisect.bisect_left(self._codes, query)
+        hi = bisect.bisect_left(self._codes, query + '\uffff')
+        return list(range(lo, hi))
+
+    def _name_substring(self, query: str) -> List[int]:
+        """名称子串匹配的记录位置（先按字符索引缩小候选范围）"""
+        candidates: Optional[Set[int]] = None
+        for char in set(query):
+            positions = self._char_index.get(char)
+            if not positions:
+                return []
+            candidates = positions if candidates is None else candidates & positions
+        return sorted(i for i in candidates if query in self._names[i])
+
+    def _pinyin_initials(self, query: str) -> List[int]:
+        """拼音首字母匹配的记录位置"""
+        if not query.isascii() or lazy_pinyin is None:
+            return []
+        return [i for i, initials in enumerate(self._initials) if query in initials]
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """
+        搜索ETF
+
+        依次按代码前缀、名称子串、拼音首字母匹配，结果去重后保持该优先顺序
+
+        Args:
+            query: 搜索关键词（代码、名称或拼音首字母）
+            limit: 最多返回的结果数
+
+        Returns:
+            List[Dict]: 匹配的ETF记录
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+
+        positions: List[int] = []
+        seen: Set[int] = set()
+        for matcher in (self._code_prefix, self._name_substring, self._pinyin_initials):
+            for i in matcher(query):
+                if i not in seen:
+                    seen.add(i)
+                    positions.append(i)
+                    if len(positions) >= limit:
+                        return [dict(self._records[i]) for i in positions]
+        return [dict(self._records[i]) for i in positions]
@@ -0,0 +1,249 @@
+"""
+A股交易日历
+按年份加载真实交易日（本地日历文件、富途API或tushare），永久缓存，
+在进程内保存为有序列表，最近/上一个/下一个交易日及区间交易日查询均为二分查找
+"""
+
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set
+import futu as ft
+
+logger = logging.getLogger(__name__)
+
+# 本地交易日历文件（可选），格式为 {"2024": ["20240102", ...], ...}
+CALENDAR_FILE = os.getenv('TRADING_CALENDAR_FILE', os.path.join('data', 'trading_calendar.json'))
+
+# 某年交易日历获取失败后再次尝试的最小间隔（秒）
+CALENDAR_RETRY_INTERVAL = 300
+
+# 可查询的年份范围，超出范围的日期不再向前或向后加载
+MIN_CALENDAR_YEAR = 1990
+MAX_CALENDAR_YEAR_AHEAD = 1
+
+
+class TradingCalendar:
+    """A股交易日历 - 有序交易日列表上的二分查找"""
+
+    def __init__(self, cache, quote_ctx_provider: Optional[Callable[[], ft.OpenQuoteContext]] = None,
+                 calendar_file: str = CALENDAR_FILE):
+        """
+        初始化交易日历（按需加载年份）
+
+        Args:
+            cache: 缓存管理器实例（交易日历写入永久缓存）
+            quote_ctx_provider: 返回富途行情连接的函数
+            calendar_file: 本地交易日历文件路径
+        """
+        self.cache = cache
+        self.quote_ctx_provider = quote_ctx_provider
+        self.calendar_file = calendar_file
+        self._lock = threading.RLock()
+        self._days: List[str] = []
+        self._loaded_years: Set[int] = set()
+        self._failed_years: Dict[int, float] = {}
+        self._file_calendar: Optional[Dict[str, List[str]]] = None
+
+    def _ensure_year(self, year: int, tushare_pro=None) -> bool:
+        """
+        确保指定年份的交易日已加载
+
+        Args:
+            year: 年份
+            tushare_pro: tushare pro接口实例（可选的备用数据源）
+
+        Returns:
+            bool: 该年份交易日是否可用
+        """
+        if year in self._loaded_years:
+            return True
+
+        with self._lock:
+            if year in self._loaded_years:
+                return True
+            failed_at = self._failed_years.get(year)
+            if failed_at is not None and time.time() - failed_at < CALENDAR_RETRY_INTERVAL:
+                return False
+
+            trading_days = self._load_year(year, tushare_pro)
+            if not trading_days:
+                self._failed_years[year] = time.time()
+                return False
+
+            self._failed_years.pop(year, None)
+            self._days = sorted(set(self._days).union(trading_days))
+            self._loaded_years.add(year)
+            return True
+
+    def _load_year(self, year: int, tushare_pro=None) -> List[str]:
+        """
+        按 永久缓存 → 本地日历文件 → 富途API → tushare 的顺序获取某年交易日
+
+        Args:
+            year: 年份
+            tushare_pro: tushare pro接口实例
+
+        Returns:
+            List[str]: 交易日列表 (YYYYMMDD格式)，获取失败返回空列表
+        """
+        cached_calendar = self.cache.get_permanent_cache("trading_cal", str(year))
+        if cached_calendar:
+            logger.debug(f"从缓存获取{year}年交易日历")
+            return cached_calendar
+
+        for source, loader in (("本地日历文件", self._load_from_file),
+                               ("富途API", self._load_from_futu),
+                               ("tushare", lambda y: self._load_from_tushare(y, tushare_pro))):
+            try:
+                trading_days = loader(year)
+            except Exception as e:
+                logger.warning(f"从{source}获取{year}年交易日历失败: {e}")
+                continue
+
+            if trading_days:
+                trading_days = sorted(trading_days)
+                self.cache.set_permanent_cache("trading_cal", str(year), trading_days)
+                logger.info(f"从{source}获取{year}年交易日历成功，共{len(trading_days)}个交易日")
+                return trading_days
+
+        logger.warning(f"无法获取{year}年交易日历")
+        return []
+
+    def _load_from_file(self, year: int) -> List[str]:
+        """从本地交易日历文件读取某年交易日"""
+        if self._file_calendar is None:
+            if not os.path.exists(self.calendar_file):
+                self._file_calendar = {}
+            else:
+                with open(self.calendar_file, 'r', encoding='utf-8') as f:
+                    self._file_calendar = json.load(f)
+        return list(self._file_calendar.get(str(year), []))
+
+    def _load_from_futu(self, year: int) -> List[str]:
+        """使用富途API获取某年A股交易日"""
+        if self.quote_ctx_provider is None:
+            return []
+
+        ret, data = self.quote_ctx_provider().request_trading_days(
+            market=ft.TradeDateMarket.CN,
+            start=f"{year}-01-01",
+            end=f"{year}-12-31"
+        )
+        if ret != ft.RET_OK:
+            raise RuntimeError(data)
+        return [item['time'].replace('-', '') for item in data]
+
+    @staticmethod
+    def _load_from_tushare(year: int, tushare_pro) -> List[str]:
+        """使用tushare获取某年上交所交易日"""
+        if not tushare_pro:
+            return []
+
+        df = tushare_pro.trade_cal(
+            exchange='SSE',
+            start_date=f"{year}0101",
+            end_date=f"{year}1231",
+            is_open='1'
+        )
+        return df['cal_date'].tolist() if not df.empty else []
+
+    def is_available(self, year: Optional[int] = None, tushare_pro=None) -> bool:
+        """
+        交易日历是否可用
+
+        Args:
+            year: 年份，默认当前年份
+            tushare_pro: tushare pro接口实例
+
+        Returns:
+            bool: 该年份交易日是否已加载
+        """
+        return self._ensure_year(year or datetime.now().year, tushare_pro)
+
+    def is_trading_day(self, date: str) -> Optional[bool]:
+        """
+        判断是否为交易日
+
+        Args:
+            date: 日期 (YYYYMMDD格式)
+
+        Returns:
+            bool: 是否为交易日；该年份日历不可用时返回None
+        """
+        if not self._ensure_year(int(date[:4])):
+            return None
+        i = bisect.bisect_left(self._days, date)
+        return i < len(self._days) and self._days[i] == date
+
+    def previous(self, date: str) -> Optional[str]:
+        """
+        获取指定日期之前（不含当日）的最近交易日
+
+        Args:
+            date: 日期 (YYYYMMDD格式)
+
+        Returns:
+            str: 上一个交易日；日历不可用时返回None
+        """
+        year = int(date[:4])
+        while year >= MIN_CALENDAR_YEAR:
+            if not self._ensure_year(year):
+                return None
+            i = bisect.bisect_left(self._days, date)
+            if i > 0 and self._days[i - 1][:4] == str(year):
+                return self._days[i - 1]
+            # 当年在该日期之前没有交易日，继续加载上一年
+            year -= 1
+        return None
+
+    def next(self, date: str) -> Optional[str]:
+        """
+        获取指定日期之后（不含当日）的最近交易日
+
+        Args:
+            date: 日期 (YYYYMMDD格式)
+
+        Returns:
+            str: 下一个交易日；日历不可用时返回None
+        """
+        year = int(date[:4])
+        while year <= datetime.now().year + MAX_CALENDAR_YEAR_AHEAD:
+            if not self._ensure_year(year):
+                return None
+            i = bisect.bisect_right(self._days, date)
+            if i < len(self._days) and self._days[i][:4] == str(year):
+                return self._days[i]
+            # 当年在该日期之后没有交易日，继续加载下一年
+            year += 1
+        return None
+
+    def between(self, start_date: str, end_date: str) -> Optional[List[str]]:
+        """
+        获取区间内（含首尾）的所有交易日
+
+        Args:
+            start_date: 开始日期 (YYYYMMDD格式)
+            end_date: 结束日期 (YYYYMMDD格式)
+
+        Returns:
+            List[str]: 交易日列表；区间内任一年份日历不可用时返回None
+        """
+        for year in range(int(start_date[:4]), int(end_date[:4]) + 1):
+            if not self._ensure_year(year):
+                return None
+        days = self._days
+        lo = bisect.bisect_left(days, start_date)
+        hi = bisect.bisect_right(days, end_date)
+        return days[lo:hi]
+
+    def get_info(self) -> Dict:
+        """获取交易日历状态信息"""
+        return {
+            'loaded_years': sorted(self._loaded_years),
+            'trading_days': len(self._days),
+        }
@@ -4,7 +4,7 @@
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 import pandas as pd
 
 class AlgorithmInterface(ABC):
@@ -44,23 +44,46 @@ class DataInterface(ABC):
         """获取最新价格"""
         pass
 
+class AsyncDataInterface(ABC):
+    """异步数据服务接口（方法同DataInterface，均为协程）"""
+    
+    @abstractmethod
+    async def get_etf_basic_info(self, etf_code: str) -> Dict:
+        """获取ETF基础信息"""
+        pass
+    
+    @abstractmethod
+    async def get_historical_data(self, etf_code: str, days: int) -> pd.DataFrame:
+        """获取历史数据"""
+        pass
+    
+    @abstractmethod
+    async def get_latest_price(self, etf_code: str) -> Dict:
+        """获取最新价格"""
+        pass
+
 class CacheInterface(ABC):
-    """缓存服务接口"""
+    """缓存服务接口（值为可JSON序列化的数据）"""
     
     @abstractmethod
-    def get(self, key: str) -> Optional[str]:
-        """获取缓存数据"""
+    def get(self, key: str) -> Optional[Any]:
+        """获取缓存数据，不存在或已过期时返回None"""
         pass
     
     @abstractmethod
-    def set(self, key: str, value: str, expire: int = 3600) -> bool:
-        """设置缓存数据"""
+    def set(self, key: str, value: Any, expire: int = 3600) -> bool:
+        """设置缓存数据，expire为有效期(秒)，0表示不过期"""
         pass
     
     @abstractmethod
     def delete(self, key: str) -> bool:
         """删除缓存数据"""
         pass
+    
+    @abstractmethod
+    def keys(self, prefix: str) -> List[str]:
+        """列出以prefix开头的未过期缓存键"""
+        pass
 
 class ServiceContainer:
     """服务容器 - 实现依赖注入"""
@@ -147,6 +170,7 @@ service_container = ServiceContainer()
 __all__ = [
     'AlgorithmInterface',
     'DataInterface',
+    'AsyncDataInterface',
     'CacheInterface',
     'ServiceContainer',
     'service_container'
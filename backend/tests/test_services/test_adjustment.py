@@ -0,0 +1,132 @@
+"""
+复权计算单元测试
+测试前复权/后复权的仿射因子组合、除权日的涨跌幅，以及公司行为只刷新复权因子不重新下载K线
+"""
+
+import tempfile
+import shutil
+import numpy as np
+import pandas as pd
+import futu as ft
+from services.data.adjustment import apply_adjustment, rehab_to_factors
+from services.data.bar_store import BAR_COLUMNS, derive_price_fields
+from services.data.futu_client import futuClient
+
+
+def make_raw_bars(close) -> pd.DataFrame:
+    """创建测试用不复权日线（2024-01-01起的工作日）"""
+    close = np.asarray(close, dtype=float)
+    df = pd.DataFrame({
+        'ts_code': '510300',
+        'trade_date': pd.bdate_range('2024-01-01', periods=len(close)),
+        'open': close, 'high': close + 0.1, 'low': close - 0.1, 'close': close,
+        'vol': np.full(len(close), 1000, dtype=np.int64), 'amount': close * 1000,
+    })
+    for column in ['pre_close', 'change', 'pct_chg', 'amplitude']:
+        df[column] = 0.0
+    return derive_price_fields(df[BAR_COLUMNS])
+
+
+def make_rehab(rows) -> pd.DataFrame:
+    """创建get_rehab格式的复权信息，rows元素为(除权日, 前复权A, 前复权B, 后复权A, 后复权B)"""
+    return pd.DataFrame(rows, columns=['ex_div_date', 'forward_adj_factorA', 'forward_adj_factorB',
+                                       'backward_adj_factorA', 'backward_adj_factorB'])
+
+
+class TestApplyAdjustment:
+    """复权计算测试类"""
+
+    def test_cash_dividend_forward_and_backward(self):
+        """测试现金分红：前复权下调除权日之前的价格，后复权上调除权日及之后的价格"""
+        raw = make_raw_bars([4.0, 4.0, 3.9, 3.9])
+        factors = rehab_to_factors(make_rehab([('2024-01-03', 1.0, -0.1, 1.0, 0.1)]))
+
+        qfq = apply_adjustment(raw, factors, 'qfq')
+        assert np.allclose(qfq['close'], [3.9, 3.9, 3.9, 3.9])
+        # 除权日的前收盘价按除权前一日的因子复权，涨跌幅不含分红造成的价格缺口
+        assert np.allclose(qfq['pct_chg'], 0.0)
+
+        hfq = apply_adjustment(raw, factors, 'hfq')
+        assert np.allclose(hfq['close'], [4.0, 4.0, 4.0, 4.0])
+        assert np.allclose(raw['close'], [4.0, 4.0, 3.9, 3.9])
+
+    def test_split_then_dividend_composes_in_order(self):
+        """测试先拆分后分红时按时间顺序组合因子"""
+        raw = make_raw_bars([8.0, 4.0, 3.9])
+        factors = rehab_to_factors(make_rehab([
+            ('2024-01-03', 1.0, -0.1, 1.0, 0.1),
+            ('2024-01-02', 0.5, 0.0, 2.0, 0.0),
+        ]))
+
+        qfq = apply_adjustment(raw, factors, 'qfq')
+        assert np.allclose(qfq['close'], [3.9, 3.9, 3.9])
+        hfq = apply_adjustment(raw, factors, 'hfq')
+        assert np.allclose(hfq['close'], [8.0, 8.0, 8.0])
+
+    def test_no_factors_returns_input(self):
+        """测试没有除权除息或不复权时直接返回原数据"""
+        raw = make_raw_bars([4.0, 4.1])
+        assert apply_adjustment(raw, [], 'qfq') is raw
+        assert apply_adjustment(raw, rehab_to_factors(make_rehab([('2024-01-02', 1.0, -0.1, 1.0, 0.1)])),
+                                'none') is raw
+
+
+class FakeRehabContext:
+    """模拟的富途行情连接，返回不复权日线和可修改的复权因子"""
+
+    def __init__(self, close):
+        self.close = close
+        self.rehab = make_rehab([])
+        self.kline_requests = []
+        self.rehab_requests = 0
+
+    def request_history_kline(self, code, start, end, ktype, autype, max_count, page_req_key):
+        self.kline_requests.append(autype)
+        dates = pd.bdate_range('2024-01-01', periods=len(self.close))
+        return ft.RET_OK, pd.DataFrame({
+            'time_key': dates.strftime('%Y-%m-%d 00:00:00'),
+            'open': self.close, 'high': self.close, 'low': self.close, 'close': self.close,
+            'volume': [1000] * len(self.close), 'turnover': [3000.0] * len(self.close),
+        }), None
+
+    def get_rehab(self, code):
+        self.rehab_requests += 1
+        return ft.RET_OK, self.rehab
+
+
+class TestAdjustedDailyData:
+    """读取时复权测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.cache_dir = tempfile.mkdtemp()
+        self.client = futuClient(cache_dir=self.cache_dir)
+        self.ctx = FakeRehabContext([4.0, 4.0, 3.9, 3.9])
+        self.client.quote_context_manager.get = lambda: self.ctx
+        self.latest = '20240104'
+        self.client.trading_date_manager.get_latest_trading_date = lambda tushare_pro: self.latest
+
+    def teardown_method(self):
+        """测试后清理（连接管理器为进程级共享实例，需恢复）"""
+        vars(self.client.quote_context_manager).pop('get', None)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_corporate_action_only_refreshes_factors(self):
+        """测试新增除权除息后只刷新复权因子，历史K线不重新下载"""
+        df = self.client.get_etf_daily_data('510300', '20240101', '20240104')
+        assert self.ctx.kline_requests == [ft.AuType.NONE]
+        assert list(df['close']) == [4.0, 4.0, 3.9, 3.9]
+
+        # 同一交易日内复权因子只获取一次
+        self.client.get_etf_daily_data('510300', '20240101', '20240104')
+        assert self.ctx.rehab_requests == 1
+
+        self.ctx.rehab = make_rehab([('2024-01-03', 1.0, -0.1, 1.0, 0.1)])
+        self.latest = '20240105'
+        df = self.client.get_etf_daily_data('510300', '20240101', '20240104')
+
+        assert np.allclose(df['close'], [3.9, 3.9, 3.9, 3.9])
+        assert self.ctx.rehab_requests == 2
+        assert self.ctx.kline_requests == [ft.AuType.NONE]
+        raw = self.client.get_etf_daily_data('510300', '20240101', '20240104', adj='none')
+        assert list(raw['close']) == [4.0, 4.0, 3.9, 3.9]
@@ -0,0 +1,82 @@
+"""
+异步数据客户端单元测试
+测试按接口类别限制并发、多只ETF并发获取和取消
+"""
+
+import asyncio
+import threading
+import time
+import pytest
+from services.data.async_futu_client import AsyncFutuClient
+
+
+class SlowClient:
+    """模拟的同步数据客户端，每次调用耗时固定并记录最大并发数"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def _enter(self):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+
+    def get_latest_price(self, etf_code):
+        self._enter()
+        return {'current_price': 1.0, 'code': etf_code}
+
+    def get_etf_daily_data(self, etf_code, start_date, end_date):
+        self._enter()
+        return etf_code
+
+    def get_etf_basic_info(self, etf_code):
+        self._enter()
+        return {'ts_code': etf_code}
+
+
+class TestAsyncFutuClient:
+    """异步数据客户端测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.slow = SlowClient()
+        self.client = AsyncFutuClient(self.slow, concurrency={'snapshot': 3, 'kline': 1, 'basic': 1})
+
+    def teardown_method(self):
+        """测试后清理"""
+        self.client.close()
+
+    def test_overlaps_requests_within_endpoint_limit(self):
+        """测试同类接口的请求按并发上限重叠执行"""
+        codes = [f'51030{i}' for i in range(6)]
+
+        start = time.time()
+        results = self.client.run(self.client.map(self.client.get_latest_price, codes))
+        elapsed = time.time() - start
+
+        assert [results[code]['code'] for code in codes] == codes
+        assert self.slow.max_active == 3
+        assert elapsed < 6 * self.slow.delay
+
+    def test_bundle_overlaps_endpoints(self):
+        """测试不同类接口互不占用并发名额"""
+        bundle = self.client.run(self.client.get_etf_bundle('510300'))
+
+        assert bundle['history'] == '510300'
+        assert bundle['basic_info'] == {'ts_code': '510300'}
+        assert self.slow.max_active == 3
+
+    def test_timeout_cancels_and_releases_slots(self):
+        """测试超时后取消未完成的请求，同一客户端可继续使用"""
+        self.slow.delay = 0.2
+        with pytest.raises(asyncio.TimeoutError):
+            self.client.run(self.client.map(self.client.get_historical_data, ['510300', '510500']), timeout=0.05)
+
+        self.slow.delay = 0.01
+        assert self.client.run(self.client.get_historical_data('159915')) == '159915'
@@ -0,0 +1,152 @@
+"""
+日线列式存储单元测试
+测试BarStore的读写、窗口切片、类型保持和区间合并
+"""
+
+import os
+import tempfile
+import shutil
+import numpy as np
+import pandas as pd
+from services.data.bar_store import BarStore, BAR_COLUMNS
+
+
+def make_bars(etf_code: str, start: str, days: int) -> pd.DataFrame:
+    """创建测试用日线数据"""
+    dates = pd.bdate_range(start=start, periods=days)
+    close = np.linspace(3.0, 3.0 + days * 0.01, days)
+    df = pd.DataFrame({
+        'ts_code': etf_code,
+        'trade_date': dates,
+        'open': close - 0.01,
+        'high': close + 0.02,
+        'low': close - 0.02,
+        'close': close,
+        'vol': np.arange(days, dtype=np.int64) * 100 + 1000,
+        'amount': close * 1000.0,
+    })
+    df['pre_close'] = df['close'].shift(1).fillna(df['open'])
+    df['change'] = df['close'] - df['pre_close']
+    df['pct_chg'] = df['change'] / df['pre_close'] * 100
+    df['amplitude'] = (df['high'] - df['low']) / df['pre_close'] * 100
+    return df[BAR_COLUMNS]
+
+
+class TestBarStore:
+    """列式存储测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.store_dir = tempfile.mkdtemp()
+        self.store = BarStore(self.store_dir)
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.store_dir, ignore_errors=True)
+
+    def test_round_trip_keeps_values_and_dtypes(self):
+        """测试写入后读取的数据和类型保持一致"""
+        df = make_bars('510300', '2024-01-01', 30)
+        self.store.merge('510300', '20240101', '20240209', df)
+
+        result = self.store.read('510300', '20240101', '20240209')
+
+        assert result is not None
+        assert list(result.columns) == BAR_COLUMNS
+        assert result['trade_date'].dtype == 'datetime64[ns]'
+        assert result['vol'].dtype == np.int64
+        assert result['close'].dtype == np.float64
+        pd.testing.assert_frame_equal(result, df.reset_index(drop=True), check_dtype=False)
+
+    def test_read_slices_window(self):
+        """测试按日期窗口切片"""
+        df = make_bars('510300', '2024-01-01', 30)
+        self.store.merge('510300', '20240101', '20240209', df)
+
+        result = self.store.read('510300', '20240108', '20240112')
+
+        assert len(result) == 5
+        assert result['trade_date'].iloc[0] == pd.Timestamp('2024-01-08')
+        assert result['trade_date'].iloc[-1] == pd.Timestamp('2024-01-12')
+
+    def test_read_outside_coverage_misses(self):
+        """测试超出缓存覆盖范围的窗口视为未命中"""
+        df = make_bars('510300', '2024-01-01', 30)
+        self.store.merge('510300', '20240101', '20240209', df)
+
+        assert self.store.read('510300', '20231201', '20240209') is None
+        assert self.store.read('510300', '20240101', '20240301') is None
+        assert self.store.read('159915', '20240101', '20240209') is None
+
+    def test_corrupt_file_is_removed(self):
+        """测试损坏的存储文件被删除并视为未命中"""
+        bar_file = os.path.join(self.store_dir, '510300.npz')
+        with open(bar_file, 'wb') as f:
+            f.write(b'not a npz file')
+
+        assert self.store.read('510300', '20240101', '20240209') is None
+        assert not os.path.exists(bar_file)
+
+
+class TestBarStoreMerge:
+    """区间合并测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.store_dir = tempfile.mkdtemp()
+        self.store = BarStore(self.store_dir)
+        self.bars = make_bars('510300', '2024-01-01', 60)
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.store_dir, ignore_errors=True)
+
+    def _window(self, start: str, end: str) -> pd.DataFrame:
+        """截取测试数据的日期窗口"""
+        dates = self.bars['trade_date']
+        return self.bars[(dates >= pd.Timestamp(start)) & (dates <= pd.Timestamp(end))]
+
+    def test_missing_ranges_without_cache(self):
+        """测试无缓存时整个窗口缺失"""
+        assert self.store.missing_ranges('510300', '20240101', '20240131') == [('20240101', '20240131')]
+
+    def test_missing_ranges_head_tail_and_gap(self):
+        """测试头部、尾部和中间缺口的计算"""
+        self.store.merge('510300', '20240110', '20240119', self._window('20240110', '20240119'))
+        self.store.merge('510300', '20240201', '20240210', self._window('20240201', '20240210'))
+
+        assert self.store.missing_ranges('510300', '20240101', '20240229') == [
+            ('20240101', '20240109'),
+            ('20240120', '20240131'),
+            ('20240211', '20240229'),
+        ]
+        assert self.store.missing_ranges('510300', '20240111', '20240118') == []
+
+    def test_merge_fills_gap_and_joins_coverage(self):
+        """测试补齐缺口后覆盖区间合并为一段"""
+        self.store.merge('510300', '20240101', '20240115', self._window('20240101', '20240115'))
+        assert self.store.read('510300', '20240101', '20240131') is None
+
+        self.store.merge('510300', '20240116', '20240131', self._window('20240116', '20240131'))
+
+        assert self.store.get_coverage('510300') == [('20240101', '20240131')]
+        result = self.store.read('510300', '20240101', '20240131')
+        expected = self._window('20240101', '20240131').reset_index(drop=True)
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+    def test_merge_recomputes_pre_close_across_boundary(self):
+        """测试合并后跨区间边界的前收盘价使用上一交易日收盘价"""
+        tail = self._window('20240116', '20240131').copy()
+        tail['pre_close'] = tail['open']
+        self.store.merge('510300', '20240101', '20240115', self._window('20240101', '20240115'))
+        self.store.merge('510300', '20240116', '20240131', tail)
+
+        result = self.store.read('510300', '20240115', '20240116')
+        assert result['pre_close'].iloc[1] == result['close'].iloc[0]
+
+    def test_empty_merge_records_coverage(self):
+        """测试空数据也记录为已覆盖（如节假日）"""
+        self.store.merge('510300', '20240210', '20240217', pd.DataFrame(columns=BAR_COLUMNS))
+
+        assert self.store.missing_ranges('510300', '20240210', '20240217') == []
+        assert len(self.store.read('510300', '20240210', '20240217')) == 0
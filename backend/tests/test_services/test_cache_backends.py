@@ -0,0 +1,153 @@
+"""
+缓存后端单元测试
+测试memory、file、sqlite三种后端的读写、删除、前缀列举和过期处理，以及EnhancedCache切换后端
+"""
+
+import os
+import time
+import tempfile
+import shutil
+import pytest
+from services.data.cache_backends import create_cache_backend, SQLiteCacheBackend
+from services.data.cache_file import KeyLocks
+from services.data.cache_manifest import CacheManifest
+from services.data.cache_service import EnhancedCache
+
+
+@pytest.fixture(params=['memory', 'file', 'sqlite'])
+def backend(request):
+    """各种缓存后端"""
+    cache_dir = tempfile.mkdtemp()
+    yield create_cache_backend(request.param, cache_dir, KeyLocks(os.path.join(cache_dir, 'locks')),
+                               CacheManifest(cache_dir))
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+class TestCacheBackends:
+    """缓存后端测试类"""
+
+    def test_set_get_delete(self, backend):
+        """测试读写和删除"""
+        assert backend.set('permanent:etf_basic:510300', {'name': '沪深300ETF'}, expire=0)
+        assert backend.get('permanent:etf_basic:510300') == {'name': '沪深300ETF'}
+        assert backend.get('permanent:etf_basic:512880') is None
+
+        assert backend.delete('permanent:etf_basic:510300')
+        assert backend.get('permanent:etf_basic:510300') is None
+        assert not backend.delete('permanent:etf_basic:510300')
+
+    def test_keys_by_prefix(self, backend):
+        """测试按前缀列举某交易日某类型的键"""
+        for code in ['510300', '512880']:
+            backend.set(f'daily:20240105:price:{code}', {'current_price': 1.0})
+        backend.set('daily:20240105:name:510300', {'name': '沪深300ETF'})
+        backend.set('daily:20240104:price:588000', {'current_price': 1.0})
+
+        assert backend.keys('daily:20240105:price:') == ['daily:20240105:price:510300',
+                                                         'daily:20240105:price:512880']
+
+    def test_expired_entries_hidden(self, backend):
+        """测试过期条目不再返回"""
+        backend.set('daily:20240105:price:510300', {'current_price': 1.0}, expire=1)
+        backend.set('daily:20240105:price:512880', {'current_price': 2.0}, expire=0)
+        time.sleep(1.1)
+
+        assert backend.get('daily:20240105:price:510300') is None
+        assert backend.keys('daily:20240105:price:') == ['daily:20240105:price:512880']
+
+    def test_purge_expired_removes_only_expired(self, backend):
+        """测试清理过期条目（如不存在记录），不过期和未到期的条目保留"""
+        backend.set('permanent:missing_security:999999', {'missing': True}, expire=60)
+        backend.set('daily:20240105:price:510300', {'current_price': 1.0}, expire=3600)
+        backend.set('permanent:etf_basic:510300', {'name': '沪深300ETF'}, expire=0)
+
+        assert backend.purge_expired(time.time() + 120) == 1
+        assert backend.purge_expired(time.time() + 120) == 0
+        assert backend.get('permanent:etf_basic:510300') == {'name': '沪深300ETF'}
+        assert backend.get('daily:20240105:price:510300') == {'current_price': 1.0}
+
+
+class TestSQLiteCacheBackend:
+    """SQLite后端测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.cache_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.cache_dir, 'cache.db')
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_purge_expired_uses_ttl(self):
+        """测试按过期时间清理条目"""
+        backend = SQLiteCacheBackend(self.db_path)
+        backend.set('daily:20240105:price:510300', {'current_price': 1.0}, expire=60)
+        backend.set('permanent:etf_basic:510300', {'name': '沪深300ETF'}, expire=0)
+
+        assert backend.purge_expired(time.time() + 120) == 1
+        assert backend.get_stats()['entries'] == 1
+
+    def test_size_limit_evicts_oldest_daily_entries_first(self):
+        """测试超出容量上限时先淘汰最早交易日的条目，不过期的永久条目保留"""
+        backend = SQLiteCacheBackend(self.db_path, max_mb=None)
+        backend.set('permanent:etf_basic:510300', {'name': '沪深300ETF'}, expire=0)
+        for date in ['20240103', '20240104', '20240105']:
+            for i in range(50):
+                backend.set(f'daily:{date}:price:{i:06d}', {'pad': 'x' * 2000}, expire=3600)
+
+        backend.max_mb = (backend._used_bytes() - 150 * 1024) / 1024 / 1024
+        evicted = backend.purge_expired()
+
+        assert 50 <= evicted < 100
+        assert backend.keys('daily:20240103:price:') == []
+        assert len(backend.keys('daily:20240105:price:')) == 50
+        assert backend.get('permanent:etf_basic:510300') == {'name': '沪深300ETF'}
+        assert backend._used_bytes() <= backend.max_mb * 1024 * 1024
+
+    def test_entries_shared_between_instances(self):
+        """测试不同实例（进程）共享同一个数据库"""
+        SQLiteCacheBackend(self.db_path).set('permanent:etf_basic:510300', {'name': '沪深300ETF'}, expire=0)
+        assert SQLiteCacheBackend(self.db_path).get('permanent:etf_basic:510300') == {'name': '沪深300ETF'}
+
+    def test_keys_and_stats_degrade_on_database_error(self):
+        """测试数据库出错时列出键返回空列表，统计返回降级结果"""
+        backend = SQLiteCacheBackend(self.db_path)
+        backend.set('permanent:etf_basic:510300', {'name': '沪深300ETF'}, expire=0)
+        with backend._db.connect() as conn:
+            conn.execute("DROP TABLE cache_entries")
+
+        assert backend.keys('permanent:') == []
+        stats = backend.get_stats()
+        assert stats['entries'] is None
+        assert 'error' in stats
+
+
+class TestEnhancedCacheBackend:
+    """EnhancedCache后端选择测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.cache_dir = tempfile.mkdtemp()
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_sqlite_backend_round_trip(self):
+        """测试sqlite后端不再写入每个条目的JSON文件"""
+        cache = EnhancedCache(self.cache_dir, backend='sqlite')
+        cache.set_permanent_cache('etf_basic', '510300', {'name': '沪深300ETF'})
+        cache.set_daily_cache('20240105', 'price', '510300', {'current_price': 3.9})
+
+        other = EnhancedCache(self.cache_dir, backend='sqlite')
+        assert other.get_permanent_cache('etf_basic', '510300') == {'name': '沪深300ETF'}
+        assert other.get_daily_cache('20240105', 'price', '510300') == {'current_price': 3.9}
+        assert other.list_daily_keys('20240105', 'price') == ['510300']
+        assert os.listdir(os.path.join(self.cache_dir, 'permanent')) == []
+        assert other.get_cache_info()['backend']['entries'] == 2
+
+    def test_unknown_backend_rejected(self):
+        """测试不支持的后端名称"""
+        with pytest.raises(ValueError):
+            EnhancedCache(self.cache_dir, backend='redis')
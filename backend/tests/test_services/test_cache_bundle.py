@@ -0,0 +1,107 @@
+"""
+缓存包文件单元测试
+测试追加写入、按键读取、跨实例可见性、不完整尾部的处理、重写以及bundle存储方式
+"""
+
+import os
+import tempfile
+import shutil
+import pandas as pd
+from services.data import cache_bundle
+from services.data.cache_bundle import CacheBundle, decode_value, encode_value
+from services.data.cache_file import KeyLocks
+from services.data.cache_service import EnhancedCache
+from services.data.cache_backends import BUNDLE_FILE_NAME
+
+
+class TestCacheBundle:
+    """包文件测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.cache_dir = tempfile.mkdtemp()
+        self.locks = KeyLocks(os.path.join(self.cache_dir, 'locks'))
+        self.path = os.path.join(self.cache_dir, 'daily', '20240105', BUNDLE_FILE_NAME)
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_encode_round_trip_and_plain_values(self):
+        """测试二进制编码往返，非基本类型按字符串保存"""
+        codec, payload = encode_value({'price': 3.9, 'date': pd.Timestamp('2024-01-05'), 'tags': ('a', 'b')})
+        assert decode_value(codec, payload) == {'price': 3.9, 'date': '2024-01-05 00:00:00', 'tags': ['a', 'b']}
+
+    def test_latest_record_wins_and_visible_to_other_instances(self):
+        """测试同一键的新记录覆盖旧记录，其他实例增量读到新记录"""
+        writer = CacheBundle(self.path, self.locks)
+        reader = CacheBundle(self.path, self.locks)
+        writer.set('price:510300', {'current_price': 1.0})
+        assert reader.get('price:510300') == {'current_price': 1.0}
+
+        writer.set('price:510300', {'current_price': 2.0})
+        writer.set('price:512880', {'current_price': 3.0})
+        assert reader.get('price:510300') == {'current_price': 2.0}
+        assert sorted(reader.keys('price:')) == ['price:510300', 'price:512880']
+        assert reader.get('price:588000') is None
+
+    def test_torn_tail_ignored_and_truncated_on_next_write(self):
+        """测试写了一半的尾部记录被忽略，下次写入时截断"""
+        bundle = CacheBundle(self.path, self.locks)
+        bundle.set('price:510300', {'current_price': 1.0})
+        size = os.path.getsize(self.path)
+        with open(self.path, 'ab') as f:
+            f.write(b'\x00\x01\x02')
+
+        reader = CacheBundle(self.path, self.locks)
+        assert reader.get('price:510300') == {'current_price': 1.0}
+        reader.set('price:512880', {'current_price': 3.0})
+
+        fresh = CacheBundle(self.path, self.locks)
+        assert fresh.get('price:512880') == {'current_price': 3.0}
+        assert os.path.getsize(self.path) > size
+
+    def test_compaction_keeps_latest_records(self, monkeypatch):
+        """测试失效记录过多时重写包文件，只保留最新记录"""
+        monkeypatch.setattr(cache_bundle, 'COMPACT_MIN_BYTES', 1024)
+        bundle = CacheBundle(self.path, self.locks)
+        reader = CacheBundle(self.path, self.locks)
+        for i in range(100):
+            bundle.set('price:510300', {'current_price': float(i), 'pad': 'x' * 50})
+        bundle.set('price:512880', {'current_price': 3.0})
+
+        assert os.path.getsize(self.path) < 100 * 50
+        assert reader.get('price:510300')['current_price'] == 99.0
+        assert reader.get('price:512880') == {'current_price': 3.0}
+
+
+class TestBundleLayout:
+    """bundle存储方式测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = EnhancedCache(self.cache_dir, storage_layout='bundle')
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_daily_entries_share_one_file(self):
+        """测试同一交易日的条目写入同一个包文件"""
+        for code in ['510300', '512880', '588000']:
+            self.cache.set_daily_cache('20240105', 'price', code, {'current_price': 1.0})
+        self.cache.set_daily_cache('20240105', 'name', '510300', {'name': '沪深300ETF'})
+
+        assert os.listdir(os.path.join(self.cache_dir, 'daily', '20240105')) == [BUNDLE_FILE_NAME]
+        assert self.cache.list_daily_keys('20240105', 'price') == ['510300', '512880', '588000']
+        assert self.cache.manifest.get_totals()['daily']['file_count'] == 1
+
+        other = EnhancedCache(self.cache_dir, storage_layout='bundle')
+        assert other.get_daily_cache('20240105', 'price', '512880') == {'current_price': 1.0}
+        assert other.get_daily_cache('20240105', 'name', '510300') == {'name': '沪深300ETF'}
+
+    def test_json_files_still_readable_after_switch(self):
+        """测试切换到bundle方式后，原有的JSON缓存文件仍可读取"""
+        EnhancedCache(self.cache_dir).set_permanent_cache('etf_basic', '510300', {'name': '沪深300ETF'})
+        assert self.cache.get_permanent_cache('etf_basic', '510300') == {'name': '沪深300ETF'}
@@ -0,0 +1,114 @@
+"""
+缓存文件原子写入与校验单元测试
+测试校验头、损坏文件的处理以及多进程并发写入同一缓存键
+"""
+
+import os
+import json
+import multiprocessing
+import tempfile
+import shutil
+import pytest
+from services.data.cache_service import EnhancedCache
+from services.data.cache_file import (
+    CacheEntryCorrupt, KeyLocks, decode_entry, encode_entry, read_entry
+)
+from services.data.bar_store import BarStore
+
+
+def _write_prices(cache_dir, worker, rounds):
+    """子进程中反复覆盖同一缓存键"""
+    cache = EnhancedCache(cache_dir)
+    for i in range(rounds):
+        cache.set_daily_cache('20240105', 'price', '510300', {'worker': worker, 'round': i, 'pad': 'x' * 4096})
+
+
+def _merge_bars(store_dir, lock_dir, start_date, end_date):
+    """子进程中合并一段日线"""
+    store = BarStore(store_dir, KeyLocks(lock_dir))
+    for _ in range(10):
+        store.merge('510300', start_date, end_date, None)
+
+
+class TestCacheEntry:
+    """缓存文件编码测试类"""
+
+    def test_round_trip(self):
+        """测试编码后解码得到原数据"""
+        data = {'name': '沪深300ETF', 'price': 3.912}
+        assert decode_entry(encode_entry(data)) == data
+
+    def test_truncated_entry_rejected(self):
+        """测试写了一半的文件校验失败"""
+        raw = encode_entry({'pad': 'x' * 100})
+        with pytest.raises(CacheEntryCorrupt):
+            decode_entry(raw[:-10])
+
+    def test_checksum_mismatch_rejected(self):
+        """测试正文被篡改时校验失败"""
+        raw = encode_entry({'price': 3.912})
+        with pytest.raises(CacheEntryCorrupt):
+            decode_entry(raw.replace(b'3.912', b'3.913'))
+
+    def test_legacy_json_accepted(self):
+        """测试兼容没有校验头的旧版缓存文件"""
+        assert decode_entry(json.dumps({'price': 1.0}, indent=2).encode('utf-8')) == {'price': 1.0}
+
+
+class TestAtomicCacheWrites:
+    """缓存原子写入测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = EnhancedCache(self.cache_dir)
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_corrupt_file_removed(self):
+        """测试校验失败的缓存文件被删除并视为未命中"""
+        self.cache.set_daily_cache('20240105', 'price', '510300', {'current_price': 1.0})
+        cache_file = os.path.join(self.cache_dir, 'daily', '20240105', 'price_510300.json')
+        with open(cache_file, 'rb') as f:
+            raw = f.read()
+        with open(cache_file, 'wb') as f:
+            f.write(raw[:-3])
+
+        self.cache.memory.purge(lambda key: True)
+        assert self.cache.get_daily_cache('20240105', 'price', '510300') is None
+        assert not os.path.exists(cache_file)
+
+    def test_concurrent_writers_never_expose_partial_file(self):
+        """测试多个进程并发覆盖同一缓存键时读取方总是读到完整文件"""
+        ctx = multiprocessing.get_context('fork')
+        processes = [ctx.Process(target=_write_prices, args=(self.cache_dir, worker, 50)) for worker in range(3)]
+        for process in processes:
+            process.start()
+
+        cache_file = os.path.join(self.cache_dir, 'daily', '20240105', 'price_510300.json')
+        while any(process.is_alive() for process in processes):
+            try:
+                assert 'worker' in read_entry(cache_file)
+            except FileNotFoundError:
+                pass
+        for process in processes:
+            process.join()
+
+        assert read_entry(cache_file)['round'] == 49
+        assert [name for name in os.listdir(os.path.dirname(cache_file)) if name.endswith('.tmp')] == []
+
+    def test_concurrent_bar_merges_keep_all_coverage(self):
+        """测试多个进程并发合并同一ETF时不丢失其他进程写入的覆盖区间"""
+        store_dir = os.path.join(self.cache_dir, 'bars')
+        lock_dir = os.path.join(self.cache_dir, 'locks')
+        ranges = [('20240101', '20240110'), ('20240201', '20240210'), ('20240301', '20240310')]
+        ctx = multiprocessing.get_context('fork')
+        processes = [ctx.Process(target=_merge_bars, args=(store_dir, lock_dir, start, end)) for start, end in ranges]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        assert BarStore(store_dir).get_coverage('510300') == ranges
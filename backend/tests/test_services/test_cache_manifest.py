@@ -0,0 +1,156 @@
+"""
+缓存清单与自动淘汰单元测试
+测试清单汇总统计、按交易日和容量上限的淘汰以及淘汰后内存缓存和分钟行情检查点的清理
+"""
+
+import os
+import time
+import tempfile
+import threading
+import shutil
+from datetime import datetime
+import pandas as pd
+from services.data.cache_service import EnhancedCache
+from services.data.cache_manifest import CacheManifest, CacheEvictor
+from .test_minute_bar_store import make_minute_bars
+
+
+class TestCacheManifest:
+    """缓存清单测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = EnhancedCache(self.cache_dir)
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_totals_follow_writes_and_deletes(self):
+        """测试写入、覆盖和删除后汇总统计保持一致"""
+        self.cache.set_daily_cache('20240104', 'price', '510300', {'current_price': 1.0})
+        self.cache.set_daily_cache('20240105', 'price', '510300', {'current_price': 1.0})
+        self.cache.set_daily_cache('20240105', 'price', '510300', {'current_price': 1.0, 'volume': 100})
+        self.cache.set_permanent_cache('basic_info', '510300', {'name': '沪深300ETF'})
+
+        totals = self.cache.manifest.get_totals()
+        assert totals['daily']['file_count'] == 2
+        assert totals['permanent']['file_count'] == 1
+        assert totals['historical']['file_count'] == 0
+
+        daily_file = os.path.join(self.cache_dir, 'daily', '20240104', 'price_510300.json')
+        self.cache.manifest.record_delete(daily_file)
+        assert self.cache.manifest.get_totals()['daily']['file_count'] == 1
+
+        info = self.cache.get_cache_info()
+        assert info['daily']['file_count'] == 1
+        assert info['permanent']['file_count'] == 1
+
+    def test_overwrite_updates_total_size(self):
+        """测试覆盖写入后总大小按新文件大小更新"""
+        self.cache.set_daily_cache('20240105', 'price', '510300', {'current_price': 1.0})
+        self.cache.set_daily_cache('20240105', 'price', '510300', {'current_price': 1.0, 'pad': 'x' * 100000})
+
+        daily_file = os.path.join(self.cache_dir, 'daily', '20240105', 'price_510300.json')
+        with self.cache.manifest._db.connect() as conn:
+            row = conn.execute("SELECT file_count, total_bytes FROM totals WHERE tier = 'daily'").fetchone()
+        assert row == (1, os.path.getsize(daily_file))
+
+    def test_new_manifest_registers_existing_files(self):
+        """测试新建清单时登记已有的缓存文件"""
+        self.cache.set_daily_cache('20240105', 'price', '510300', {'current_price': 1.0})
+        os.remove(os.path.join(self.cache_dir, 'manifest.db'))
+
+        manifest = CacheManifest(self.cache_dir)
+        assert manifest.get_totals()['daily']['file_count'] == 1
+
+    def test_short_lived_threads_share_one_connection(self):
+        """测试大量短生命周期线程使用清单时连接数和文件句柄不增长"""
+        manifest = self.cache.manifest
+        manifest.get_totals()
+        fd_before = len(os.listdir('/proc/self/fd'))
+
+        def worker(i):
+            manifest.record_demand('20240105', f'{i:06d}')
+            manifest.flush_access()
+            manifest.get_totals()
+
+        for batch in range(0, 300, 50):
+            threads = [threading.Thread(target=worker, args=(i,)) for i in range(batch, batch + 50)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert len(os.listdir('/proc/self/fd')) <= fd_before + 5
+        assert len(manifest.get_demand(['20240105'])) == 300
+
+
+class TestCacheEvictor:
+    """缓存淘汰测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = EnhancedCache(self.cache_dir)
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_daily_tier_evicted_by_trade_date(self):
+        """测试daily层按交易日淘汰并删除空目录"""
+        for date in ['20231201', '20240105']:
+            self.cache.set_daily_cache(date, 'price', '510300', {'current_price': 1.0})
+        evictor = CacheEvictor(self.cache.manifest, {'daily': {'max_age_days': 30, 'max_mb': None}},
+                               on_evict=self.cache._on_evict)
+
+        report = evictor.run_once(datetime(2024, 1, 10).timestamp())
+
+        assert report['daily']['evicted'] == 1
+        assert not os.path.exists(os.path.join(self.cache_dir, 'daily', '20231201'))
+        assert self.cache.get_daily_cache('20240105', 'price', '510300') == {'current_price': 1.0}
+        assert self.cache.get_daily_cache('20231201', 'price', '510300') is None
+        assert self.cache.manifest.get_totals()['daily']['file_count'] == 1
+
+    def test_size_budget_evicts_least_recently_accessed(self):
+        """测试超出容量上限时按最后访问时间从旧到新淘汰"""
+        for code in ['510300', '512880', '588000']:
+            self.cache.set_permanent_cache('basic_info', code, {'name': 'x' * 1000})
+        # 访问最早写入的条目，使其成为最近使用
+        time.sleep(0.01)
+        self.cache.memory.purge(lambda key: True)
+        assert self.cache.get_permanent_cache('basic_info', '510300') is not None
+
+        one_file = os.path.getsize(os.path.join(self.cache_dir, 'permanent', 'basic_info_510300.json'))
+        budget_mb = one_file * 1.5 / 1024 / 1024
+        evictor = CacheEvictor(self.cache.manifest, {'permanent': {'max_age_days': None, 'max_mb': budget_mb}},
+                               on_evict=self.cache._on_evict)
+
+        report = evictor.run_once()
+
+        assert report['permanent']['evicted'] == 2
+        assert self.cache.get_permanent_cache('basic_info', '510300') is not None
+        assert self.cache.get_permanent_cache('basic_info', '512880') is None
+        assert self.cache.get_permanent_cache('basic_info', '588000') is None
+
+    def test_minute_partitions_evicted_and_uncovered(self):
+        """测试分钟行情分区纳入清单统计，超出容量上限淘汰后该月从检查点中移除"""
+        store = self.cache.minute_store
+        for month_days in [pd.bdate_range('2024-01-02', '2024-01-31'), pd.bdate_range('2024-02-01', '2024-02-29')]:
+            store.merge('510300', '5min', make_minute_bars('510300', month_days))
+        store.mark_covered('510300', '5min', '20240101', '20240229')
+        store.read('510300', '5min', '20240201', '20240229')
+        self.cache.manifest.flush_access()
+
+        assert self.cache.get_cache_info()['minute']['file_count'] == 2
+        one_file = os.path.getsize(store.partition_path('510300', '5min', '202402'))
+        evictor = CacheEvictor(self.cache.manifest, {'minute': {'max_age_days': None,
+                                                                'max_mb': one_file * 1.5 / 1024 / 1024}},
+                               on_evict=self.cache._on_evict)
+
+        assert evictor.run_once()['minute']['evicted'] == 1
+        assert store.list_months('510300', '5min') == ['202402']
+        assert store.get_coverage('510300', '5min') == [('20240201', '20240229')]
+        assert self.cache.manifest.get_totals()['minute']['file_count'] == 1
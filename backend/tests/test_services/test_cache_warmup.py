@@ -0,0 +1,124 @@
+"""
+收盘后缓存预热单元测试
+测试预热范围（热门+近期查询）、预热报告和调度器的触发条件
+"""
+
+import tempfile
+import shutil
+from datetime import datetime
+from services.data.cache_service import EnhancedCache
+from services.data.cache_warmup import CacheWarmer, CacheWarmupScheduler
+
+
+class FakeTradingDateManager:
+    """模拟的交易日管理器"""
+
+    market_close_time = "15:00"
+
+    def __init__(self, latest, trading_days):
+        self.latest = latest
+        self.trading_days = trading_days
+
+    def get_latest_trading_date(self, tushare_pro=None):
+        return self.latest
+
+    def get_previous_trading_date(self, date):
+        earlier = [day for day in self.trading_days if day < date]
+        return earlier[-1] if earlier else None
+
+
+class FakeClient:
+    """模拟的富途API数据客户端，记录预热调用"""
+
+    def __init__(self, cache_dir):
+        self.cache = EnhancedCache(cache_dir)
+        self.trading_date_manager = FakeTradingDateManager('20240105', ['20240103', '20240104', '20240105'])
+        self.price_requests = []
+        self.history_requests = []
+        self.failing_codes = set()
+
+    def get_latest_prices(self, codes):
+        self.price_requests.append(list(codes))
+        return {code: {'current_price': 1.0} for code in codes}
+
+    def get_etf_daily_data(self, code, start_date, end_date):
+        self.history_requests.append((code, start_date, end_date))
+        return None if code in self.failing_codes else object()
+
+    def get_etf_basic_info(self, code):
+        return {'ts_code': code}
+
+    def get_etf_name(self, code):
+        return f'ETF_{code}'
+
+
+class TestCacheWarmer:
+    """预热任务测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.cache_dir = tempfile.mkdtemp()
+        self.client = FakeClient(self.cache_dir)
+        for date, codes in [('20240103', ['512880', '588000']), ('20240104', ['512880', '159949', '159949']),
+                            ('20240105', ['512880'])]:
+            for code in codes:
+                self.client.cache.record_request(date, code)
+        # 预热自身写入的价格缓存不计入查询热度
+        self.client.cache.set_daily_cache('20240104', 'price', '515050', {'current_price': 1.0})
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_recent_codes_ranked_by_lookups(self):
+        """测试近期查询的ETF按回看交易日内的请求次数排序"""
+        warmer = CacheWarmer(self.client, ['510300'], top_n=2)
+        assert warmer.recent_codes('20240105') == ['512880', '159949']
+
+    def test_run_warms_popular_and_recent_and_reports(self):
+        """测试预热热门和近期ETF并生成报告"""
+        self.client.failing_codes = {'588000'}
+        warmer = CacheWarmer(self.client, ['510300', '512880'], top_n=10, max_workers=2)
+
+        report = warmer.run('20240105')
+
+        assert self.client.price_requests == [['510300', '512880', '159949', '588000']]
+        assert sorted(code for code, _, _ in self.client.history_requests) == ['159949', '510300', '512880', '588000']
+        assert all(end == '20240105' for _, _, end in self.client.history_requests)
+        assert report['etf_count'] == 4
+        assert report['recent_count'] == 2
+        assert report['history'] == 3
+        assert report['failed_codes'] == ['588000']
+        assert report['coverage'] == 0.75
+
+
+class TestCacheWarmupScheduler:
+    """预热调度器测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.cache_dir = tempfile.mkdtemp()
+        self.client = FakeClient(self.cache_dir)
+        self.scheduler = CacheWarmupScheduler(CacheWarmer(self.client, ['510300']), delay_minutes=10)
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_waits_until_after_close(self):
+        """测试收盘后延迟时间未到时不预热"""
+        assert self.scheduler.run_if_due(datetime(2024, 1, 5, 15, 5)) is None
+        assert self.client.price_requests == []
+
+    def test_skips_non_trading_day(self):
+        """测试最近交易日不是当日（如周末）时不预热"""
+        assert self.scheduler.run_if_due(datetime(2024, 1, 6, 16, 0)) is None
+
+    def test_runs_once_per_trade_date(self):
+        """测试每个交易日只预热一次并保存报告"""
+        report = self.scheduler.run_if_due(datetime(2024, 1, 5, 15, 15))
+
+        assert report['trade_date'] == '20240105'
+        assert self.scheduler.run_if_due(datetime(2024, 1, 5, 16, 0)) is None
+        assert len(self.client.price_requests) == 1
+        assert self.scheduler.get_last_report()['trade_date'] == '20240105'
@@ -0,0 +1,83 @@
+"""
+富途行情连接熔断器单元测试
+测试连续失败后快速失败、半开状态只放行一次探测，以及业务错误不计入失败
+"""
+
+import pytest
+import futu as ft
+from services.data.circuit_breaker import (CircuitBreaker, CircuitOpenError, GuardedQuoteContext,
+                                           STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN)
+
+
+class FlakyContext:
+    """模拟的富途行情连接，可切换为连接断开"""
+
+    def __init__(self):
+        self.down = False
+        self.calls = 0
+
+    def get_market_snapshot(self, codes):
+        self.calls += 1
+        if self.down:
+            raise ConnectionError('OpenD disconnected')
+        return ft.RET_OK, codes
+
+    def get_stock_basicinfo(self, market, code_list):
+        self.calls += 1
+        if self.down:
+            return ft.RET_ERROR, '网络中断，连接已断开'
+        return ft.RET_ERROR, '未知股票'
+
+
+class TestCircuitBreaker:
+    """熔断器测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.raw = FlakyContext()
+        self.breaker = CircuitBreaker('test', failure_threshold=2, reset_seconds=30)
+        self.ctx = GuardedQuoteContext(self.raw, self.breaker)
+
+    def test_opens_after_consecutive_failures_and_fails_fast(self):
+        """测试连续失败达到阈值后打开，打开期间不再请求网关"""
+        self.raw.down = True
+        with pytest.raises(ConnectionError):
+            self.ctx.get_market_snapshot(['SH.510300'])
+        assert self.ctx.get_stock_basicinfo(ft.Market.SH, ['SH.510300'])[0] == ft.RET_ERROR
+        assert self.breaker.get_status()['state'] == STATE_OPEN
+
+        with pytest.raises(CircuitOpenError):
+            self.ctx.get_market_snapshot(['SH.510300'])
+        assert self.raw.calls == 2
+        assert self.breaker.get_status()['rejected'] == 1
+
+    def test_half_open_probe_closes_or_reopens(self, monkeypatch):
+        """测试打开一段时间后只放行一次探测，探测失败重新打开，成功则关闭"""
+        self.raw.down = True
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                self.ctx.get_market_snapshot(['SH.510300'])
+
+        now = self.breaker._opened_at + 31
+        monkeypatch.setattr('services.data.circuit_breaker.time.time', lambda: now)
+        with pytest.raises(ConnectionError):
+            self.ctx.get_market_snapshot(['SH.510300'])
+        assert self.breaker.get_status()['state'] == STATE_OPEN
+
+        now += 31
+        self.breaker.before_call()
+        assert self.breaker.get_status()['state'] == STATE_HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            self.ctx.get_market_snapshot(['SH.510300'])
+        self.breaker.record_success()
+
+        self.raw.down = False
+        assert self.ctx.get_market_snapshot(['SH.510300']) == (ft.RET_OK, ['SH.510300'])
+        assert self.breaker.get_status()['state'] == STATE_CLOSED
+
+    def test_business_errors_do_not_trip(self):
+        """测试代码不存在等业务错误说明网关正常，不计入失败"""
+        for _ in range(3):
+            assert self.ctx.get_stock_basicinfo(ft.Market.SH, ['SH.999999']) == (ft.RET_ERROR, '未知股票')
+        assert self.breaker.get_status()['state'] == STATE_CLOSED
+        assert self.breaker.get_status()['consecutive_failures'] == 0
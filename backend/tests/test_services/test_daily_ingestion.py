@@ -0,0 +1,101 @@
+"""
+全市场日线截面入库单元测试
+测试按交易日截面合并进列式存储、检查点续传和重复执行的幂等性
+"""
+
+import tempfile
+import shutil
+import pandas as pd
+from services.data.futu_client import futuClient
+from services.data.daily_ingestion import UniverseDataService
+
+TRADING_DAYS = ['20240102', '20240103', '20240104', '20240105', '20240108']
+
+
+class FakeCrossSectionSource:
+    """模拟的截面来源，每个交易日返回两只ETF，可在指定交易日失败"""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.requests = []
+
+    def fetch(self, trade_date, latest_trading_date):
+        self.requests.append(trade_date)
+        if trade_date == self.fail_on:
+            raise RuntimeError('upstream error')
+        close = 3.0 + TRADING_DAYS.index(trade_date) * 0.1
+        return pd.DataFrame({
+            'ts_code': ['510300', '159915'],
+            'trade_date': pd.Timestamp(trade_date),
+            'open': [close, close * 0.5], 'high': [close, close * 0.5],
+            'low': [close, close * 0.5], 'close': [close, close * 0.5],
+            'vol': [1000, 2000], 'amount': [3000.0, 3000.0],
+        })
+
+
+class TestUniverseDataService:
+    """全市场日线截面入库测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.cache_dir = tempfile.mkdtemp()
+        self.client = futuClient(cache_dir=self.cache_dir)
+        manager = self.client.trading_date_manager
+        manager.get_latest_trading_date = lambda tushare_pro: '20240108'
+        manager.get_trading_days_between = lambda start, end: [d for d in TRADING_DAYS if start <= d <= end]
+        manager.get_previous_trading_date = \
+            lambda date: TRADING_DAYS[TRADING_DAYS.index(date) - 1] if TRADING_DAYS.index(date) else None
+        self.client.get_adjust_factors = lambda etf_code: []
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_ingests_cross_sections_into_bar_store(self):
+        """测试每个交易日一次截面请求，单只ETF的窗口直接命中列式存储"""
+        source = FakeCrossSectionSource()
+        service = UniverseDataService(self.client, source=source)
+
+        report = service.run(start_date='20240102')
+
+        assert source.requests == TRADING_DAYS
+        assert report['etf_count'] == 10
+        # 截面覆盖区间跨过周末相连，窗口读取不再请求富途
+        assert self.client.cache.get_historical_missing_ranges('510300', '20240102', '20240108') == []
+        df = self.client.get_etf_daily_data('159915', '20240102', '20240108')
+        assert len(df) == 5
+        assert df['pre_close'].iloc[1] == df['close'].iloc[0]
+
+    def test_resumes_after_failure_and_is_idempotent(self):
+        """测试失败的交易日下次继续，已完成的交易日不重复请求"""
+        source = FakeCrossSectionSource(fail_on='20240104')
+        service = UniverseDataService(self.client, source=source)
+
+        report = service.run(start_date='20240102')
+        assert report['failed'] == ['20240104']
+        assert service.completed_dates() == ['20240102', '20240103', '20240105', '20240108']
+
+        source.fail_on = None
+        source.requests = []
+        service.run(start_date='20240102')
+        assert source.requests == ['20240104']
+
+        # 重复入库同一交易日不会产生重复K线
+        service.ingest_date('20240104')
+        df = self.client.get_etf_daily_data('510300', '20240102', '20240108')
+        assert list(df['trade_date'].dt.strftime('%Y%m%d')) == TRADING_DAYS
+
+    def test_default_window_retries_failed_middle_date(self):
+        """测试不指定开始日期时，窗口中间失败的交易日在下次执行时重试"""
+        source = FakeCrossSectionSource(fail_on='20240104')
+        service = UniverseDataService(self.client, source=source)
+
+        report = service.run()
+        assert report['start_date'] == '20240102'
+        assert report['failed'] == ['20240104']
+
+        source.fail_on = None
+        source.requests = []
+        report = service.run()
+        assert source.requests == ['20240104']
+        assert service.completed_dates() == TRADING_DAYS
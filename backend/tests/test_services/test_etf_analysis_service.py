@@ -0,0 +1,69 @@
+"""
+ETF分析服务单元测试
+测试网关出错且没有价格缓存时以最近日线收盘价代替最新价格
+"""
+
+import pandas as pd
+from services.analysis import etf_analysis_service
+from services.analysis.etf_analysis_service import ETFAnalysisService
+
+
+class FakeTradingDateManager:
+    """模拟的交易日管理器，使用固定的交易日历"""
+
+    TRADING_DAYS = ['20240102', '20240103', '20240104', '20240105', '20240108', '20240109', '20240110']
+
+    def get_latest_trading_date(self, tushare_pro):
+        return self.TRADING_DAYS[-1]
+
+    def get_trading_days_between(self, start_date, end_date):
+        return [day for day in self.TRADING_DAYS if start_date <= day <= end_date]
+
+
+class GatewayDownClient:
+    """模拟网关出错的富途客户端：取不到最新价格，只有截至last_bar_date的日线"""
+
+    def __init__(self, last_bar_date):
+        self.trading_date_manager = FakeTradingDateManager()
+        self.last_bar_date = last_bar_date
+
+    def get_latest_price(self, etf_code):
+        return None
+
+    def get_etf_daily_data(self, etf_code, start_date, end_date):
+        dates = [day for day in FakeTradingDateManager.TRADING_DAYS if day <= self.last_bar_date]
+        return pd.DataFrame({
+            'trade_date': pd.to_datetime(dates),
+            'close': [4.0] * len(dates),
+            'pre_close': [3.9] * len(dates),
+            'pct_chg': [2.56] * len(dates),
+            'vol': [1000.0] * len(dates),
+            'amount': [4000.0] * len(dates),
+        })
+
+
+class TestLatestPriceFallback:
+    """最新价格退回日线收盘价测试类"""
+
+    def make_service(self, monkeypatch, last_bar_date):
+        monkeypatch.setattr(etf_analysis_service, 'futuClient', lambda: GatewayDownClient(last_bar_date))
+        return ETFAnalysisService()
+
+    def test_returns_stale_close_within_stale_limit(self, monkeypatch):
+        """测试最近日线落后3个交易日时仍返回其收盘价并标记为旧价格"""
+        monkeypatch.setattr(etf_analysis_service, 'STALE_PRICE_MAX_AGE_DAYS', 5)
+        service = self.make_service(monkeypatch, '20240105')
+
+        price = service.get_latest_price_info('510300')
+
+        assert price['current_price'] == 4.0
+        assert price['trade_date'] == '20240105'
+        assert price['data_age_days'] == 3
+        assert price['stale'] is True
+
+    def test_rejects_close_older_than_stale_limit(self, monkeypatch):
+        """测试最近日线落后超过上限时不再代替"""
+        monkeypatch.setattr(etf_analysis_service, 'STALE_PRICE_MAX_AGE_DAYS', 2)
+        service = self.make_service(monkeypatch, '20240105')
+
+        assert service.get_latest_price_info('510300') is None
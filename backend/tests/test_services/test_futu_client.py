@@ -0,0 +1,347 @@
+"""
+富途API数据客户端单元测试
+测试批量行情快照的分批请求、交易日缓存，以及先返回旧缓存再后台刷新
+"""
+
+import tempfile
+import shutil
+import futu as ft
+import pandas as pd
+from services.data import futu_client
+from services.data.futu_client import futuClient
+from services.data.rate_limiter import PRIORITY_BACKGROUND, QuotaExhaustedError, request_priority
+
+
+class FakeSnapshotContext:
+    """模拟的富途行情连接，记录每次快照请求的代码"""
+
+    def __init__(self):
+        self.requests = []
+
+    def get_market_snapshot(self, codes):
+        self.requests.append(list(codes))
+        return ft.RET_OK, pd.DataFrame({
+            'code': codes,
+            'last_price': [3.3] * len(codes),
+            'prev_close_price': [3.0] * len(codes),
+            'volume': [1000] * len(codes),
+            'turnover': [3300.0] * len(codes),
+        })
+
+
+class TestGetLatestPrices:
+    """批量获取最新价格测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.cache_dir = tempfile.mkdtemp()
+        self.client = futuClient(cache_dir=self.cache_dir)
+        self.ctx = FakeSnapshotContext()
+        self.client.quote_context_manager.get = lambda: self.ctx
+        self.client.trading_date_manager.get_latest_trading_date = lambda tushare_pro: '20240105'
+
+    def teardown_method(self):
+        """测试后清理（连接管理器为进程级共享实例，需恢复）"""
+        vars(self.client.quote_context_manager).pop('get', None)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_batches_codes_by_gateway_limit(self, monkeypatch):
+        """测试按网关上限分批请求并返回所有代码的价格"""
+        monkeypatch.setattr(futu_client, 'SNAPSHOT_BATCH_SIZE', 2)
+        codes = ['510300', '159915', '512880', '588000', '510500']
+
+        prices = self.client.get_latest_prices(codes)
+
+        assert [len(batch) for batch in self.ctx.requests] == [2, 2, 1]
+        assert self.ctx.requests[0] == ['SH.510300', 'SZ.159915']
+        assert set(prices) == set(codes)
+        assert prices['510300']['pct_change'] == 10.0
+        assert prices['510300']['trade_date'] == '20240105'
+
+    def test_only_fetches_cache_misses(self):
+        """测试已缓存的代码不再请求，且批量结果写入交易日缓存"""
+        self.client.get_latest_prices(['510300'])
+        self.ctx.requests = []
+
+        prices = self.client.get_latest_prices(['510300', '159915'])
+
+        assert self.ctx.requests == [['SZ.159915']]
+        assert set(prices) == {'510300', '159915'}
+        assert self.client.get_latest_price('159915') == prices['159915']
+        assert self.ctx.requests == [['SZ.159915']]
+
+    def test_counts_user_requests_but_not_background(self):
+        """测试用户查询按交易日计数，后台优先级的调用（预热）不计数"""
+        self.client.get_latest_price('510300')
+        self.client.get_latest_price('510300')
+        with request_priority(PRIORITY_BACKGROUND):
+            self.client.get_latest_price('159915')
+            self.client.get_latest_prices(['512880'])
+
+        assert self.client.cache.get_request_counts(['20240105']) == {'510300': 2}
+
+
+class FakeKlineContext:
+    """模拟的富途行情连接，按页返回日线K线"""
+
+    def __init__(self, dates, page_size, fail_on_page=None):
+        self.dates = list(dates)
+        self.page_size = page_size
+        self.fail_on_page = fail_on_page
+        self.requests = []
+
+    def request_history_kline(self, code, start, end, ktype, autype, max_count, page_req_key):
+        self.requests.append((start, end, page_req_key))
+        if self.fail_on_page is not None and len(self.requests) == self.fail_on_page:
+            return ft.RET_ERROR, 'page request failed', None
+
+        dates = [d for d in self.dates if start <= d.strftime('%Y-%m-%d') <= end]
+        offset = page_req_key or 0
+        page = dates[offset:offset + self.page_size]
+        next_key = offset + self.page_size if offset + self.page_size < len(dates) else None
+        close = [3.0 + i * 0.01 for i in range(offset, offset + len(page))]
+        return ft.RET_OK, pd.DataFrame({
+            'time_key': [d.strftime('%Y-%m-%d 00:00:00') for d in page],
+            'open': close, 'high': close, 'low': close, 'close': close,
+            'volume': [1000] * len(page), 'turnover': [3000.0] * len(page),
+        }), next_key
+
+
+class TestPaginatedHistory:
+    """分页获取历史日线测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.cache_dir = tempfile.mkdtemp()
+        self.client = futuClient(cache_dir=self.cache_dir)
+        self.client.trading_date_manager.get_latest_trading_date = lambda tushare_pro: '20241231'
+        self.dates = pd.bdate_range('2024-01-01', '2024-12-31')
+
+    def teardown_method(self):
+        """测试后清理（连接管理器为进程级共享实例，需恢复）"""
+        vars(self.client.quote_context_manager).pop('get', None)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_follows_page_req_key_until_exhausted(self):
+        """测试按page_req_key取完所有页，窗口不被单页截断"""
+        ctx = FakeKlineContext(self.dates, page_size=100)
+        self.client.quote_context_manager.get = lambda: ctx
+
+        df = self.client.get_etf_daily_data('510300', '20240101', '20241231')
+
+        assert len(df) == len(self.dates)
+        assert [key for _, _, key in ctx.requests] == [None, 100, 200]
+        assert df['pre_close'].iloc[100] == df['close'].iloc[99]
+
+    def test_failed_page_keeps_fetched_pages_and_resumes(self):
+        """测试中途失败时已获取的页保留在缓存中，重试只获取剩余区间"""
+        ctx = FakeKlineContext(self.dates, page_size=100, fail_on_page=2)
+        self.client.quote_context_manager.get = lambda: ctx
+
+        assert self.client.get_etf_daily_data('510300', '20240101', '20241231') is None
+        assert self.client.cache.get_historical_missing_ranges('510300', '20240101', '20241231') == [
+            ((self.dates[99] + pd.Timedelta(days=1)).strftime('%Y%m%d'), '20241231')
+        ]
+
+        ctx.fail_on_page = None
+        ctx.requests = []
+        df = self.client.get_etf_daily_data('510300', '20240101', '20241231')
+
+        assert len(df) == len(self.dates)
+        assert ctx.requests[0][0] > self.dates[99].strftime('%Y-%m-%d')
+
+
+class FakeBasicInfoContext:
+    """模拟的富途行情连接，返回沪深两市ETF代码表"""
+
+    def __init__(self):
+        self.requests = 0
+
+    def get_stock_basicinfo(self, market, stock_type):
+        self.requests += 1
+        codes = ['SH.510300', 'SH.512880'] if market == ft.Market.SH else ['SZ.159915']
+        names = ['沪深300ETF', '证券ETF'] if market == ft.Market.SH else ['创业板ETF']
+        return ft.RET_OK, pd.DataFrame({'code': codes, 'name': names, 'listing_date': ['2012-05-28'] * len(codes)})
+
+
+class TestSearchEtf:
+    """ETF搜索测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.cache_dir = tempfile.mkdtemp()
+        self.client = futuClient(cache_dir=self.cache_dir)
+        self.ctx = FakeBasicInfoContext()
+        self.client.quote_context_manager.get = lambda: self.ctx
+        self.client.trading_date_manager.get_latest_trading_date = lambda tushare_pro: '20240105'
+
+    def teardown_method(self):
+        """测试后清理（连接管理器为进程级共享实例，需恢复）"""
+        vars(self.client.quote_context_manager).pop('get', None)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_downloads_symbols_once_per_trade_date(self):
+        """测试同一交易日内多次搜索只下载一次代码表"""
+        assert [r['code'] for r in self.client.search_etf('证券')] == ['512880']
+        assert [r['code'] for r in self.client.search_etf('1599')] == ['159915']
+        assert self.ctx.requests == 2  # 沪深两市各一次
+
+        other_client = futuClient(cache_dir=self.cache_dir)
+        other_client.quote_context_manager.get = lambda: self.ctx
+        other_client.trading_date_manager.get_latest_trading_date = lambda tushare_pro: '20240105'
+        assert other_client.search_etf('沪深300')[0]['list_date'] == '20120528'
+        assert self.ctx.requests == 2
+
+
+def exhausted_quota(endpoint, priority=None):
+    """模拟额度已用完的限流器"""
+    raise QuotaExhaustedError(endpoint, 5.0)
+
+
+class TestQuotaExhausted:
+    """接口额度用完时返回旧数据测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.cache_dir = tempfile.mkdtemp()
+        self.client = futuClient(cache_dir=self.cache_dir)
+        self.ctx = FakeSnapshotContext()
+        self.client.quote_context_manager.get = lambda: self.ctx
+        self.client.trading_date_manager.get_latest_trading_date = lambda tushare_pro: '20240105'
+        self.client.trading_date_manager.get_previous_trading_date = lambda date: '20240104'
+        self.client.cache.set_daily_cache('20240104', 'price', '510300', {'current_price': 3.1})
+        self.client.rate_limiter.acquire = exhausted_quota
+
+    def teardown_method(self):
+        """测试后清理（连接管理器为进程级共享实例，需恢复）"""
+        self.client.background_refresher.wait()
+        vars(self.client.quote_context_manager).pop('get', None)
+        vars(self.client.rate_limiter).pop('acquire', None)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_latest_price_serves_previous_day_as_stale(self):
+        """测试额度用完时返回上一交易日缓存价格且不请求网关"""
+        price = self.client.get_latest_price('510300')
+
+        assert price == {'current_price': 3.1, 'stale': True, 'data_age_days': 1}
+        self.client.background_refresher.wait()
+        assert self.ctx.requests == []
+        assert self.client.cache.get_daily_cache('20240105', 'price', '510300') is None
+
+    def test_batch_prices_fall_back_per_code(self):
+        """测试批量获取时额度用完的代码使用旧价格，没有旧价格的代码不返回"""
+        prices = self.client.get_latest_prices(['510300', '159915'])
+
+        assert prices == {'510300': {'current_price': 3.1, 'stale': True, 'data_age_days': 1}}
+
+
+class FailingSnapshotContext(FakeSnapshotContext):
+    """模拟网关出错的富途行情连接"""
+
+    def get_market_snapshot(self, codes):
+        self.requests.append(list(codes))
+        raise ConnectionError('OpenD disconnected')
+
+
+TRADING_DAYS = ['20240102', '20240103', '20240104', '20240105']
+
+
+class TestStaleWhileRevalidate:
+    """先返回旧缓存、后台刷新测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.cache_dir = tempfile.mkdtemp()
+        self.client = futuClient(cache_dir=self.cache_dir)
+        self.client.quote_subscriber = None
+        self.ctx = FakeSnapshotContext()
+        self.client.quote_context_manager.get = lambda: self.ctx
+        manager = self.client.trading_date_manager
+        manager.get_latest_trading_date = lambda tushare_pro: '20240105'
+        manager.get_previous_trading_date = \
+            lambda date: TRADING_DAYS[TRADING_DAYS.index(date) - 1] if TRADING_DAYS.index(date) else None
+
+    def teardown_method(self):
+        """测试后清理（连接管理器为进程级共享实例，需恢复）"""
+        self.client.background_refresher.wait()
+        vars(self.client.quote_context_manager).pop('get', None)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_serves_previous_day_and_refreshes_in_background(self):
+        """测试新交易日尚无缓存时立即返回上一交易日价格，后台刷新后返回新价格"""
+        self.client.cache.set_daily_cache('20240104', 'price', '510300', {'current_price': 3.1})
+
+        price = self.client.get_latest_price('510300')
+        assert price == {'current_price': 3.1, 'stale': True, 'data_age_days': 1}
+
+        self.client.background_refresher.wait()
+        assert self.ctx.requests == [['SH.510300']]
+        price = self.client.get_latest_price('510300')
+        assert price['current_price'] == 3.3
+        assert price['trade_date'] == '20240105'
+
+    def test_serves_older_price_on_gateway_error(self):
+        """测试旧价格超过后台刷新范围时同步请求，网关出错时在最大旧数据范围内返回旧价格"""
+        self.ctx = FailingSnapshotContext()
+        self.client.cache.set_daily_cache('20240102', 'price', '510300', {'current_price': 3.0})
+
+        price = self.client.get_latest_price('510300')
+        assert price == {'current_price': 3.0, 'stale': True, 'data_age_days': 3}
+        assert self.ctx.requests == [['SH.510300']]
+        assert self.client._get_stale_price('510300', '20240105', max_age_days=2) is None
+
+    def test_expired_basic_info_refreshed_in_background(self):
+        """测试过期的证券基本信息直接返回，后台刷新"""
+        self.client.cache.set_permanent_cache('security_basic', '510300', {'name': '旧名称', 'updated_at': '20200101'})
+        self.ctx.get_stock_basicinfo = lambda market, code_list: (ft.RET_OK, pd.DataFrame({
+            'code': code_list, 'name': ['沪深300ETF'], 'list_board': ['主板']}))
+
+        assert self.client.get_security_basic_info('510300')['name'] == '旧名称'
+        self.client.background_refresher.wait()
+        assert self.client.get_security_basic_info('510300')['name'] == '沪深300ETF'
+
+
+class FakeUnknownCodeContext:
+    """模拟的富途行情连接，返回代码不存在或网关故障"""
+
+    def __init__(self, message='未知股票'):
+        self.message = message
+        self.requests = 0
+
+    def get_stock_basicinfo(self, market, code_list):
+        self.requests += 1
+        return ft.RET_ERROR, self.message
+
+
+class TestNegativeCache:
+    """代码不存在的短期缓存测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.cache_dir = tempfile.mkdtemp()
+        self.client = futuClient(cache_dir=self.cache_dir)
+        self.ctx = FakeUnknownCodeContext()
+        self.client.quote_context_manager.get = lambda: self.ctx
+
+    def teardown_method(self):
+        """测试后清理（连接管理器为进程级共享实例，需恢复）"""
+        vars(self.client.quote_context_manager).pop('get', None)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_unknown_code_not_requested_again(self):
+        """测试上游确认不存在的代码在有效期内不再请求，基本信息和名称共用"""
+        assert self.client.get_security_basic_info('519999') is None
+        assert self.client.get_security_basic_info('519999') is None
+        assert self.client.get_security_name('519999') is None
+        assert self.ctx.requests == 1
+
+        other_client = futuClient(cache_dir=self.cache_dir)
+        assert other_client.get_security_name('519999') is None
+        assert self.ctx.requests == 1
+
+    def test_gateway_errors_not_cached(self):
+        """测试网关故障不写入不存在缓存"""
+        self.ctx.message = '网络中断，连接已断开'
+        assert self.client.get_security_name('510300') is None
+        assert self.client.get_security_name('510300') is None
+        assert self.ctx.requests == 2
@@ -0,0 +1,113 @@
+"""
+富途行情录制与回放单元测试
+测试录制后回放的一致性、K线按日期过滤和分页、按代码拼接快照、注入延迟以及未录制数据的错误返回
+"""
+
+import time
+import tempfile
+import shutil
+import pandas as pd
+import futu as ft
+from services.data.futu_replay import (
+    FutuRecording, RecordingQuoteContext, ReplayQuoteContext, ReplayLatency
+)
+
+
+def make_klines(dates):
+    return pd.DataFrame({
+        'code': 'SH.510300',
+        'time_key': [f"{date} 00:00:00" for date in dates],
+        'open': [3.8 + i * 0.01 for i in range(len(dates))],
+        'close': [3.9 + i * 0.01 for i in range(len(dates))],
+        'volume': [1000000 + i for i in range(len(dates))],
+    })
+
+
+class FakeLiveContext:
+    """模拟的真实行情连接"""
+
+    def request_history_kline(self, code, start=None, end=None, ktype=None, autype=None, **kwargs):
+        return ft.RET_OK, make_klines(['2024-01-02', '2024-01-03', '2024-01-04', '2024-01-05']), None
+
+    def get_market_snapshot(self, code_list):
+        return ft.RET_OK, pd.DataFrame({'code': code_list, 'last_price': [3.9 + i for i in range(len(code_list))]})
+
+    def get_stock_basicinfo(self, market, stock_type=None, code_list=None):
+        return ft.RET_OK, pd.DataFrame({'code': code_list, 'name': ['沪深300ETF'] * len(code_list)})
+
+    def request_trading_days(self, market=None, start=None, end=None, code=None):
+        return ft.RET_OK, [{'time': '2024-01-04', 'trade_date_type': 'WHOLE'},
+                           {'time': '2024-01-05', 'trade_date_type': 'WHOLE'}]
+
+    def get_global_state(self):
+        return ft.RET_OK, {'live': True}
+
+
+class TestFutuReplay:
+    """录制与回放测试类"""
+
+    def setup_method(self):
+        """测试前准备：通过录制包装调用一遍各接口"""
+        self.recording_dir = tempfile.mkdtemp()
+        self.recording = FutuRecording(self.recording_dir)
+        recorder = RecordingQuoteContext(FakeLiveContext(), self.recording)
+        recorder.request_history_kline('SH.510300', start='2024-01-01', end='2024-01-05')
+        recorder.get_market_snapshot(['SH.510300', 'SZ.159915'])
+        recorder.get_stock_basicinfo(ft.Market.SH, code_list=['SH.510300'])
+        recorder.request_trading_days(market=ft.TradeDateMarket.CN, start='2024-01-01', end='2024-01-05')
+        assert recorder.get_global_state() == (ft.RET_OK, {'live': True})
+        self.replay = ReplayQuoteContext(self.recording, ReplayLatency(0))
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.recording_dir, ignore_errors=True)
+
+    def test_replay_matches_recording(self):
+        """测试回放结果与录制时的返回一致"""
+        ret, data, page_req_key = self.replay.request_history_kline('SH.510300', start='2024-01-01', end='2024-01-05')
+        assert ret == ft.RET_OK and page_req_key is None
+        pd.testing.assert_frame_equal(data, make_klines(['2024-01-02', '2024-01-03', '2024-01-04', '2024-01-05']))
+
+        ret, data = self.replay.get_stock_basicinfo(ft.Market.SH, code_list=['SH.510300'])
+        assert ret == ft.RET_OK and data.iloc[0]['name'] == '沪深300ETF'
+
+        ret, days = self.replay.request_trading_days(market=ft.TradeDateMarket.CN, start='2024-01-05')
+        assert ret == ft.RET_OK and [day['time'] for day in days] == ['2024-01-05']
+
+    def test_kline_filtered_by_date_and_paginated(self):
+        """测试K线按日期过滤并按max_count分页"""
+        ret, first, page_req_key = self.replay.request_history_kline(
+            'SH.510300', start='2024-01-03', end='2024-01-05', max_count=2)
+        assert ret == ft.RET_OK
+        assert list(first['time_key'].str[:10]) == ['2024-01-03', '2024-01-04']
+
+        ret, second, page_req_key = self.replay.request_history_kline(
+            'SH.510300', start='2024-01-03', end='2024-01-05', max_count=2, page_req_key=page_req_key)
+        assert list(second['time_key'].str[:10]) == ['2024-01-05']
+        assert page_req_key is None
+
+    def test_snapshot_assembled_per_code(self):
+        """测试快照按请求的代码顺序拼接"""
+        ret, data = self.replay.get_market_snapshot(['SZ.159915', 'SH.510300'])
+        assert ret == ft.RET_OK
+        assert list(data['code']) == ['SZ.159915', 'SH.510300']
+        assert list(data['last_price']) == [4.9, 3.9]
+
+    def test_missing_recording_returns_error(self):
+        """测试未录制的数据返回错误并计入未命中"""
+        ret, message, page_req_key = self.replay.request_history_kline('SH.512880')
+        assert ret == ft.RET_ERROR and page_req_key is None
+        ret, message = self.replay.get_market_snapshot(['SH.510300', 'SH.512880'])
+        assert ret == ft.RET_ERROR and 'SH.512880' in message
+        assert self.replay.stats['get_market_snapshot'] == {'calls': 1, 'misses': 1}
+
+    def test_injected_latency(self):
+        """测试按接口注入延迟"""
+        latency = ReplayLatency('get_market_snapshot=50')
+        assert latency.delay('get_market_snapshot') == 0.05
+        assert latency.delay('request_history_kline') == 0
+
+        replay = ReplayQuoteContext(self.recording, latency)
+        start = time.perf_counter()
+        replay.get_market_snapshot(['SH.510300'])
+        assert time.perf_counter() - start >= 0.05
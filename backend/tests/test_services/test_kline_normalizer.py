@@ -0,0 +1,73 @@
+"""
+K线转日线单元测试
+固定单次构建的_kline_to_daily_bars与原逐列转换实现的输出完全一致（含列类型），并测试乱序K线
+"""
+
+import numpy as np
+import pandas as pd
+from services.data.bar_store import BAR_COLUMNS
+from services.data.futu_client import futuClient
+
+
+def legacy_kline_to_daily_bars(data: pd.DataFrame, etf_code: str) -> pd.DataFrame:
+    """原实现：逐列astype、重命名、选列、排序后重置索引"""
+    df = pd.DataFrame(data).reset_index(drop=True)
+    df['trade_date'] = pd.to_datetime(df['time_key']).dt.strftime('%Y%m%d')
+    df['trade_date'] = pd.to_datetime(df['trade_date'])
+    df['open'] = df['open'].astype(float)
+    df['high'] = df['high'].astype(float)
+    df['low'] = df['low'].astype(float)
+    df['close'] = df['close'].astype(float)
+    df['volume'] = df['volume'].astype(int)
+    df['turnover'] = df['turnover'].astype(float)
+    df['pre_close'] = df['close'].shift(1)
+    df.loc[0, 'pre_close'] = df.loc[0, 'open']
+    df['pre_close'] = df['pre_close'].astype(float)
+    df['change'] = df['close'] - df['pre_close']
+    df['pct_chg'] = df['change'] / df['pre_close'] * 100
+    df['change'] = df['change'].astype(float)
+    df['pct_chg'] = df['pct_chg'].astype(float)
+    df['amplitude'] = (df['high'] - df['low']) / df['pre_close'] * 100
+    df['amplitude'] = df['amplitude'].astype(float)
+    df = df.rename(columns={'volume': 'vol', 'turnover': 'amount'})
+    df['ts_code'] = etf_code
+    df = df[BAR_COLUMNS]
+    df = df.sort_values('trade_date')
+    return df.reset_index(drop=True)
+
+
+def make_kline(days: int, seed: int = 0) -> pd.DataFrame:
+    """构造request_history_kline格式的日K线（价格保留3位小数，成交量为整数）"""
+    rng = np.random.default_rng(seed)
+    close = np.round(3 * np.exp(np.cumsum(rng.normal(0, 0.01, days))), 3)
+    open_ = np.round(close + rng.normal(0, 0.01, days), 3)
+    return pd.DataFrame({
+        'code': 'SH.510300',
+        'time_key': pd.bdate_range('2020-01-01', periods=days).strftime('%Y-%m-%d 00:00:00'),
+        'open': open_,
+        'close': close,
+        'high': np.maximum(open_, close) + 0.01,
+        'low': np.minimum(open_, close) - 0.01,
+        'volume': rng.integers(10 ** 5, 10 ** 8, days),
+        'turnover': np.round(rng.uniform(10 ** 6, 10 ** 9, days), 2),
+        'change_rate': 0.0,
+    })
+
+
+class TestKlineToDailyBars:
+    """K线转日线测试类"""
+
+    def test_matches_legacy_implementation(self):
+        """测试输出（值、列顺序、列类型和索引）与原实现完全一致"""
+        for days, seed in [(1, 0), (2, 1), (250, 2), (1200, 3)]:
+            kline = make_kline(days, seed)
+            pd.testing.assert_frame_equal(futuClient._kline_to_daily_bars(kline, '510300'),
+                                          legacy_kline_to_daily_bars(kline, '510300'), check_exact=True)
+
+    def test_unordered_kline_sorted_before_derivation(self):
+        """测试乱序K线先按交易日排序再计算前收盘价"""
+        kline = make_kline(5)
+        df = futuClient._kline_to_daily_bars(kline.iloc[[2, 0, 4, 1, 3]], '510300')
+
+        pd.testing.assert_frame_equal(df, futuClient._kline_to_daily_bars(kline, '510300'))
+        assert df['pre_close'].iloc[1] == df['close'].iloc[0]
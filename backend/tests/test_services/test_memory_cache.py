@@ -0,0 +1,127 @@
+"""
+内存缓存层单元测试
+测试LRU淘汰、过期时间、统计计数以及EnhancedCache的内存层
+"""
+
+import os
+import time
+import tempfile
+import shutil
+import pandas as pd
+from services.data.memory_cache import LRUMemoryCache
+from services.data.cache_service import EnhancedCache
+from .test_bar_store import make_bars
+
+
+class TestLRUMemoryCache:
+    """LRU内存缓存测试类"""
+
+    def test_evicts_least_recently_used_by_count(self):
+        """测试超过条目数时淘汰最久未使用的条目"""
+        cache = LRUMemoryCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
+        assert cache.get_stats()['evictions'] == 1
+
+    def test_evicts_by_bytes(self):
+        """测试超过字节上限时淘汰条目"""
+        cache = LRUMemoryCache(max_entries=100, max_bytes=300)
+        cache.set('a', 'x' * 100)
+        cache.set('b', 'y' * 100)
+        cache.set('c', 'z' * 100)
+
+        stats = cache.get_stats()
+        assert stats['entries'] < 3
+        assert stats['evictions'] >= 1
+        assert cache.get('c') is not None
+
+    def test_ttl_expiration(self):
+        """测试条目过期"""
+        cache = LRUMemoryCache()
+        cache.set('a', 1, ttl=0.01)
+        time.sleep(0.02)
+
+        assert cache.get('a') is None
+        stats = cache.get_stats()
+        assert stats['expirations'] == 1
+        assert stats['misses'] == 1
+
+    def test_purge_by_predicate(self):
+        """测试按条件批量删除"""
+        cache = LRUMemoryCache()
+        cache.set('daily:20240101:price:510300', {'current_price': 1})
+        cache.set('daily:20240102:price:510300', {'current_price': 2})
+
+        assert cache.purge(lambda key: key.split(':')[1] < '20240102') == 1
+        assert cache.get('daily:20240102:price:510300') == {'current_price': 2}
+
+
+class TestEnhancedCacheMemoryTier:
+    """EnhancedCache内存层测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = EnhancedCache(self.cache_dir)
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_permanent_hit_served_from_memory(self):
+        """测试永久缓存命中后不再读取文件"""
+        self.cache.set_permanent_cache('security_name', '510300', '沪深300ETF')
+        os.remove(os.path.join(self.cache.permanent_dir, 'security_name_510300.json'))
+
+        assert self.cache.get_permanent_cache('security_name', '510300') == '沪深300ETF'
+        assert self.cache.get_cache_info()['memory']['hits'] == 1
+
+    def test_returned_dict_is_a_copy(self):
+        """测试调用方修改返回值不影响缓存"""
+        self.cache.set_daily_cache('20240102', 'price', '510300', {'current_price': 3.5})
+        data = self.cache.get_daily_cache('20240102', 'price', '510300')
+        data['current_price'] = 0
+
+        assert self.cache.get_daily_cache('20240102', 'price', '510300')['current_price'] == 3.5
+
+    def test_nested_values_are_copied(self):
+        """测试返回值中的嵌套列表也是副本（如复权因子），调用方修改不影响内存缓存"""
+        factors = [{'ex_date': '20240105', 'forward_a': 1.0}]
+        self.cache.set_permanent_cache('adjust_factors', '510300', {'trade_date': '20240105', 'factors': factors})
+        factors.append({'ex_date': '20240110', 'forward_a': 0.9})
+
+        cached = self.cache.get_permanent_cache('adjust_factors', '510300')
+        cached['factors'][0]['forward_a'] = 0
+        cached['factors'].clear()
+
+        assert self.cache.get_permanent_cache('adjust_factors', '510300')['factors'] == \
+            [{'ex_date': '20240105', 'forward_a': 1.0}]
+
+    def test_returned_historical_frame_is_a_writable_copy(self):
+        """测试历史日线（含面板切片）返回可写副本，调用方修改不影响内存缓存"""
+        self.cache.set_historical_cache('510300', '20240101', '20240131', make_bars('510300', '2024-01-02', 10))
+        self.cache.rebuild_price_panel()
+
+        for _ in range(2):
+            df = self.cache.get_historical_cache('510300', '20240101', '20240131')
+            df['close'] = df['close'] * 2
+            df.loc[0, 'open'] = 0.0
+
+        df = self.cache.get_historical_cache('510300', '20240101', '20240131')
+        assert (df['open'] > 0).all()
+        pd.testing.assert_series_equal(df['close'], make_bars('510300', '2024-01-02', 10)['close'],
+                                       check_names=False)
+
+    def test_trade_date_rollover_purges_old_daily_entries(self):
+        """测试交易日切换时清理旧交易日的内存条目"""
+        self.cache.set_daily_cache('20240102', 'price', '510300', {'current_price': 3.5})
+        self.cache.set_daily_cache('20240103', 'price', '510300', {'current_price': 3.6})
+
+        assert self.cache.memory.get('daily:20240102:price:510300') is None
+        assert self.cache.memory.get('daily:20240103:price:510300') is not None
@@ -0,0 +1,163 @@
+"""
+分钟行情存储单元测试
+测试按月分区的合并与范围读取、检查点区间以及分块获取中断后的续传
+"""
+
+import os
+import tempfile
+import shutil
+import numpy as np
+import pandas as pd
+import futu as ft
+from services.data.minute_bar_store import MinuteBarStore, MINUTE_BAR_COLUMNS, month_chunks
+from services.data.futu_client import futuClient
+from .test_futu_client import exhausted_quota
+
+
+def make_minute_bars(etf_code: str, days) -> pd.DataFrame:
+    """创建测试用5分钟行情，每个交易日48根K线"""
+    times = pd.DatetimeIndex([day + pd.Timedelta(minutes=570 + 5 * i) for day in pd.DatetimeIndex(days)
+                              for i in range(48)])
+    close = np.linspace(3.0, 3.5, len(times))
+    return pd.DataFrame({
+        'ts_code': etf_code,
+        'trade_time': times,
+        'open': close - 0.001,
+        'high': close + 0.002,
+        'low': close - 0.002,
+        'close': close,
+        'vol': np.arange(len(times), dtype=np.int64) + 100,
+        'amount': close * 100.0,
+    })[MINUTE_BAR_COLUMNS]
+
+
+class TestMinuteBarStore:
+    """分钟行情存储测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.store_dir = tempfile.mkdtemp()
+        self.store = MinuteBarStore(self.store_dir)
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.store_dir, ignore_errors=True)
+
+    def test_month_chunks(self):
+        """测试日期区间按自然月切分"""
+        assert month_chunks('20240115', '20240310') == [
+            ('20240115', '20240131'), ('20240201', '20240229'), ('20240301', '20240310')
+        ]
+
+    def test_merge_partitions_by_month_and_reads_range(self):
+        """测试按月分区写入，范围读取跨月拼接并保持类型"""
+        df = make_minute_bars('510300', pd.bdate_range('2024-01-29', '2024-02-02'))
+        self.store.merge('510300', '5min', df)
+
+        assert self.store.list_months('510300', '5min') == ['202401', '202402']
+        result = self.store.read_available('510300', '5min', '20240131', '20240201')
+        assert len(result) == 96
+        assert result['trade_time'].iloc[0] == pd.Timestamp('2024-01-31 09:30:00')
+        assert result['trade_time'].iloc[-1] == pd.Timestamp('2024-02-01 13:25:00')
+        assert result['vol'].dtype == np.int64
+
+    def test_range_read_loads_only_intersecting_months(self, monkeypatch):
+        """测试范围读取只加载与窗口相交的月份分区"""
+        self.store.merge('510300', '5min', make_minute_bars('510300', pd.bdate_range('2024-01-01', '2024-03-31')))
+        loaded = []
+        original = self.store._load_partition
+        monkeypatch.setattr(self.store, '_load_partition', lambda path: loaded.append(path) or original(path))
+
+        self.store.read_available('510300', '5min', '20240205', '20240209')
+
+        assert [os.path.basename(path) for path in loaded] == ['202402.npz']
+
+    def test_merge_overwrites_same_time_and_read_requires_coverage(self):
+        """测试同一时间以新数据为准，未写入检查点的窗口读取返回None"""
+        df = make_minute_bars('510300', ['2024-01-02'])
+        self.store.merge('510300', '5min', df)
+        updated = df.iloc[:2].assign(close=9.9)
+        self.store.merge('510300', '5min', updated)
+
+        assert self.store.read('510300', '5min', '20240102', '20240102') is None
+        self.store.mark_covered('510300', '5min', '20240101', '20240102')
+        result = self.store.read('510300', '5min', '20240102', '20240102')
+        assert len(result) == 48
+        assert list(result['close'].iloc[:2]) == [9.9, 9.9]
+        assert self.store.missing_ranges('510300', '5min', '20240101', '20240105') == [('20240103', '20240105')]
+
+
+class FakeMinuteKlineContext:
+    """模拟的富途行情连接，按页返回5分钟K线，可在指定请求失败"""
+
+    def __init__(self, bars: pd.DataFrame, page_size: int, fail_on_request=None):
+        self.bars = bars
+        self.page_size = page_size
+        self.fail_on_request = fail_on_request
+        self.requests = []
+
+    def request_history_kline(self, code, start, end, ktype, autype, max_count, page_req_key):
+        self.requests.append((start, end, page_req_key))
+        if len(self.requests) == self.fail_on_request:
+            return ft.RET_ERROR, 'page request failed', None
+        days = self.bars['trade_time'].dt.strftime('%Y-%m-%d')
+        rows = self.bars[(days >= start) & (days <= end)]
+        offset = page_req_key or 0
+        page = rows.iloc[offset:offset + self.page_size]
+        next_key = offset + self.page_size if offset + self.page_size < len(rows) else None
+        return ft.RET_OK, pd.DataFrame({
+            'time_key': page['trade_time'].dt.strftime('%Y-%m-%d %H:%M:%S'),
+            'open': page['open'], 'high': page['high'], 'low': page['low'], 'close': page['close'],
+            'volume': page['vol'], 'turnover': page['amount'],
+        }), next_key
+
+
+class TestMinuteIngestion:
+    """分钟行情分块获取测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.cache_dir = tempfile.mkdtemp()
+        self.client = futuClient(cache_dir=self.cache_dir)
+        self.client.trading_date_manager.get_latest_trading_date = lambda tushare_pro: '20240331'
+        self.bars = make_minute_bars('510300', pd.bdate_range('2024-01-01', '2024-03-31'))
+
+    def teardown_method(self):
+        """测试后清理（连接管理器为进程级共享实例，需恢复）"""
+        vars(self.client.quote_context_manager).pop('get', None)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_resumes_from_checkpoint_after_failure(self):
+        """测试中途失败后已完成的月份保留，重试只获取剩余月份"""
+        # 一月1104根K线分3页，第5次请求（二月第二页）失败
+        ctx = FakeMinuteKlineContext(self.bars, page_size=500, fail_on_request=5)
+        self.client.quote_context_manager.get = lambda: ctx
+
+        assert self.client.get_etf_minute_data('510300', '5min', '20240101', '20240331') is None
+        assert self.client.cache.minute_store.missing_ranges('510300', '5min', '20240101', '20240331') == [
+            ('20240201', '20240331')
+        ]
+
+        ctx.fail_on_request = None
+        ctx.requests = []
+        df = self.client.get_etf_minute_data('510300', '5min', '20240101', '20240331')
+
+        assert len(df) == len(self.bars)
+        assert ctx.requests[0] == ('2024-02-01', '2024-02-29', None)
+        assert df['trade_time'].is_monotonic_increasing
+
+    def test_quota_exhausted_returns_cached_or_none(self):
+        """测试额度用完时返回已缓存的部分数据，没有任何已缓存数据时返回None"""
+        ctx = FakeMinuteKlineContext(self.bars, page_size=5000)
+        self.client.quote_context_manager.get = lambda: ctx
+        self.client.rate_limiter.acquire = exhausted_quota
+        try:
+            assert self.client.get_etf_minute_data('510300', '5min', '20240101', '20240131') is None
+
+            self.client.cache.minute_store.merge('510300', '5min', self.bars[self.bars['trade_time'] < '2024-01-06'])
+            df = self.client.get_etf_minute_data('510300', '5min', '20240101', '20240131')
+        finally:
+            vars(self.client.rate_limiter).pop('acquire', None)
+
+        assert len(df) == 5 * 48
+        assert ctx.requests == []
@@ -0,0 +1,122 @@
+"""
+推送报价簿单元测试
+测试按需订阅、推送更新报价、空闲退订，以及订阅失败时退回行情快照
+"""
+
+import time
+import tempfile
+import shutil
+import pandas as pd
+import futu as ft
+from services.data import futu_client
+from services.data.futu_client import futuClient
+from services.data.price_book import MIN_SUBSCRIPTION_SECONDS, QuoteSubscriber
+
+
+def make_quote(code, last_price, volume=1000):
+    """创建get_stock_quote/报价推送格式的数据"""
+    return pd.DataFrame({
+        'code': [code], 'data_date': ['2024-01-08'], 'data_time': ['10:30:00'],
+        'last_price': [last_price], 'prev_close_price': [4.0],
+        'volume': [volume], 'turnover': [last_price * volume],
+    })
+
+
+class FakePushContext:
+    """模拟支持报价订阅的富途行情连接"""
+
+    def __init__(self, fail_subscribe=False):
+        self.fail_subscribe = fail_subscribe
+        self.handler = None
+        self.subscribed = set()
+        self.snapshot_requests = 0
+
+    def set_handler(self, handler):
+        self.handler = handler
+
+    def subscribe(self, code_list, subtype_list, subscribe_push=True):
+        if self.fail_subscribe:
+            return ft.RET_ERROR, '订阅额度不足'
+        self.subscribed.update(code_list)
+        return ft.RET_OK, None
+
+    def unsubscribe(self, code_list, subtype_list):
+        self.subscribed.difference_update(code_list)
+        return ft.RET_OK, None
+
+    def get_stock_quote(self, code_list):
+        return ft.RET_OK, make_quote(code_list[0], 4.1)
+
+    def get_market_snapshot(self, code_list):
+        self.snapshot_requests += 1
+        return ft.RET_OK, pd.DataFrame({
+            'code': code_list, 'last_price': [3.9], 'prev_close_price': [4.0],
+            'volume': [500], 'turnover': [1950.0],
+        })
+
+
+class TestQuoteSubscriber:
+    """推送报价簿测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.cache_dir = tempfile.mkdtemp()
+        self.client = futuClient(cache_dir=self.cache_dir)
+        self.ctx = FakePushContext()
+        self.client.quote_context_manager.get = lambda: self.ctx
+        self.client.trading_date_manager.get_latest_trading_date = lambda tushare_pro: '20240105'
+        self.subscriber = QuoteSubscriber(lambda: self.ctx, idle_seconds=300)
+        self.client.quote_subscriber = self.subscriber
+
+    def teardown_method(self):
+        """测试后清理（连接管理器为进程级共享实例，需恢复）"""
+        self.subscriber.stop()
+        vars(self.client.quote_context_manager).pop('get', None)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_pushed_quotes_served_without_snapshot(self, monkeypatch):
+        """测试首次查询订阅并初始化报价，之后推送更新直接从报价簿读取"""
+        price = self.client.get_latest_price('510300')
+        assert price['current_price'] == 4.1
+        assert price['trade_date'] == '20240108'
+        assert self.ctx.subscribed == {'SH.510300'}
+
+        monkeypatch.setattr(ft.StockQuoteHandlerBase, 'on_recv_rsp', lambda handler, rsp_pb: (ft.RET_OK, rsp_pb))
+        self.ctx.handler.on_recv_rsp(make_quote('SH.510300', 4.2, volume=2000))
+
+        price = self.client.get_latest_price('510300')
+        assert price['current_price'] == 4.2
+        assert price['pct_change'] == 5.0
+        assert price['volume'] == 2000
+        assert self.ctx.snapshot_requests == 0
+        assert self.subscriber.stats['hits'] == 1
+        # 报价簿命中同样计入请求次数，收盘后预热不会漏掉这些ETF
+        assert self.client.cache.get_request_counts(['20240105']) == {'510300': 2}
+
+    def test_idle_subscriptions_dropped_and_reconnect_resubscribes(self):
+        """测试无人查询的订阅超时退订，连接重建后重新订阅"""
+        self.client.get_latest_price('510300')
+        now = time.time()
+        assert self.subscriber.expire_idle(now + MIN_SUBSCRIPTION_SECONDS) == []
+        assert self.subscriber.expire_idle(now + 301) == ['SH.510300']
+        assert self.ctx.subscribed == set()
+        assert self.subscriber.book.get('SH.510300') is None
+
+        self.client.get_latest_price('510300')
+        self.ctx = FakePushContext()
+        assert self.client.get_latest_price('510300')['current_price'] == 4.1
+        assert self.ctx.subscribed == {'SH.510300'}
+
+    def test_subscribe_failure_falls_back_to_snapshot(self):
+        """测试订阅失败时退回行情快照，重试间隔内不再尝试订阅"""
+        self.ctx.fail_subscribe = True
+        assert self.client.get_latest_price('510300')['current_price'] == 3.9
+        assert self.client.get_latest_price('159915')['current_price'] == 3.9
+        assert self.subscriber.stats['failures'] == 1
+        assert self.ctx.snapshot_requests == 2
+
+    def test_push_disabled_outside_live_mode(self, monkeypatch):
+        """测试录制和回放模式不启用报价推送（推送不经过录制，回放时结果不可复现）"""
+        for mode in ('record', 'replay'):
+            monkeypatch.setattr(futu_client, 'PROVIDER_MODE', mode)
+            assert futuClient(cache_dir=self.cache_dir).quote_subscriber is None
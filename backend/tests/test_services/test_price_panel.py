@@ -0,0 +1,92 @@
+"""
+行情面板单元测试
+测试由列式存储构建面板、内存映射切片、覆盖范围判断和构建后存储有写入时的回退
+"""
+
+import os
+import tempfile
+import shutil
+import numpy as np
+import pandas as pd
+from services.data.bar_store import BarStore
+from services.data.cache_service import EnhancedCache
+from services.data.price_panel import PricePanel, build_price_panel, read_current_version
+from .test_bar_store import make_bars
+
+
+class TestPricePanel:
+    """行情面板测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.store_dir = tempfile.mkdtemp()
+        self.panel_dir = tempfile.mkdtemp()
+        self.store = BarStore(self.store_dir)
+        self.store.merge('510300', '20240101', '20240331', make_bars('510300', '2024-01-01', 60))
+        # 第二只ETF晚上市，面板日期为两者并集
+        self.store.merge('159915', '20240115', '20240331', make_bars('159915', '2024-01-15', 50))
+        build_price_panel(self.store, self.panel_dir)
+        self.panel = PricePanel(self.panel_dir)
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.store_dir, ignore_errors=True)
+        shutil.rmtree(self.panel_dir, ignore_errors=True)
+
+    def test_slice_matches_bar_store(self):
+        """测试面板切片与列式存储读取结果一致"""
+        for etf_code, start in [('510300', '20240101'), ('159915', '20240115')]:
+            expected = self.store.read(etf_code, start, '20240331')
+            result = self.panel.slice(etf_code, start, '20240331')
+            pd.testing.assert_frame_equal(result, expected)
+
+    def test_slice_is_zero_copy(self):
+        """测试完整交易的窗口直接返回内存映射视图"""
+        result = self.panel.slice('510300', '20240201', '20240229')
+
+        close = result['close'].to_numpy()
+        assert np.shares_memory(close, self.panel._prices)
+        assert not close.flags.writeable
+
+    def test_slice_outside_coverage_misses(self):
+        """测试未覆盖的窗口或未知ETF返回None"""
+        assert self.panel.slice('159915', '20240101', '20240331') is None
+        assert self.panel.slice('510300', '20240101', '20240430') is None
+        assert self.panel.slice('512880', '20240101', '20240331') is None
+
+    def test_missing_panel_returns_none(self):
+        """测试面板尚未构建时返回None"""
+        empty_dir = tempfile.mkdtemp()
+        try:
+            assert PricePanel(empty_dir).slice('510300', '20240101', '20240331') is None
+        finally:
+            shutil.rmtree(empty_dir, ignore_errors=True)
+
+    def test_slice_skipped_when_store_written_after_build(self):
+        """测试面板构建后该ETF的存储又有写入时不使用面板，读取存储中的新数据"""
+        corrected = make_bars('510300', '2024-01-01', 60)
+        corrected['close'] = corrected['close'] + 1
+        self.store.merge('510300', '20240101', '20240331', corrected)
+        cache = EnhancedCache(os.path.join(self.store_dir, 'cache'))
+        cache.bar_store, cache.price_panel = self.store, self.panel
+
+        df = cache.get_historical_cache('510300', '20240101', '20240331')
+
+        assert df['close'].iloc[0] == corrected['close'].iloc[0]
+        assert self.panel.slice('510300', '20240101', '20240331',
+                                os.path.getmtime(self.store.file_path('159915'))) is not None
+
+    def test_rebuild_keeps_replaced_and_in_progress_versions(self):
+        """测试重建只删除比被替换版本更早的版本，并发构建正在写入的目录不受影响"""
+        first = read_current_version(self.panel_dir)
+        second = build_price_panel(self.store, self.panel_dir)
+        in_progress = os.path.join(self.panel_dir, '99999999999999999999')
+        os.makedirs(in_progress)
+
+        third = build_price_panel(self.store, self.panel_dir)
+
+        versions = {name for name in os.listdir(self.panel_dir)
+                    if os.path.isdir(os.path.join(self.panel_dir, name))}
+        assert first not in versions
+        assert {second, third, '99999999999999999999'} == versions
+        assert read_current_version(self.panel_dir) == third
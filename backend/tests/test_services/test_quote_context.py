@@ -0,0 +1,81 @@
+"""
+富途行情连接管理单元测试
+测试连接的延迟建立、进程内共享、健康检查重连（熔断期间跳过）和fork后重建
+"""
+
+import futu as ft
+from services.data import quote_context
+from services.data.quote_context import QuoteContextManager
+
+
+class FakeQuoteContext:
+    """模拟的富途行情连接"""
+
+    instances = []
+
+    def __init__(self, host, port):
+        self.healthy = True
+        self.closed = False
+        FakeQuoteContext.instances.append(self)
+
+    def get_global_state(self):
+        return (ft.RET_OK, {}) if self.healthy else (ft.RET_ERROR, 'disconnected')
+
+    def close(self):
+        self.closed = True
+
+
+class TestQuoteContextManager:
+    """连接管理器测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        FakeQuoteContext.instances = []
+
+    def test_connects_lazily_and_shares_context(self, monkeypatch):
+        """测试首次使用时才建立连接且多次获取为同一连接"""
+        monkeypatch.setattr(quote_context.ft, 'OpenQuoteContext', FakeQuoteContext)
+        manager = QuoteContextManager('127.0.0.1', 11111)
+
+        assert FakeQuoteContext.instances == []
+        assert manager.get() is manager.get()
+        assert len(FakeQuoteContext.instances) == 1
+
+    def test_reconnects_after_failed_health_check(self, monkeypatch):
+        """测试健康检查失败后重连"""
+        monkeypatch.setattr(quote_context.ft, 'OpenQuoteContext', FakeQuoteContext)
+        manager = QuoteContextManager('127.0.0.1', 11111, health_check_interval=0)
+        first = manager.get()
+        FakeQuoteContext.instances[0].healthy = False
+
+        second = manager.get()
+
+        assert second is not first
+        assert first.closed
+        assert manager.get_status()['reconnects'] == 1
+
+    def test_skips_health_check_while_circuit_open(self, monkeypatch):
+        """测试熔断期间不做健康检查也不重连，半开探测失败才重连"""
+        monkeypatch.setattr(quote_context.ft, 'OpenQuoteContext', FakeQuoteContext)
+        manager = QuoteContextManager('127.0.0.1', 11111, health_check_interval=0)
+        first = manager.get()
+        FakeQuoteContext.instances[0].healthy = False
+        manager.breaker.failure_threshold = 1
+        manager.breaker.record_failure('disconnected')
+
+        assert manager.get() is first
+        assert manager.get_status()['health_check_failures'] == 0
+
+        manager.breaker.reset_seconds = 0
+        assert manager.get() is not first
+        assert manager.get_status()['reconnects'] == 1
+
+    def test_recreates_context_after_fork(self, monkeypatch):
+        """测试fork后子进程丢弃继承的连接"""
+        monkeypatch.setattr(quote_context.ft, 'OpenQuoteContext', FakeQuoteContext)
+        manager = QuoteContextManager('127.0.0.1', 11111)
+        inherited = manager.get()
+        monkeypatch.setattr(quote_context.os, 'getpid', lambda: -1)
+
+        assert manager.get() is not inherited
+        assert not inherited.closed
@@ -0,0 +1,83 @@
+"""
+富途接口限流单元测试
+测试令牌桶额度、后台任务预留额度、跨进程共享和额度用完时的快速失败
+"""
+
+import multiprocessing
+import tempfile
+import threading
+import shutil
+import pytest
+from services.data.rate_limiter import (
+    RateLimiter, QuotaExhaustedError, PRIORITY_BACKGROUND, request_priority, current_priority
+)
+
+
+def _consume(state_dir, attempts, queue):
+    """子进程中尝试获取令牌并返回成功次数"""
+    limiter = RateLimiter(state_dir, quotas={'snapshot': (10, 3600)})
+    queue.put(sum(1 for _ in range(attempts) if limiter.try_acquire('snapshot') == 0))
+
+
+class TestRateLimiter:
+    """限流器测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.state_dir = tempfile.mkdtemp()
+        # 补满需要1小时，测试期间几乎不补充令牌
+        self.limiter = RateLimiter(self.state_dir, quotas={'snapshot': (10, 3600)}, background_reserve_ratio=0.3)
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.state_dir, ignore_errors=True)
+
+    def test_exhausted_quota_fails_fast(self):
+        """测试额度用完后立即抛出异常并给出恢复时间"""
+        for _ in range(10):
+            self.limiter.acquire('snapshot')
+
+        with pytest.raises(QuotaExhaustedError) as exc_info:
+            self.limiter.acquire('snapshot')
+        assert exc_info.value.endpoint == 'snapshot'
+        assert exc_info.value.retry_after > 0
+        assert self.limiter.get_stats()['endpoints']['snapshot'] == {'granted': 10, 'rejected': 1}
+
+    def test_background_cannot_use_reserved_tokens(self):
+        """测试后台任务不能使用为交互请求预留的令牌"""
+        with request_priority(PRIORITY_BACKGROUND):
+            granted = sum(1 for _ in range(10) if self.limiter.try_acquire('snapshot') == 0)
+        assert granted == 7
+
+        interactive = sum(1 for _ in range(10) if self.limiter.try_acquire('snapshot') == 0)
+        assert interactive == 3
+
+    def test_priority_context_is_restored(self):
+        """测试优先级上下文退出后恢复为交互请求"""
+        with request_priority(PRIORITY_BACKGROUND):
+            assert current_priority() == PRIORITY_BACKGROUND
+        assert current_priority() == 'interactive'
+
+    def test_bucket_is_shared_across_processes(self):
+        """测试多个进程共用同一个令牌桶"""
+        ctx = multiprocessing.get_context('fork')
+        queue = ctx.Queue()
+        processes = [ctx.Process(target=_consume, args=(self.state_dir, 10, queue)) for _ in range(3)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        assert sum(queue.get() for _ in processes) == 10
+
+    def test_stats_consistent_under_concurrent_requests(self):
+        """测试多线程同时请求时放行和拒绝次数之和等于请求次数"""
+        threads = [threading.Thread(target=lambda: [self.limiter.try_acquire('snapshot') for _ in range(50)])
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = self.limiter.get_stats()['endpoints']['snapshot']
+        assert stats == {'granted': 10, 'rejected': 390}
@@ -0,0 +1,54 @@
+"""
+并发请求合并单元测试
+测试同一键的并发调用只执行一次并共享结果
+"""
+
+import threading
+import time
+import pytest
+from services.data.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    """并发请求合并测试类"""
+
+    def test_concurrent_calls_collapse(self):
+        """测试并发调用只执行一次"""
+        flight = SingleFlight()
+        executions = []
+        started = threading.Event()
+
+        def fetch():
+            executions.append(1)
+            started.set()
+            time.sleep(0.05)
+            return {'current_price': 3.5}
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do('price:510300', fetch)))
+        leader.start()
+        started.wait()
+        followers = [threading.Thread(target=lambda: results.append(flight.do('price:510300', fetch)))
+                     for _ in range(4)]
+        for t in followers:
+            t.start()
+        for t in [leader] + followers:
+            t.join()
+
+        assert len(executions) == 1
+        assert results == [{'current_price': 3.5}] * 5
+        stats = flight.get_stats()
+        assert stats['collapsed'] == 4
+        assert stats['executions'] == 1
+        assert stats['in_flight'] == 0
+
+    def test_error_propagates_and_key_is_released(self):
+        """测试异常传递给调用方且之后可重新执行"""
+        flight = SingleFlight()
+
+        def fail():
+            raise ConnectionError('gateway down')
+
+        with pytest.raises(ConnectionError):
+            flight.do('price:510300', fail)
+        assert flight.do('price:510300', lambda: 1) == 1
@@ -0,0 +1,53 @@
+"""
+ETF代码索引单元测试
+测试代码前缀、名称子串和拼音首字母查找及结果排序
+"""
+
+import pytest
+from services.data import symbol_index
+from services.data.symbol_index import SymbolIndex
+
+
+RECORDS = [
+    {'code': '510300', 'name': '沪深300ETF'},
+    {'code': '510500', 'name': '中证500ETF'},
+    {'code': '159915', 'name': '创业板ETF'},
+    {'code': '512880', 'name': '证券ETF'},
+    {'code': '515300', 'name': '300红利低波ETF'},
+]
+
+
+class TestSymbolIndex:
+    """ETF代码索引测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.index = SymbolIndex(RECORDS, '20240105')
+
+    def test_code_prefix(self):
+        """测试代码前缀查找"""
+        assert [r['code'] for r in self.index.search('510')] == ['510300', '510500']
+        assert [r['code'] for r in self.index.search('159915')] == ['159915']
+
+    def test_name_substring(self):
+        """测试名称子串查找（不区分大小写）"""
+        assert [r['code'] for r in self.index.search('证券')] == ['512880']
+        assert [r['code'] for r in self.index.search('创业板etf')] == ['159915']
+        assert self.index.search('港股') == []
+
+    def test_code_matches_rank_before_name_matches(self):
+        """测试代码匹配排在名称匹配之前且结果去重"""
+        codes = [r['code'] for r in self.index.search('300')]
+        assert codes == ['510300', '515300']
+
+    def test_limit_and_empty_query(self):
+        """测试结果数量限制和空查询"""
+        assert len(self.index.search('ETF', limit=2)) == 2
+        assert self.index.search('  ') == []
+
+    def test_pinyin_initials(self):
+        """测试拼音首字母查找"""
+        if symbol_index.lazy_pinyin is None:
+            pytest.skip('未安装pypinyin')
+        assert [r['code'] for r in self.index.search('hs300')] == ['510300']
+        assert [r['code'] for r in self.index.search('cyb')] == ['159915']
@@ -0,0 +1,114 @@
+"""
+交易日历单元测试
+测试交易日加载、永久缓存和最近/上一个/下一个/区间交易日查询
+"""
+
+import tempfile
+import shutil
+from datetime import datetime
+import futu as ft
+from services.data import cache_service
+from services.data.cache_service import EnhancedCache, TradingDateManager
+from services.data.trading_calendar import TradingCalendar
+
+# 2023年末至2024年初的部分交易日（含元旦、春节休市）
+TRADING_DAYS = {
+    2023: ['2023-12-27', '2023-12-28', '2023-12-29'],
+    2024: ['2024-01-02', '2024-01-03', '2024-02-08', '2024-02-19', '2024-02-20'],
+}
+
+
+class FakeCalendarContext:
+    """模拟的富途行情连接，按年份返回交易日"""
+
+    def __init__(self):
+        self.requests = []
+
+    def request_trading_days(self, market, start, end):
+        year = int(start[:4])
+        self.requests.append(year)
+        if year not in TRADING_DAYS:
+            return ft.RET_ERROR, 'no calendar'
+        return ft.RET_OK, [{'time': day, 'trade_date_type': 'WHOLE'} for day in TRADING_DAYS[year]]
+
+
+class TestTradingCalendar:
+    """交易日历测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = EnhancedCache(self.cache_dir)
+        self.ctx = FakeCalendarContext()
+        self.calendar = TradingCalendar(self.cache, lambda: self.ctx, calendar_file='')
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_previous_and_next_skip_holidays(self):
+        """测试上一个/下一个交易日跳过节假日"""
+        assert self.calendar.previous('20240219') == '20240208'
+        assert self.calendar.next('20240208') == '20240219'
+        assert self.calendar.is_trading_day('20240210') is False
+        assert self.calendar.is_trading_day('20240219') is True
+
+    def test_previous_crosses_year_boundary(self):
+        """测试年初查询上一个交易日时加载上一年日历"""
+        assert self.calendar.previous('20240102') == '20231229'
+        assert self.calendar.get_info()['loaded_years'] == [2023, 2024]
+
+    def test_between_is_inclusive(self):
+        """测试区间交易日包含首尾"""
+        assert self.calendar.between('20231229', '20240208') == ['20231229', '20240102', '20240103', '20240208']
+
+    def test_calendar_is_cached_permanently(self):
+        """测试交易日历写入永久缓存，新实例不再请求富途API"""
+        self.calendar.between('20240101', '20240131')
+        self.ctx.requests = []
+
+        calendar = TradingCalendar(self.cache, lambda: self.ctx, calendar_file='')
+        assert calendar.next('20240103') == '20240208'
+        assert self.ctx.requests == []
+
+    def test_unavailable_year_returns_none_and_backs_off(self):
+        """测试日历不可用时返回None且短时间内不重复请求"""
+        assert self.calendar.between('20220101', '20221231') is None
+        assert self.calendar.is_trading_day('20220104') is None
+        assert self.ctx.requests == [2022]
+
+
+class TestTradingDateManager:
+    """交易日管理器测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.cache_dir = tempfile.mkdtemp()
+        self.ctx = FakeCalendarContext()
+        self.manager = TradingDateManager(EnhancedCache(self.cache_dir), lambda: self.ctx)
+        self.manager.calendar.calendar_file = ''
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _freeze_now(self, monkeypatch, now: datetime):
+        """固定当前时间"""
+        class FrozenDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return now
+        monkeypatch.setattr(cache_service, 'datetime', FrozenDatetime)
+
+    def test_latest_trading_date_skips_holiday(self, monkeypatch):
+        """测试节假日期间最近交易日为节前最后一个交易日"""
+        self._freeze_now(monkeypatch, datetime(2024, 2, 14, 16, 0))
+        assert self.manager.get_latest_trading_date(None) == '20240208'
+
+    def test_latest_trading_date_before_close(self, monkeypatch):
+        """测试交易日收盘前最近交易日为上一个交易日"""
+        self._freeze_now(monkeypatch, datetime(2024, 2, 19, 10, 0))
+        assert self.manager.get_latest_trading_date(None) == '20240208'
+
+        self._freeze_now(monkeypatch, datetime(2024, 2, 19, 15, 30))
+        assert self.manager.get_latest_trading_date(None) == '20240219'
@@ -48,6 +48,13 @@ def on_reload(server):
     server.log.info("ETF网格交易工具重新加载...")
 
 def when_ready(server):
+    # 在主进程中由历史日线存储重建共享行情面板，工作进程以mmap方式共享同一份数据
+    try:
+        from services.data.cache_service import EnhancedCache
+        version = EnhancedCache("cache").rebuild_price_panel()
+        server.log.info(f"行情面板已就绪: {version or '暂无数据'}")
+    except Exception as e:
+        server.log.warning(f"行情面板构建失败: {e}")
     server.log.info("ETF网格交易工具已就绪，开始接受请求")
 
 def on_exit(server):
@@ -63,6 +70,20 @@ def post_fork(server, worker):
     server.log.info(f"工作进程 {worker.pid} 已启动")
 
 def post_worker_init(worker):
+    # 每个工作进程都启动收盘后缓存预热调度器，通过锁文件保证每个交易日只预热一次
+    if os.getenv('CACHE_WARMUP_ENABLED', 'true').lower() == 'true':
+        try:
+            from api.routes.etf_routes import etf_service
+            etf_service.start_cache_warmup()
+        except Exception as e:
+            worker.log.warning(f"缓存预热调度器启动失败: {e}")
+    # 后台缓存淘汰：各进程重复执行是安全的（删除已不存在的文件会被忽略）
+    if os.getenv('CACHE_EVICTION_ENABLED', 'true').lower() == 'true':
+        try:
+            from api.routes.etf_routes import etf_service
+            etf_service.futuClient.cache.start_eviction()
+        except Exception as e:
+            worker.log.warning(f"缓存淘汰任务启动失败: {e}")
     worker.log.info(f"工作进程 {worker.pid} 初始化完成")
 
 def worker_abort(worker):
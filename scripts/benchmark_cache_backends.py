@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+缓存后端读写延迟基准测试
+对memory、file(files/bundle)、sqlite后端分别写入一批交易日价格条目，再随机读取，
+输出每次操作的平均、中位数和P95延迟（微秒）
+
+用法:
+    python scripts/benchmark_cache_backends.py --entries 5000 --reads 20000
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from services.data.cache_backends import create_cache_backend  # noqa: E402
+from services.data.cache_file import KeyLocks  # noqa: E402
+from services.data.cache_manifest import CacheManifest  # noqa: E402
+
+# (名称, 后端, 文件后端的存储方式)
+VARIANTS = [
+    ('memory', 'memory', 'files'),
+    ('file/files', 'file', 'files'),
+    ('file/bundle', 'file', 'bundle'),
+    ('sqlite', 'sqlite', 'files'),
+]
+
+
+def price_entry(code: str) -> dict:
+    """构造与最新价格缓存相同结构的条目"""
+    return {
+        'ts_code': code,
+        'trade_date': '20240105',
+        'current_price': round(random.uniform(0.5, 5.0), 3),
+        'change_pct': round(random.uniform(-3, 3), 2),
+        'volume': random.randint(10 ** 5, 10 ** 8),
+        'amount': round(random.uniform(10 ** 6, 10 ** 9), 2),
+        'update_time': '2024-01-05 15:00:00',
+    }
+
+
+def summarize(samples: list) -> str:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    return (f"平均 {statistics.mean(samples) * 1e6:8.1f}us  中位数 {statistics.median(samples) * 1e6:8.1f}us  "
+            f"P95 {p95 * 1e6:8.1f}us")
+
+
+def run_variant(name: str, backend_name: str, layout: str, entries: int, reads: int):
+    cache_dir = tempfile.mkdtemp(prefix='cache-bench-')
+    try:
+        backend = create_cache_backend(backend_name, cache_dir, KeyLocks(os.path.join(cache_dir, 'locks')),
+                                       CacheManifest(cache_dir), layout)
+        codes = [f"{510000 + i:06d}" for i in range(entries)]
+
+        write_samples = []
+        for code in codes:
+            data = price_entry(code)
+            start = time.perf_counter()
+            backend.set(f"daily:20240105:price:{code}", data, expire=86400)
+            write_samples.append(time.perf_counter() - start)
+
+        read_samples = []
+        for code in random.choices(codes, k=reads):
+            start = time.perf_counter()
+            assert backend.get(f"daily:20240105:price:{code}") is not None
+            read_samples.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        listed = len(backend.keys("daily:20240105:price:"))
+        list_seconds = time.perf_counter() - start
+
+        print(f"{name:<12} 写入 {summarize(write_samples)}")
+        print(f"{'':<12} 读取 {summarize(read_samples)}")
+        print(f"{'':<12} 列举 {listed}个键 {list_seconds * 1e3:.1f}ms")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='缓存后端读写延迟基准测试')
+    parser.add_argument('--entries', type=int, default=2000, help='写入的条目数')
+    parser.add_argument('--reads', type=int, default=10000, help='随机读取次数')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    print(f"条目数: {args.entries}, 读取次数: {args.reads}")
+    for name, backend_name, layout in VARIANTS:
+        run_variant(name, backend_name, layout, args.entries, args.reads)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+K线转日线基准测试
+对比单次构建的_kline_to_daily_bars与原逐列转换实现，在不同K线条数下的平均、中位数和P95耗时（微秒），
+并校验两者输出一致
+
+用法:
+    python scripts/benchmark_kline_normalizer.py --repeat 200
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+import pandas as pd
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'tests', 'test_services'))
+
+from services.data.futu_client import futuClient  # noqa: E402
+from test_kline_normalizer import legacy_kline_to_daily_bars, make_kline  # noqa: E402
+
+# (名称, 转换函数)
+VARIANTS = [
+    ('legacy', legacy_kline_to_daily_bars),
+    ('single-pass', futuClient._kline_to_daily_bars),
+]
+
+
+def summarize(samples: list) -> str:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    return (f"平均 {statistics.mean(samples) * 1e6:9.1f}us  中位数 {statistics.median(samples) * 1e6:9.1f}us  "
+            f"P95 {p95 * 1e6:9.1f}us")
+
+
+def run(rows: int, repeat: int):
+    kline = make_kline(rows)
+    pd.testing.assert_frame_equal(futuClient._kline_to_daily_bars(kline, '510300'),
+                                  legacy_kline_to_daily_bars(kline, '510300'), check_exact=True)
+    print(f"K线条数 {rows}:")
+    for name, convert in VARIANTS:
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            convert(kline, '510300')
+            samples.append(time.perf_counter() - start)
+        print(f"  {name:<12} {summarize(samples)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='K线转日线基准测试')
+    parser.add_argument('--rows', type=int, nargs='+', default=[250, 1000, 5000],
+                        help='每次转换的K线条数（默认250 1000 5000）')
+    parser.add_argument('--repeat', type=int, default=200, help='每种实现的重复次数')
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        run(rows, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+全市场日线截面入库
+按交易日一次获取全部ETF的日线截面并合并进列式存储，已完成的交易日会跳过，可重复执行。
+
+用法:
+    # 入库最后一次入库之后的交易日（默认来源见DAILY_INGESTION_SOURCE）
+    python scripts/ingest_daily_bars.py
+    # 用Tushare fund_daily回补指定区间
+    python scripts/ingest_daily_bars.py --source tushare --start 20240101 --end 20240630
+"""
+
+import os
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from services.data.futu_client import futuClient  # noqa: E402
+from services.data.daily_ingestion import UniverseDataService, create_cross_section_source  # noqa: E402
+from services.data.rate_limiter import PRIORITY_BACKGROUND, request_priority  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='全市场日线截面入库')
+    parser.add_argument('--source', choices=['futu', 'tushare'], default=None, help='截面来源')
+    parser.add_argument('--start', default=None, help='开始日期 (YYYYMMDD)')
+    parser.add_argument('--end', default=None, help='结束日期 (YYYYMMDD)')
+    parser.add_argument('--cache-dir', default='cache', help='缓存目录')
+    args = parser.parse_args()
+
+    client = futuClient(cache_dir=args.cache_dir)
+    source = create_cross_section_source(args.source, client) if args.source else None
+    service = UniverseDataService(client, source=source)
+    with request_priority(PRIORITY_BACKGROUND):
+        report = service.run(start_date=args.start, end_date=args.end)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+分析接口压测
+通过Flask测试客户端并发请求 /api/analyze，输出吞吐量和延迟分位数。
+默认使用replay模式从录制目录回放富途数据（无需OpenD），先用record模式对真实OpenD跑一遍即可得到录制数据。
+应用的缓存目录（cache/）相对当前工作目录，脚本每次运行都切换到新建的临时目录，结束后删除，
+录制和回放都从空缓存开始，上次运行留下的缓存不会影响结果。
+
+用法:
+    # 录制：直连OpenD，把返回结果写入录制目录
+    python scripts/load_test_analyze.py --mode record --requests 10 --concurrency 1
+    # 回放：注入每次K线请求120ms、快照40ms的延迟
+    python scripts/load_test_analyze.py --requests 200 --concurrency 8 \\
+        --latency request_history_kline=120,get_market_snapshot=40
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+import argparse
+import statistics
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+DEFAULT_ETFS = ['510300', '510500', '159915', '512880', '588000']
+GRID_TYPES = ['等差', '等比']
+RISK_PREFERENCES = ['低频', '均衡', '高频']
+
+
+def build_payload(etf_codes: list, rng: random.Random) -> dict:
+    return {
+        'etfCode': rng.choice(etf_codes),
+        'totalCapital': rng.choice([10000, 100000, 500000, 1000000]),
+        'gridType': rng.choice(GRID_TYPES),
+        'riskPreference': rng.choice(RISK_PREFERENCES),
+    }
+
+
+def percentile(samples: list, pct: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * pct))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='分析接口压测')
+    parser.add_argument('--mode', choices=['replay', 'record', 'live'], default='replay', help='富途数据来源模式')
+    parser.add_argument('--recording-dir', default=None, help='录制目录，默认读取FUTU_RECORDING_DIR')
+    parser.add_argument('--latency', default=None, help='回放延迟(毫秒)，如 50 或 request_history_kline=120')
+    parser.add_argument('--jitter', type=float, default=None, help='回放延迟抖动上限(毫秒)')
+    parser.add_argument('--requests', type=int, default=100, help='请求总数')
+    parser.add_argument('--concurrency', type=int, default=4, help='并发数')
+    parser.add_argument('--etfs', default=','.join(DEFAULT_ETFS), help='请求的ETF代码，逗号分隔')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    args = parser.parse_args()
+
+    # 数据来源配置在导入应用前设置，模块级常量才能读到
+    os.environ['FUTU_PROVIDER_MODE'] = args.mode
+    # 报价推送不经过录制和回放，各模式统一使用行情快照，压测结果才可比
+    os.environ['QUOTE_PUSH_ENABLED'] = 'false'
+    # 录制目录按启动时的工作目录解析，之后切换到临时目录运行
+    os.environ['FUTU_RECORDING_DIR'] = os.path.abspath(
+        args.recording_dir or os.getenv('FUTU_RECORDING_DIR', os.path.join('data', 'futu_recordings')))
+    if args.latency is not None:
+        os.environ['FUTU_REPLAY_LATENCY_MS'] = args.latency
+    if args.jitter is not None:
+        os.environ['FUTU_REPLAY_JITTER_MS'] = str(args.jitter)
+    sys.path.insert(0, BACKEND_DIR)
+
+    work_dir = tempfile.mkdtemp(prefix='load_test_analyze_')
+    os.chdir(work_dir)
+    try:
+        run(args)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def run(args: argparse.Namespace):
+    from app import create_app  # noqa: E402
+    from services.data.quote_context import get_quote_context_manager  # noqa: E402
+
+    app = create_app()
+    rng = random.Random(args.seed)
+    payloads = [build_payload(args.etfs.split(','), rng) for _ in range(args.requests)]
+
+    def send(payload: dict):
+        client = app.test_client()
+        start = time.perf_counter()
+        response = client.post('/api/analyze', json=payload)
+        return response.status_code, time.perf_counter() - start
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(send, payloads))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(seconds for _, seconds in results)
+    statuses = Counter(status for status, _ in results)
+    print(f"模式: {args.mode}, 请求数: {args.requests}, 并发数: {args.concurrency}")
+    print(f"状态码: {dict(statuses)}")
+    print(f"吞吐量: {args.requests / elapsed:.1f} 请求/秒, 总耗时 {elapsed:.2f}s")
+    print(f"延迟: 平均 {statistics.mean(latencies) * 1e3:.1f}ms  P50 {percentile(latencies, 0.5) * 1e3:.1f}ms  "
+          f"P95 {percentile(latencies, 0.95) * 1e3:.1f}ms  P99 {percentile(latencies, 0.99) * 1e3:.1f}ms")
+
+    ctx = get_quote_context_manager().get()
+    if hasattr(ctx, 'stats'):
+        for method, counts in ctx.stats.items():
+            print(f"回放 {method}: 调用 {counts['calls']} 次, 未录制 {counts['misses']} 次")
+
+
+if __name__ == '__main__':
+    main()